@@ -0,0 +1,106 @@
+"""Shared fixtures for the benchmark suite.
+
+Everything here runs offline: the WDS is replaced by ``ReplayServer`` and
+large tables are generated on the fly rather than committed.
+"""
+
+import pathlib
+import shutil
+import tracemalloc
+
+import pytest
+
+from benchmarks.replay import ReplayServer
+from stats_can import profiling, scwds
+from stats_can.synthetic import write_synthetic_table
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent.parent / "tests" / "test_files"
+RECORDED_TABLES = ["18100204", "23100216"]
+# (series, periods) for the synthetic tables, named by approximate row count
+TABLE_SIZES = {"100k": (500, 200), "1m": (4_000, 250)}
+
+
+@pytest.fixture(scope="session")
+def table_source(tmp_path_factory) -> pathlib.Path:
+    """Directory holding the recorded and synthetic tables the server offers."""
+    src = tmp_path_factory.mktemp("tables")
+    for table in RECORDED_TABLES:
+        for name in (f"{table}.json", f"{table}-eng.zip"):
+            shutil.copyfile(TEST_FILES_PATH / name, src / name)
+    for i, (series, periods) in enumerate(TABLE_SIZES.values()):
+        geos = [f"Region {g}" for g in range(1, 11)]
+        estimates = [f"Estimate {e}" for e in range(1, series // len(geos) + 1)]
+        write_synthetic_table(
+            src,
+            dimensions={"Geography": geos, "Estimates": estimates},
+            periods=periods,
+            product_id=98000001 + i,
+        )
+    return src
+
+
+@pytest.fixture(scope="session")
+def table_ids() -> dict[str, str]:
+    """Table id to benchmark for each size label."""
+    ids = {"12k": "18100204", "105k": "23100216"}
+    ids.update({label: str(98000001 + i) for i, label in enumerate(TABLE_SIZES)})
+    return ids
+
+
+@pytest.fixture(scope="session")
+def replay_server(table_source):
+    """Running replay server backed by the recorded tables."""
+    vector_tables = [table_source / f"{t}-eng.zip" for t in RECORDED_TABLES]
+    with ReplayServer([table_source], vector_tables=vector_tables) as server:
+        yield server
+
+
+@pytest.fixture
+def wds(replay_server, monkeypatch):
+    """Route every WDS call to the replay server.
+
+    The inter-chunk politeness delay is dropped so the numbers measure the
+    client rather than ``time.sleep``.
+    """
+    monkeypatch.setattr(scwds, "SC_URL", replay_server.url)
+    monkeypatch.setattr(scwds, "_CHUNK_DELAY", 0)
+    return replay_server
+
+
+@pytest.fixture
+def measure(benchmark):
+    """Benchmark a callable and record its peak traced memory and throughput.
+
+    Returns a function taking ``(func, *args, rows=None, stages=False,
+    **kwargs)``. Peak memory comes from a separate tracemalloc run so tracing
+    overhead doesn't skew the timings. ``rows`` is used to report rows per
+    second. ``stages`` adds a run under `stats_can.profiling.profile` and
+    records its stages as ``extra_info["stages"]``, keyed by stage name.
+    """
+
+    def run(func, *args, rows=None, rounds=3, stages=False, **kwargs):
+        tracemalloc.start()
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchmark.extra_info["peak_traced_mib"] = round(peak / 2**20, 2)
+        if stages:
+            with profiling.profile() as report:
+                func(*args, **kwargs)
+            benchmark.extra_info["stages"] = {
+                stage["stage"]: {
+                    key: round(value, 4) if isinstance(value, float) else value
+                    for key, value in stage.items()
+                    if key != "stage"
+                }
+                for stage in report.stages
+            }
+        result = benchmark.pedantic(
+            func, args=args, kwargs=kwargs, rounds=rounds, iterations=1
+        )
+        stats = getattr(benchmark.stats, "stats", None)
+        if rows is not None and stats is not None and stats.mean:
+            benchmark.extra_info["rows_per_second"] = round(rows / stats.mean)
+        return result
+
+    return run
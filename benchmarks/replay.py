@@ -0,0 +1,303 @@
+"""Local stand in for the StatsCan web data service.
+
+The server answers the WDS endpoints the package uses from recorded data:
+cube metadata comes from the ``<pid>.json`` files next to the table zips it
+serves, and vector data comes from the series in the recorded table zips.
+Vectors that aren't in any recorded table get a deterministic synthetic
+monthly series, so benchmarks can ask for as many vectors as they like.
+
+Point ``stats_can.scwds.SC_URL`` at ``ReplayServer.url`` to use it.
+"""
+
+import datetime as dt
+import email.utils
+import hashlib
+import json
+import pathlib
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+_RELEASE_LAG = dt.timedelta(days=70)
+_SYNTHETIC_PERIODS = 240
+_SYNTHETIC_START = dt.date(2000, 1, 1)
+_SYNTHETIC_PRODUCT_ID = 99000001
+# Recorded metadata predates or nulls out a few fields the current schema needs
+_METADATA_LIST_FIELDS = ["correction", "correctionFootnote"]
+
+
+def _success(obj) -> dict:
+    return {"status": "SUCCESS", "object": obj}
+
+
+def _release_time(ref_date: dt.date) -> str:
+    return f"{ref_date + _RELEASE_LAG}T08:30"
+
+
+def _month_starts(start: dt.date, periods: int) -> list[dt.date]:
+    dates = []
+    year, month = start.year, start.month
+    for _ in range(periods):
+        dates.append(dt.date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return dates
+
+
+class _Series:
+    """One vector's recorded (or synthesized) history."""
+
+    def __init__(self, vector_id, product_id, coordinate, points):
+        self.vector_id = vector_id
+        self.product_id = product_id
+        self.coordinate = coordinate
+        self.points = points  # list of (ref_date, value), oldest first
+
+    def info(self) -> dict:
+        return {
+            "responseStatusCode": 0,
+            "productId": self.product_id,
+            "coordinate": self.coordinate,
+            "vectorId": self.vector_id,
+            "frequencyCode": 6,
+            "scalarFactorCode": 0,
+            "decimals": 1,
+            "terminated": 0,
+            "SeriesTitleEn": f"Replayed series v{self.vector_id}",
+            "SeriesTitleFr": f"Série rejouée v{self.vector_id}",
+            "memberUomCode": 223,
+        }
+
+    def data(self, points) -> dict:
+        return {
+            "responseStatusCode": 0,
+            "productId": self.product_id,
+            "coordinate": self.coordinate,
+            "vectorId": self.vector_id,
+            "vectorDataPoint": [
+                {
+                    "refPer": str(ref_date),
+                    "refPer2": "",
+                    "refPerRaw": str(ref_date),
+                    "refPerRaw2": "",
+                    "value": value,
+                    "decimals": 1,
+                    "scalarFactorCode": 0,
+                    "symbolCode": 0,
+                    "statusCode": 0,
+                    "securityLevelCode": 0,
+                    "releaseTime": _release_time(ref_date),
+                    "frequencyCode": 6,
+                }
+                for ref_date, value in points
+            ],
+        }
+
+
+class _Server(ThreadingHTTPServer):
+    # the default backlog of 5 drops connections from concurrent clients,
+    # which then stall a second on the SYN retry
+    request_queue_size = 128
+
+
+class ReplayServer:
+    """Serve recorded WDS responses and table zips over local HTTP.
+
+    Parameters
+    ----------
+    table_dirs
+        directories holding ``<pid>-eng.zip`` and ``<pid>.json`` pairs to
+        serve as full table downloads
+    vector_tables
+        table zips whose series should back the vector endpoints
+    """
+
+    def __init__(
+        self,
+        table_dirs: list[pathlib.Path],
+        vector_tables: list[pathlib.Path] | None = None,
+    ):
+        self.table_dirs = [pathlib.Path(d) for d in table_dirs]
+        self.series = {}
+        for table_zip in vector_tables or []:
+            self._load_series(pathlib.Path(table_zip))
+        self.requests = 0
+        self.bytes_sent = 0
+        self._validators = {}
+        self._httpd = _Server(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def url(self) -> str:
+        """Drop in replacement for ``stats_can.scwds.SC_URL``."""
+        return f"{self.base_url}rest/"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _load_series(self, table_zip: pathlib.Path) -> None:
+        product_id = int(table_zip.name.split("-")[0])
+        with zipfile.ZipFile(table_zip) as zf, zf.open(f"{product_id}.csv") as csv:
+            df = pd.read_csv(
+                csv,
+                usecols=["REF_DATE", "VECTOR", "COORDINATE", "VALUE"],
+                dtype={"REF_DATE": str, "VECTOR": str, "COORDINATE": str},
+            )
+        df = df.dropna(subset=["VALUE"])
+        df["REF_DATE"] = pd.to_datetime(df["REF_DATE"], format="%Y-%m").dt.date
+        for (vector, coordinate), grp in df.groupby(["VECTOR", "COORDINATE"]):
+            vector_id = int(vector.lstrip("v"))
+            points = list(zip(grp["REF_DATE"], grp["VALUE"].tolist()))
+            self.series[vector_id] = _Series(vector_id, product_id, coordinate, points)
+
+    def get_series(self, vector_id: int) -> _Series:
+        if vector_id not in self.series:
+            dates = _month_starts(_SYNTHETIC_START, _SYNTHETIC_PERIODS)
+            base = vector_id % 1000
+            points = [(d, round(base + i * 0.5, 1)) for i, d in enumerate(dates)]
+            coordinate = f"{vector_id % 97 + 1}.{vector_id % 13 + 1}"
+            return _Series(vector_id, _SYNTHETIC_PRODUCT_ID, coordinate, points)
+        return self.series[vector_id]
+
+    def cube_metadata(self, product_id: str) -> dict | None:
+        for table_dir in self.table_dirs:
+            meta_file = table_dir / f"{product_id}.json"
+            if meta_file.is_file():
+                meta = json.loads(meta_file.read_text())
+                for key in _METADATA_LIST_FIELDS:
+                    if meta.get(key) is None:
+                        meta[key] = []
+                meta.setdefault("issueDate", None)
+                return meta
+        return None
+
+    def table_zip(self, name: str) -> pathlib.Path | None:
+        for table_dir in self.table_dirs:
+            candidate = table_dir / name
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def validators(self, table_zip: pathlib.Path) -> dict[str, str]:
+        """ETag and Last-Modified headers for a table zip."""
+        mtime_ns = table_zip.stat().st_mtime_ns
+        cached = self._validators.get(table_zip)
+        if cached is None or cached[0] != mtime_ns:
+            etag = hashlib.sha256(table_zip.read_bytes()).hexdigest()[:32]
+            headers = {
+                "ETag": f'"{etag}"',
+                "Last-Modified": email.utils.formatdate(mtime_ns / 1e9, usegmt=True),
+            }
+            cached = self._validators[table_zip] = (mtime_ns, headers)
+        return cached[1]
+
+    def handle_post(self, endpoint: str, body):
+        if endpoint == "getSeriesInfoFromVector":
+            return [_success(self.get_series(v["vectorId"]).info()) for v in body]
+        if endpoint == "getDataFromVectorsAndLatestNPeriods":
+            out = []
+            for req in body:
+                series = self.get_series(req["vectorId"])
+                out.append(_success(series.data(series.points[-req["latestN"] :])))
+            return out
+        if endpoint == "getBulkVectorDataByRange":
+            start = body["startDataPointReleaseDate"]
+            end = body["endDataPointReleaseDate"]
+            out = []
+            for vector_id in body["vectorIds"]:
+                series = self.get_series(vector_id)
+                points = [
+                    p for p in series.points if start <= _release_time(p[0]) <= end
+                ]
+                out.append(_success(series.data(points)))
+            return out
+        if endpoint == "getCubeMetadata":
+            return [_success(self.cube_metadata(t["productId"])) for t in body]
+        return None
+
+    def handle_get(self, endpoint: str, args: list[str], query: dict):
+        if endpoint == "getFullTableDownloadCSV":
+            return _success(f"{self.base_url}tables/{args[0]}-eng.zip")
+        if endpoint == "getFullTableDownloadSDMX":
+            return _success(f"{self.base_url}tables/{args[0]}.zip")
+        if endpoint == "getDataFromVectorByReferencePeriodRange":
+            start = query["startRefPeriod"][0]
+            end = query["endReferencePeriod"][0]
+            out = []
+            for vector in query["vectorIds"][0].split(","):
+                series = self.get_series(int(vector))
+                points = [p for p in series.points if start <= str(p[0]) <= end]
+                out.append(_success(series.data(points)))
+            return out
+        if endpoint == "getChangedCubeList":
+            return _success([])
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(
+                self,
+                status: int,
+                payload: bytes,
+                content_type: str,
+                headers: dict | None = None,
+            ):
+                server.requests += 1
+                server.bytes_sent += len(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_json(self, obj):
+                if obj is None:
+                    self._send(404, b"{}", "application/json")
+                else:
+                    self._send(200, json.dumps(obj).encode(), "application/json")
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = parsed.path.strip("/").split("/")
+                if parts[0] == "tables":
+                    table_zip = server.table_zip(parts[1])
+                    if table_zip is None:
+                        self._send(404, b"", "application/zip")
+                        return
+                    headers = server.validators(table_zip)
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        self._send(304, b"", "application/zip", headers)
+                    else:
+                        payload = table_zip.read_bytes()
+                        self._send(200, payload, "application/zip", headers)
+                    return
+                query = parse_qs(parsed.query)
+                self._send_json(server.handle_get(parts[1], parts[2:], query))
+
+            def do_POST(self):
+                endpoint = self.path.strip("/").split("/")[1]
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                self._send_json(server.handle_post(endpoint, body))
+
+        return Handler
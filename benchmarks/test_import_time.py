@@ -0,0 +1,36 @@
+"""Cold import time of the package and its submodules.
+
+Each round starts a fresh interpreter, so the timings include interpreter
+start up. Compare against the ``baseline`` case to see what the import adds.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+
+def _cold_import(statement: str) -> None:
+    """Run an import statement in a brand new interpreter.
+
+    Parameters
+    ----------
+    statement
+        python source to execute
+    """
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "pass",
+        "import stats_can",
+        "from stats_can import scwds",
+        "from stats_can import sc",
+    ],
+    ids=["baseline", "package", "scwds", "sc"],
+)
+def test_cold_import(benchmark, statement):
+    """Time a cold import in a subprocess."""
+    benchmark.pedantic(_cold_import, args=(statement,), rounds=5, iterations=1)
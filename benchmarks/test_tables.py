@@ -0,0 +1,244 @@
+"""Throughput and memory of full table downloads and loading."""
+
+import datetime as dt
+import pathlib
+import shutil
+import tempfile
+
+import pytest
+
+from stats_can import aggregate, sc, stream, table_store, transcode, vector_index
+from stats_can.synthetic import write_synthetic_table
+
+SIZES = ["12k", "105k", "100k", "1m"]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_download_tables(measure, wds, table_ids, tmp_path, size):
+    """Download a table zip and its metadata from the replay server."""
+    table = table_ids[size]
+
+    def fresh_download():
+        # a new directory each round so nothing is skipped as unchanged
+        dest = pathlib.Path(tempfile.mkdtemp(dir=tmp_path))
+        sc.download_tables(table, path=dest)
+        return dest
+
+    dest = measure(fresh_download)
+    assert (dest / f"{table}-eng.zip").is_file()
+
+
+@pytest.mark.parametrize("tee", [False, True], ids=["memory", "tee"])
+@pytest.mark.parametrize("size", SIZES)
+def test_stream_table_to_dataframe(measure, wds, table_ids, tmp_path, size, tee):
+    """Download straight into a DataFrame, against download then load."""
+    table = table_ids[size]
+
+    def stream_in():
+        dest = pathlib.Path(tempfile.mkdtemp(dir=tmp_path)) if tee else None
+        return stream.stream_table_to_dataframe(table, tee=dest)
+
+    df = measure(stream_in)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_download_then_load(measure, wds, table_ids, tmp_path, size):
+    """The download to disk and read back that streaming replaces."""
+    table = table_ids[size]
+
+    def download_and_load():
+        dest = pathlib.Path(tempfile.mkdtemp(dir=tmp_path))
+        return sc.zip_table_to_dataframe(table, path=dest)
+
+    df = measure(download_and_load)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["cold", "warm"])
+def test_changed_tables_in_range(measure, wds, tmp_path, cached):
+    """A month of changed cube lists, with or without past days saved."""
+    end = dt.date.today()
+    start = end - dt.timedelta(days=30)
+
+    def catch_up():
+        if not cached:
+            (tmp_path / sc.CHANGED_CUBES_FILE).unlink(missing_ok=True)
+        return sc.changed_tables_in_range(start, end, path=tmp_path)
+
+    measure(catch_up)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_download_tables_unchanged(measure, wds, table_ids, tmp_path, size):
+    """Refresh a table that hasn't changed since it was last downloaded."""
+    table = table_ids[size]
+    sc.download_tables(table, path=tmp_path)
+    measure(sc.download_tables, table, path=tmp_path)
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("size", SIZES)
+def test_zip_table_to_dataframe(
+    measure, table_source, table_ids, tmp_path, size, engine
+):
+    """Load an already downloaded table zip into a DataFrame."""
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    df = measure(sc.zip_table_to_dataframe, table, path=tmp_path, engine=engine)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("backend", ["arrow", "polars"])
+@pytest.mark.parametrize("size", SIZES)
+def test_zip_table_to_backend(
+    measure, table_source, table_ids, tmp_path, size, backend
+):
+    """Load an already downloaded table zip into a pyarrow Table or Polars."""
+    pytest.importorskip("pyarrow")
+    if backend == "polars":
+        pytest.importorskip("polars")
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    df = measure(sc.zip_table_to_dataframe, table, path=tmp_path, backend=backend)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("codec", ["zip", "zstd", "lz4"])
+@pytest.mark.parametrize("size", SIZES)
+def test_zip_table_to_dataframe_transcoded(
+    measure, table_source, table_ids, tmp_path, size, codec
+):
+    """Load a table from its zip or from a zstd or lz4 copy of its CSV."""
+    if codec != "zip":
+        pytest.importorskip("pyarrow")
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    if codec != "zip":
+        transcode.transcode_table(table, path=tmp_path, codec=codec)
+    df = measure(sc.zip_table_to_dataframe, table, path=tmp_path)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("processes", [1, 2, None])
+def test_zip_table_to_dataframe_processes(
+    measure, table_source, table_ids, tmp_path, processes
+):
+    """Serial against process pool parsing of the 1m row table."""
+    table = table_ids["1m"]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    df = measure(
+        sc.zip_table_to_dataframe,
+        table,
+        path=tmp_path,
+        processes=processes,
+        rows=1_000_000,
+    )
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("how", ["load", "aggregate"])
+def test_aggregate_table(measure, table_source, table_ids, tmp_path, how):
+    """Sum the 1m row table by GEO and REF_DATE out of core or after loading it."""
+    table = table_ids["1m"]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+
+    def load_and_group():
+        df = sc.zip_table_to_dataframe(table, path=tmp_path)
+        return df.groupby(["GEO", "REF_DATE"], observed=True)["VALUE"].agg(
+            ["sum", "mean", "count"]
+        )
+
+    if how == "load":
+        result = measure(load_and_group, rows=1_000_000)
+    else:
+        result = measure(
+            aggregate.aggregate_table, table, path=tmp_path, rows=1_000_000
+        )
+    assert len(result) > 0
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_zip_table_to_dataframe_stages(
+    measure, benchmark, table_source, table_ids, tmp_path, processes
+):
+    """Where the time and memory of loading the 1m row table go."""
+    table = table_ids["1m"]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    df = measure(
+        sc.zip_table_to_dataframe,
+        table,
+        path=tmp_path,
+        processes=processes,
+        rows=1_000_000,
+        stages=True,
+    )
+    stages = benchmark.extra_info["stages"]
+    assert "csv_parse" in stages and "dates" in stages
+    assert ("concat" in stages) == (processes != 1)
+    frame_mib = df.memory_usage(deep=True).sum() / 2**20
+    assert abs(stages["dates"]["frame_mib"] - frame_mib) < 1
+    # parsing (or gathering the workers' pieces) is where memory peaks
+    peak = max(stages, key=lambda name: stages[name]["traced_peak_mib"])
+    assert peak in ("csv_parse", "concat")
+
+
+@pytest.mark.parametrize("periods", [10, 100])
+def test_write_synthetic_table(measure, tmp_path, periods):
+    """Generating tables should stay flat in memory as rows grow."""
+    dimensions = {
+        "Geography": [f"Region {g}" for g in range(20)],
+        "Estimates": [f"Estimate {e}" for e in range(500)],
+    }
+    measure(
+        write_synthetic_table,
+        tmp_path,
+        dimensions=dimensions,
+        periods=periods,
+        rows=10_000 * periods,
+        rounds=1,
+    )
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_open_table_store(measure, table_source, table_ids, tmp_path, size):
+    """Open an already built memory-mapped store and wrap it as a frame."""
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    table_store.open_table_store(table, path=tmp_path)
+
+    def open_and_wrap():
+        return table_store.open_table_store(table, path=tmp_path).to_frame()
+
+    df = measure(open_and_wrap)
+    assert len(df) > 0
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_build_vector_index(measure, table_source, table_ids, tmp_path, size):
+    """Sort a downloaded table by vector and index it."""
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    measure(vector_index.build_vector_index, table, path=tmp_path)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_vector_index_read(measure, table_source, table_ids, tmp_path, size):
+    """Read one vector out of an already indexed table."""
+    table = table_ids[size]
+    for name in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(table_source / name, tmp_path / name)
+    index = vector_index.open_vector_index(table, path=tmp_path)
+    vector = f"v{index.vectors[len(index) // 2]}"
+    df = measure(index.read, vector)
+    assert len(df) > 0
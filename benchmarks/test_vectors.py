@@ -0,0 +1,118 @@
+"""Throughput and memory of the vector endpoints and ``vectors_to_df``."""
+
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stats_can import sc, scwds, vintages
+
+# Recorded vectors from 23100216 first, synthetic ones after that
+VECTOR_COUNTS = [10, 250, 1000]
+START = dt.date(2000, 1, 1)
+END = dt.date(2019, 1, 1)
+
+
+@pytest.fixture
+def vectors(wds, request) -> list[int]:
+    """The first n vectors the replay server knows about."""
+    known = sorted(wds.series)
+    n = request.param
+    return (known + list(range(90_000_000, 90_000_000 + n)))[:n]
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_series_info(measure, vectors):
+    """Series metadata lookups."""
+    measure(scwds.get_series_info_from_vector, vectors, rows=len(vectors))
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_latest_n_periods(measure, vectors):
+    """Latest 12 periods for each vector."""
+    measure(
+        scwds.get_data_from_vectors_and_latest_n_periods,
+        vectors,
+        12,
+        rows=len(vectors) * 12,
+    )
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_bulk_by_release_range(measure, vectors):
+    """Full history by release date range."""
+    measure(scwds.get_bulk_vector_data_by_range, vectors, START, END)
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_bulk_by_reference_period_range(measure, vectors):
+    """Full history by reference period range."""
+    measure(scwds.get_bulk_vector_data_by_reference_period_range, vectors, START, END)
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_vectors_to_df_latest_n(measure, vectors):
+    """DataFrame of the latest 12 periods."""
+    df = measure(sc.vectors_to_df, vectors, 12, rows=len(vectors) * 12)
+    assert df.shape[1] == len(vectors)
+
+
+@pytest.mark.parametrize("vectors", [1000], indirect=True)
+def test_vectors_to_df_stages(measure, benchmark, vectors):
+    """Where the time and memory of a 1000 vector DataFrame go."""
+    measure(sc.vectors_to_df, vectors, 12, rows=len(vectors) * 12, stages=True)
+    stages = benchmark.extra_info["stages"]
+    assert list(stages) == ["download", "series", "concat", "dates"]
+    assert stages["concat"]["frame_mib"] > 0
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_vectors_to_df_release_range(measure, vectors):
+    """DataFrame of the full history by release range."""
+    df = measure(
+        sc.vectors_to_df, vectors, start_release_date=START, end_release_date=END
+    )
+    assert df.shape[1] == len(vectors)
+
+
+@pytest.mark.parametrize("vectors", [250, 1000], indirect=True)
+@pytest.mark.parametrize("mixed", [False, True], ids=["per_depth", "mixed"])
+def test_latest_n_mixed_depths(measure, vectors, mixed):
+    """Three history depths as one call per depth or one mixed call."""
+    depths = {v: (1, 12, 60)[i % 3] for i, v in enumerate(vectors)}
+
+    def per_depth():
+        out = []
+        for n in sorted(set(depths.values())):
+            group = [v for v, d in depths.items() if d == n]
+            out += scwds.get_data_from_vectors_and_latest_n_periods(group, n)
+        return out
+
+    def one_call():
+        return scwds.get_data_from_vectors_and_latest_n_periods(depths)
+
+    result = measure(one_call if mixed else per_depth, rows=sum(depths.values()))
+    assert len(result) == len(vectors)
+
+
+@pytest.mark.parametrize("vectors", [250], indirect=True)
+def test_series_info_concurrent_callers(measure, benchmark, wds, vectors):
+    """Eight threads asking for overlapping vectors at once."""
+    batches = [vectors[i * 25 : i * 25 + 100] for i in range(8)]
+
+    def all_callers():
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            return list(pool.map(scwds.get_series_info_from_vector, batches))
+
+    before = wds.requests
+    measure(all_callers, rows=sum(len(b) for b in batches), rounds=1)
+    benchmark.extra_info["requests_per_round"] = (wds.requests - before) / 2
+
+
+@pytest.mark.parametrize("vectors", VECTOR_COUNTS, indirect=True)
+def test_vintage_as_of(measure, vectors, tmp_path):
+    """As-of query on a store holding the vectors' release history."""
+    vintages.record_vintages(vectors, START, END, path=tmp_path)
+    store = vintages.VintageStore(tmp_path)
+    df = measure(store.as_of, dt.date(2010, 1, 1), vectors)
+    assert df.shape[1] > 0
@@ -1,12 +1,17 @@
 """Read StatsCan Data into python, mostly pandas dataframes.
 
+Submodules and the functions re-exported here are loaded lazily on first
+attribute access, so ``import stats_can`` stays cheap for scripts that only
+need a couple of web data service calls.
+
 Todo
 ----
 Logging
-
-French support
 """
 
+import importlib
+from typing import TYPE_CHECKING
+
 try:
     from importlib.metadata import PackageNotFoundError  # type: ignore
     from importlib.metadata import version
@@ -21,6 +26,7 @@ except PackageNotFoundError:  # pragma: no cover
     __version__ = "unknown"
 __all__ = [
     "sc",
+    "sdmx",
     "schemas",
     "code_sets_to_df_dict",
     "zip_table_to_dataframe",
@@ -31,11 +37,87 @@ __all__ = [
     "get_cube_metadata",
     "get_series_info_from_vector",
 ]
-from stats_can import sc, scwds, schemas
-from stats_can.sc import code_sets_to_df_dict, vectors_to_df, zip_table_to_dataframe
-from stats_can.scwds import (
-    get_changed_cube_list,
-    get_changed_series_list,
-    get_cube_metadata,
-    get_series_info_from_vector,
-)
+
+_SUBMODULES = {
+    "aggregate",
+    "backends",
+    "cli",
+    "helpers",
+    "mirror",
+    "planner",
+    "profiling",
+    "query",
+    "sc",
+    "sdmx",
+    "series_store",
+    "schemas",
+    "scwds",
+    "stream",
+    "synthetic",
+    "table_store",
+    "transcode",
+    "vector_index",
+    "vintages",
+}
+_LAZY_ATTRIBUTES = {
+    "code_sets_to_df_dict": "sc",
+    "zip_table_to_dataframe": "sc",
+    "vectors_to_df": "sc",
+    "get_changed_cube_list": "scwds",
+    "get_changed_series_list": "scwds",
+    "get_cube_metadata": "scwds",
+    "get_series_info_from_vector": "scwds",
+}
+
+if TYPE_CHECKING:  # pragma: no cover
+    from stats_can import sc, schemas, scwds
+    from stats_can.sc import (
+        code_sets_to_df_dict,
+        vectors_to_df,
+        zip_table_to_dataframe,
+    )
+    from stats_can.scwds import (
+        get_changed_cube_list,
+        get_changed_series_list,
+        get_cube_metadata,
+        get_series_info_from_vector,
+    )
+
+
+def __getattr__(name: str):
+    """Import submodules and re-exported functions on first access.
+
+    Parameters
+    ----------
+    name
+        attribute being looked up on the package
+
+    Returns
+    -------
+    :
+        the submodule or function
+
+    Raises
+    ------
+    AttributeError
+        if name isn't a submodule or re-exported function
+    """
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f"{__name__}.{_LAZY_ATTRIBUTES[name]}")
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    """Include lazily loaded names in ``dir(stats_can)``.
+
+    Returns
+    -------
+    :
+        module attributes plus everything in ``__all__``
+    """
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,285 @@
+"""Group-by aggregates of full tables without loading them.
+
+Often all that's wanted from a big table is something like the sum or mean
+of VALUE by GEO and REF_DATE. `aggregate_table` streams the table's rows in
+chunks, parsing only the grouping columns and VALUE, and folds each chunk
+into partial sums, counts, minimums and maximums per group. Grouping columns
+are read as categoricals, so within a chunk the groups are keyed on their
+integer codes. Memory is bounded by the chunk size and the number of groups,
+not the number of rows.
+
+With more than one process the CSV is decompressed to a temporary file once
+and line-aligned byte ranges of it are aggregated in a process pool, the way
+`stats_can.sc.zip_table_to_dataframe` parses in parallel, and only the
+partial aggregates come back from each worker.
+"""
+
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from stats_can.helpers import parse_tables
+from stats_can.sc import (
+    _ENGLISH_COLUMNS,
+    _RANGES_PER_PROCESS,
+    _csv_options,
+    _header_columns,
+    _lang_suffix,
+    _line_aligned_ranges,
+    _open_table_csv,
+    _table_frequency,
+    _table_source,
+    download_tables,
+    parse_ref_dates,
+)
+
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+# partial aggregate columns and how partials of each combine
+_PARTIALS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+# a missing label while partials are being added up
+_MISSING = "\x00"
+
+
+class _ByteRange(io.RawIOBase):
+    """Read an open file from where it is up to an end offset."""
+
+    def __init__(self, raw, end: int):
+        super().__init__()
+        self._raw = raw
+        self._left = end - raw.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self._raw.readinto(memoryview(buffer)[: self._left])
+        self._left -= n
+        return n
+
+
+def _by_label(partial: pd.DataFrame) -> pd.DataFrame:
+    """Key a chunk's partial aggregates on labels instead of category codes.
+
+    Each chunk has its own categories, so codes don't line up between chunks.
+    Missing labels become `_MISSING`, since aligning frames doesn't match NaN.
+    """
+    index = partial.index
+    if isinstance(index, pd.MultiIndex):
+        partial.index = pd.MultiIndex.from_arrays(
+            [
+                index.get_level_values(n).astype(object).fillna(_MISSING)
+                for n in range(index.nlevels)
+            ],
+            names=index.names,
+        )
+    else:
+        partial.index = index.astype(object).fillna(_MISSING)
+    return partial
+
+
+def _missing_as_nan(partial: pd.DataFrame) -> pd.DataFrame:
+    """Put back the missing labels `_by_label` replaced."""
+    frame = partial.index.to_frame(index=False)
+    frame = frame.mask(frame == _MISSING)
+    if isinstance(partial.index, pd.MultiIndex):
+        partial.index = pd.MultiIndex.from_frame(frame)
+    else:
+        partial.index = pd.Index(frame.iloc[:, 0])
+    return partial
+
+
+def _merge_partials(partials: list[pd.DataFrame], by: list[str]) -> pd.DataFrame:
+    """Combine partial aggregates of the same groups."""
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        index = pd.MultiIndex.from_arrays([[]] * len(by), names=by)
+        return pd.DataFrame(columns=list(_PARTIALS), index=index)
+    if len(partials) == 1:
+        return partials[0]
+    df = pd.concat(partials)
+    return df.groupby(level=by, dropna=False, sort=False).agg(_PARTIALS)
+
+
+def _add_partial(total: pd.DataFrame | None, partial: pd.DataFrame) -> pd.DataFrame:
+    """Fold a chunk's partial aggregates into the running ones.
+
+    Groups only one side has are kept as they are, and NaN (a group with no
+    values) never wins a min or max.
+    """
+    if total is None or not len(total):
+        return partial
+    total, partial = total.align(partial, join="outer")
+    # columns are list(_PARTIALS): sum and count add, min and max compare
+    a, b = total.to_numpy(dtype=float), partial.to_numpy(dtype=float)
+    folded = np.empty_like(a)
+    folded[:, :2] = np.nan_to_num(a[:, :2]) + np.nan_to_num(b[:, :2])
+    folded[:, 2] = np.fmin(a[:, 2], b[:, 2])
+    folded[:, 3] = np.fmax(a[:, 3], b[:, 3])
+    return pd.DataFrame(folded, index=total.index, columns=total.columns)
+
+
+def _aggregate_stream(
+    csv_file,
+    col_names: list[str],
+    csv_options: dict,
+    by: list[str],
+    value: str,
+    chunksize: int,
+) -> pd.DataFrame:
+    """Partial aggregates of headerless CSV rows, read chunksize at a time."""
+    reader = pd.read_csv(
+        csv_file,
+        header=None,
+        names=col_names,
+        usecols=[*by, value],
+        dtype={**{col: "category" for col in by}, value: float},
+        chunksize=chunksize,
+        **csv_options,
+    )
+    total = None
+    with reader:
+        for chunk in reader:
+            grouped = chunk.groupby(by, observed=True, dropna=False, sort=False)
+            total = _add_partial(total, _by_label(grouped[value].agg(list(_PARTIALS))))
+    return _merge_partials([] if total is None else [_missing_as_nan(total)], by)
+
+
+def _aggregate_csv_range(
+    csv_path: pathlib.Path,
+    start: int,
+    end: int,
+    col_names: list[str],
+    csv_options: dict,
+    by: list[str],
+    value: str,
+    chunksize: int,
+) -> pd.DataFrame:
+    """Partial aggregates of the rows between two line-aligned offsets.
+
+    Runs in a worker process.
+    """
+    with open(csv_path, "rb", buffering=0) as raw:
+        raw.seek(start)
+        with io.BufferedReader(_ByteRange(raw, end), buffer_size=2**20) as rows:
+            return _aggregate_stream(rows, col_names, csv_options, by, value, chunksize)
+
+
+def aggregate_table(
+    table: str,
+    by: str | list[str] = ("GEO", "REF_DATE"),
+    aggs: str | list[str] = ("sum", "mean", "count"),
+    path: pathlib.Path | None = None,
+    processes: int | None = None,
+    chunksize: int = 100_000,
+    value: str = "VALUE",
+    lang: str = "en",
+) -> pd.DataFrame:
+    """Aggregate a table's values by some of its columns, out of core.
+
+    Parameters
+    ----------
+    table
+        the table to aggregate, downloaded first if it isn't in path
+    by
+        columns to group by, e.g. GEO, REF_DATE or a dimension's column
+    aggs
+        any of ``"sum"``, ``"count"``, ``"mean"``, ``"min"`` and ``"max"``.
+        Missing values are skipped, and count counts the rest.
+    path
+        where the table was downloaded, defaults to the current working
+        directory
+    processes
+        worker processes to aggregate with, None (the default) uses every
+        core and 1 streams the table in this process without a temporary copy
+    chunksize
+        rows parsed at a time by each process
+    value
+        the column to aggregate
+    lang
+        ``"en"`` or ``"fr"``, whose column names by and value use
+
+    Returns
+    -------
+    :
+        one row per group, indexed by the by columns with REF_DATE parsed
+        like `stats_can.sc.zip_table_to_dataframe` does, and a column per
+        aggregate
+
+    Raises
+    ------
+    ValueError
+        if an aggregate isn't supported
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    aggs = [aggs] if isinstance(aggs, str) else list(aggs)
+    unknown = set(aggs) - set(AGGREGATES)
+    if unknown:
+        raise ValueError(f"aggs must be some of {AGGREGATES}, not {sorted(unknown)}")
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    source = _table_source(table, path, lang)
+    if source is None:
+        download_tables([table], path, lang=lang)
+        source = path / f"{table}{_lang_suffix(lang)}.zip"
+    csv_file = f"{table}.csv"
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        with _open_table_csv(source, csv_file) as myfile:
+            header = myfile.readline()
+            partial = _aggregate_stream(
+                myfile,
+                _header_columns(header),
+                _csv_options(header),
+                by,
+                value,
+                chunksize,
+            )
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = pathlib.Path(tmp_dir) / csv_file
+            with (
+                _open_table_csv(source, csv_file) as src,
+                open(csv_path, "wb") as dest,
+            ):
+                shutil.copyfileobj(src, dest, length=2**20)
+            with open(csv_path, "rb") as f:
+                header = f.readline()
+                data_start = f.tell()
+            col_names = _header_columns(header)
+            ranges = _line_aligned_ranges(
+                csv_path, data_start, processes * _RANGES_PER_PROCESS
+            )
+            args = [
+                (csv_path, a, b, col_names, _csv_options(header), by, value, chunksize)
+                for a, b in ranges
+            ]
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                partials = list(pool.map(_aggregate_csv_range, *zip(*args)))
+        partial = _merge_partials(partials, by)
+    if len(by) == 1 and isinstance(partial.index, pd.MultiIndex):
+        partial.index = partial.index.get_level_values(0)
+
+    result = pd.DataFrame(index=partial.index)
+    for agg in aggs:
+        if agg == "mean":
+            result[agg] = partial["sum"] / partial["count"].where(partial["count"] > 0)
+        elif agg == "count":
+            result[agg] = partial["count"].astype("int64")
+        else:
+            result[agg] = partial[agg]
+    ref_col = next((c for c in by if _ENGLISH_COLUMNS.get(c, c) == "REF_DATE"), None)
+    if ref_col is not None:
+        frame = result.index.to_frame(index=False)
+        frame[ref_col] = parse_ref_dates(frame[ref_col], _table_frequency(table, path))
+        result.index = (
+            pd.MultiIndex.from_frame(frame)
+            if len(by) > 1
+            else (pd.Index(frame[ref_col], name=ref_col))
+        )
+    return result.sort_index()
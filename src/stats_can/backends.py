@@ -0,0 +1,208 @@
+"""Build pyarrow Tables or Polars DataFrames instead of pandas ones.
+
+`stats_can.sc.vectors_to_df`, `stats_can.sc.zip_table_to_dataframe` and
+`stats_can.sc.code_sets_to_df_dict` take a ``backend`` argument, or use the
+one set with `set_backend`:
+
+- ``"pandas"`` (the default): pandas DataFrames as always
+- ``"arrow"``: pyarrow Tables, built straight from the WDS JSON or parsed by
+  pyarrow's multithreaded CSV reader. Label columns are dictionary encoded,
+  so a large table's repeated strings are stored once.
+- ``"polars"``: Polars DataFrames, made from the arrow Tables without a copy
+
+Tables are built without going through pandas, so neither backend pays for
+pandas' object strings. Install the ``arrow`` extra for either, and Polars
+for the latter. Neither has a period type, so only ``ref_date="timestamp"``
+is supported; vector data has its reference periods in a ``refPer`` column.
+
+The backend only applies to what these functions return to the caller. The
+table store, the vector fetch planner and the mirror always load pandas
+frames, whatever backend is set.
+"""
+
+import importlib
+import pathlib
+
+from stats_can.sc import (
+    _ENGLISH_COLUMNS,
+    _POSSIBLE_CATS,
+    _csv_options,
+    _header_columns,
+    _normalize_ref_date,
+    _open_table_csv,
+)
+
+BACKENDS = ("pandas", "arrow", "polars")
+_settings = {"backend": "pandas"}
+
+
+def set_backend(backend: str) -> None:
+    """Set what the DataFrame building functions return by default.
+
+    Parameters
+    ----------
+    backend
+        one of ``"pandas"``, ``"arrow"`` or ``"polars"``
+    """
+    _settings["backend"] = _resolve(backend)
+
+
+def get_backend() -> str:
+    """The backend used when a call doesn't pick one.
+
+    Returns
+    -------
+    :
+        one of ``"pandas"``, ``"arrow"`` or ``"polars"``
+    """
+    return _settings["backend"]
+
+
+def _resolve(backend: str | None, ref_date: str = "timestamp") -> str:
+    """The backend a call uses, checking it can give what was asked for."""
+    backend = backend or _settings["backend"]
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, not {backend!r}")
+    if backend != "pandas" and ref_date != "timestamp":
+        raise ValueError(f"the {backend} backend only supports ref_date='timestamp'")
+    return backend
+
+
+def _import(module: str, backend: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"the {backend} backend needs {module.split('.')[0]}, install the "
+            "arrow extra (and polars for the polars backend)"
+        ) from e
+
+
+def _output(table, backend: str):
+    """An arrow Table in the requested backend's type."""
+    if backend == "polars":
+        return _import("polars", backend).from_arrow(table)
+    return table
+
+
+def _parse_ref_dates(ref_dates, pa):
+    """REF_DATE strings as timestamps, parsing each distinct string once."""
+    pc = importlib.import_module("pyarrow.compute")
+    chunks = []
+    for chunk in ref_dates.chunks:
+        if not pa.types.is_dictionary(chunk.type):
+            chunk = pc.dictionary_encode(chunk)
+        labels = [_normalize_ref_date(label) for label in chunk.dictionary.to_pylist()]
+        parsed = pc.strptime(
+            pa.array(labels, pa.string()),
+            format="%Y-%m-%d",
+            unit="s",
+            error_is_null=True,
+        )
+        chunks.append(parsed.take(chunk.indices))
+    return pa.chunked_array(chunks, pa.timestamp("s"))
+
+
+def vector_data_to_table(start_list: list, backend: str = "arrow"):
+    """One column per VectorData plus refPer, like `stats_can.sc.vectors_to_df`.
+
+    Parameters
+    ----------
+    start_list
+        VectorData as returned by the scwds vector functions
+    backend
+        ``"arrow"`` or ``"polars"``
+
+    Returns
+    -------
+    :
+        a refPer column sorted ascending and one float column per vector
+        that has data, null where it has no value for a period
+    """
+    pa = _import("pyarrow", backend)
+    vectors = [vec for vec in start_list if vec["vectorDataPoint"]]
+    # refPer is always YYYY-MM-DD so sorting the strings sorts the dates
+    refs = sorted(
+        {point["refPer"] for vec in vectors for point in vec["vectorDataPoint"]}
+    )
+    position = {ref: i for i, ref in enumerate(refs)}
+    columns = {"refPer": _parse_ref_dates(pa.chunked_array([refs], pa.string()), pa)}
+    for vec in vectors:
+        values = [None] * len(refs)
+        for point in vec["vectorDataPoint"]:
+            value = point["value"]
+            values[position[point["refPer"]]] = None if value is None else float(value)
+        columns["v" + str(vec["vectorId"])] = pa.array(values, pa.float64())
+    return _output(pa.table(columns), backend)
+
+
+def read_table_zip(table_zip: pathlib.Path, csv_file: str, backend: str = "arrow"):
+    """Parse a full table CSV with pyarrow's multithreaded reader.
+
+    Parameters
+    ----------
+    table_zip
+        the downloaded table zip, or a copy recompressed by
+        `stats_can.transcode`
+    csv_file
+        name of the CSV inside it
+    backend
+        ``"arrow"`` or ``"polars"``
+
+    Returns
+    -------
+    :
+        the table with label columns dictionary encoded, VALUE as float and
+        REF_DATE parsed to the start of each period
+    """
+    pa = _import("pyarrow", backend)
+    csv = _import("pyarrow.csv", backend)
+    with _open_table_csv(table_zip, csv_file) as myfile:
+        header = myfile.readline()
+        col_names = _header_columns(header)
+        csv_options = _csv_options(header)
+        labels = pa.dictionary(pa.int32(), pa.string())
+        column_types = {}
+        for col in col_names:
+            name = _ENGLISH_COLUMNS.get(col, col)
+            if name == "VALUE":
+                column_types[col] = pa.float64()
+            elif name in _POSSIBLE_CATS or name == "REF_DATE":
+                column_types[col] = labels
+            else:
+                column_types[col] = pa.string()
+        table = csv.read_csv(
+            myfile,
+            read_options=csv.ReadOptions(column_names=col_names),
+            parse_options=csv.ParseOptions(delimiter=csv_options.get("sep", ",")),
+            convert_options=csv.ConvertOptions(
+                column_types=column_types,
+                decimal_point=csv_options.get("decimal", "."),
+                strings_can_be_null=True,
+            ),
+        )
+    ref_col = next(c for c in col_names if _ENGLISH_COLUMNS.get(c, c) == "REF_DATE")
+    i = table.column_names.index(ref_col)
+    table = table.set_column(i, ref_col, _parse_ref_dates(table[ref_col], pa))
+    return _output(table, backend)
+
+
+def code_sets_to_tables(codes: dict, backend: str = "arrow") -> dict:
+    """Each code set as a table, like `stats_can.sc.code_sets_to_df_dict`.
+
+    Parameters
+    ----------
+    codes
+        code sets as returned by `stats_can.scwds.get_code_sets`
+    backend
+        ``"arrow"`` or ``"polars"``
+
+    Returns
+    -------
+    :
+        dictionary of tables
+    """
+    pa = _import("pyarrow", backend)
+    return {
+        key: _output(pa.Table.from_pylist(rows), backend) for key, rows in codes.items()
+    }
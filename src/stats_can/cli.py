@@ -0,0 +1,128 @@
+"""The ``stats-can`` command.
+
+``stats-can mirror`` keeps a directory of tables and vectors up to date. It
+refreshes straight away, then again a few minutes after every 8:30 Eastern
+release until stopped; ``--once`` stops after the first refresh.
+"""
+
+import argparse
+import datetime as dt
+import json
+import logging
+import pathlib
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="stats-can", description="Work with Statistics Canada data."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    mirror = commands.add_parser(
+        "mirror", help="keep a local copy of tables and vectors up to date"
+    )
+    mirror.add_argument(
+        "--path",
+        type=pathlib.Path,
+        default=pathlib.Path(),
+        help="mirror directory (default: current directory)",
+    )
+    mirror.add_argument(
+        "--table",
+        action="append",
+        default=[],
+        dest="tables",
+        help="table to keep, can be repeated (default: tables already there)",
+    )
+    mirror.add_argument(
+        "--vector",
+        action="append",
+        default=[],
+        dest="vectors",
+        help="vector to keep in vectors.csv, can be repeated",
+    )
+    mirror.add_argument(
+        "--config",
+        type=pathlib.Path,
+        help='JSON file like {"tables": [...], "vectors": [...]}',
+    )
+    mirror.add_argument(
+        "--workers", type=int, default=4, help="tables to download at once"
+    )
+    mirror.add_argument(
+        "--periods", type=int, default=120, help="periods of each vector to keep"
+    )
+    mirror.add_argument(
+        "--delay",
+        type=float,
+        default=5,
+        help="minutes after each 8:30 release to refresh (default: 5)",
+    )
+    mirror.add_argument("--once", action="store_true", help="refresh once and exit")
+    return parser
+
+
+def _watch_list(args: argparse.Namespace) -> tuple[list[str] | None, list[str]]:
+    tables, vectors = list(args.tables), list(args.vectors)
+    if args.config:
+        with open(args.config) as json_file:
+            config = json.load(json_file)
+        tables += [str(t) for t in config.get("tables", [])]
+        vectors += [str(v) for v in config.get("vectors", [])]
+    return tables or None, vectors
+
+
+def _mirror(args: argparse.Namespace) -> int:
+    from stats_can.mirror import next_release, refresh_mirror
+
+    tables, vectors = _watch_list(args)
+    while True:
+        try:
+            report = refresh_mirror(
+                args.path,
+                tables=tables,
+                vectors=vectors,
+                workers=args.workers,
+                periods=args.periods,
+            )
+        except Exception:
+            if args.once:
+                raise
+            # network trouble or another run holding the lock shouldn't end
+            # the daemon, the next release gets another try
+            logger.exception("Mirror refresh failed")
+        else:
+            print(json.dumps(report), flush=True)
+            if args.once:
+                return 0
+        wake = next_release() + dt.timedelta(minutes=args.delay)
+        logger.info("Next refresh at %s", wake.isoformat(timespec="minutes"))
+        time.sleep(max((wake - dt.datetime.now(wake.tzinfo)).total_seconds(), 0))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the ``stats-can`` command.
+
+    Parameters
+    ----------
+    argv
+        command line arguments, defaults to ``sys.argv[1:]``
+
+    Returns
+    -------
+    :
+        exit status
+    """
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+    if args.command == "mirror":
+        try:
+            return _mirror(args)
+        except RuntimeError as exc:
+            logger.error("%s", exc)
+            return 1
+    return 2  # pragma: no cover - argparse rejects unknown commands
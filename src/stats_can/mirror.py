@@ -0,0 +1,276 @@
+"""Keep a local directory of tables and vectors in step with StatsCan.
+
+`refresh_mirror` does one pass: it works out which of the watched tables
+have changed since the last pass from the changed cube lists, downloads
+those concurrently, and refetches just the watched vectors in
+``vectors.csv`` that have had a release since then. The ``stats-can mirror`` command runs it on StatsCan's release
+schedule. Each pass holds a lock file in the mirror directory so two passes
+can never write to it at once.
+"""
+
+import contextlib
+import datetime as dt
+import json
+import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from stats_can.helpers import parse_tables, parse_vectors
+from stats_can.sc import (
+    changed_tables_in_range,
+    download_tables,
+    list_zipped_tables,
+    vectors_to_df,
+)
+from stats_can.scwds import get_bulk_vector_data_by_range, get_changed_series_list
+
+logger = logging.getLogger(__name__)
+
+RELEASE_TIMEZONE = ZoneInfo("America/Toronto")
+RELEASE_TIME = dt.time(8, 30)
+LOCK_FILE = ".stats_can_mirror.lock"
+STATE_FILE = ".stats_can_mirror.json"
+VECTORS_FILE = "vectors.csv"
+
+
+@contextlib.contextmanager
+def mirror_lock(path: pathlib.Path):
+    """Hold the mirror directory's lock file for the length of the block.
+
+    The lock is an OS level lock on the file, so it's released even if the
+    process holding it dies.
+
+    Parameters
+    ----------
+    path
+        mirror directory
+
+    Yields
+    ------
+    pathlib.Path
+        the lock file
+
+    Raises
+    ------
+    RuntimeError
+        if another process holds the lock
+    """
+    lock_file = pathlib.Path(path) / LOCK_FILE
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            _lock(fd)
+        except OSError as exc:
+            raise RuntimeError(f"Another mirror run holds {lock_file}") from exc
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        yield lock_file
+    finally:
+        os.close(fd)
+
+
+def _lock(fd: int) -> None:
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows
+        import msvcrt
+
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _read_state(path: pathlib.Path) -> dict:
+    try:
+        with open(path / STATE_FILE) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _zip_mtimes(path: pathlib.Path, tables: list[str]) -> dict[str, int]:
+    mtimes = {}
+    for table in tables:
+        zip_file = path / f"{table}-eng.zip"
+        mtimes[table] = zip_file.stat().st_mtime_ns if zip_file.exists() else 0
+    return mtimes
+
+
+def _read_vectors(vectors_file: pathlib.Path) -> pd.DataFrame:
+    if not vectors_file.exists():
+        return pd.DataFrame()
+    return pd.read_csv(vectors_file, index_col="refPer", parse_dates=["refPer"])
+
+
+def _changed_vectors(
+    known: list[int], last_run: str | None, today: dt.date
+) -> list[int]:
+    """Watched vectors already in vectors.csv that had a release since last_run."""
+    if not known:
+        return []
+    if last_run is None:
+        # no record of when they were fetched, so they may all be stale
+        return known
+    if last_run == str(today):
+        changed_today = {c["vectorId"] for c in get_changed_series_list()}
+        return [v for v in known if v in changed_today]
+    # the changed series list only covers today, ask for the points released
+    # since the last refresh instead, which is empty for unchanged vectors
+    released = get_bulk_vector_data_by_range(
+        known, dt.date.fromisoformat(last_run), today
+    )
+    changed = {data["vectorId"] for data in released if data["vectorDataPoint"]}
+    return [v for v in known if v in changed]
+
+
+def _refresh_vectors(
+    path: pathlib.Path,
+    vectors: list[str],
+    periods: int,
+    last_run: str | None,
+    today: dt.date,
+) -> tuple[int, int]:
+    """Refetch the watched vectors that are new or changed into vectors.csv.
+
+    Returns how many vectors were refetched and the bytes written.
+    """
+    vectors_file = path / VECTORS_FILE
+    stored = _read_vectors(vectors_file)
+    watched = list(dict.fromkeys(parse_vectors(vectors)))
+    have = {int(col[1:]) for col in stored.columns}
+    new = [v for v in watched if v not in have]
+    refetch = new + _changed_vectors([v for v in watched if v in have], last_run, today)
+    columns = [f"v{v}" for v in watched]
+    if not refetch and list(stored.columns) == columns:
+        return 0, 0
+    fresh = (
+        vectors_to_df(refetch, periods, backend="pandas") if refetch else pd.DataFrame()
+    )
+    kept = stored.drop(columns=fresh.columns, errors="ignore")
+    df = pd.concat([kept, fresh], axis=1).sort_index()
+    df = df.reindex(columns=[c for c in columns if c in df.columns])
+    df.index.name = "refPer"
+    df.dropna(how="all").to_csv(vectors_file)
+    return len(refetch), vectors_file.stat().st_size
+
+
+def refresh_mirror(
+    path: pathlib.Path | None = None,
+    tables: list[str] | None = None,
+    vectors: list[str] | None = None,
+    workers: int = 4,
+    periods: int = 120,
+    today: dt.date | None = None,
+) -> dict:
+    """Bring the mirror in path up to date once.
+
+    Tables are checked against the changed cube list for every day since the
+    last refresh (every watched table is checked on the first one, which the
+    conditional downloads in `stats_can.sc.download_tables` keep cheap).
+    Changed tables are downloaded ``workers`` at a time. Only watched
+    vectors that aren't in ``vectors.csv`` yet, or that had a release since
+    the last refresh, are refetched into it: from today's changed series
+    list when the last refresh was today, otherwise from the points released
+    since it.
+
+    Parameters
+    ----------
+    path
+        mirror directory, defaults to the current working directory
+    tables
+        tables to keep, defaults to every table already in path
+    vectors
+        vectors to keep in ``vectors.csv``
+    workers
+        tables to download at once
+    periods
+        most recent periods of each vector to keep
+    today
+        date to refresh as of, defaults to today in Ottawa
+
+    Returns
+    -------
+    :
+        what the refresh did: the date it refreshed as of, how long it took,
+        which tables and how many vectors it updated, and the bytes it wrote
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    path.mkdir(parents=True, exist_ok=True)
+    today = today or dt.datetime.now(RELEASE_TIMEZONE).date()
+    started = time.perf_counter()
+    with mirror_lock(path):
+        state = _read_state(path)
+        if tables is None:
+            tables = [str(t["productId"]) for t in list_zipped_tables(path)]
+        tables = parse_tables(tables)
+        last_run = state.get("last_run")
+        if last_run is None:
+            stale = list(tables)
+        else:
+            releases = changed_tables_in_range(
+                dt.date.fromisoformat(last_run), today, path=path
+            )
+            changed = {str(t) for t in releases.index}
+            missing = [t for t in tables if not (path / f"{t}.json").exists()]
+            stale = [t for t in tables if t in changed or t in missing]
+        before = _zip_mtimes(path, stale)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda t: download_tables([t], path), stale))
+        after = _zip_mtimes(path, stale)
+        updated = [t for t in stale if after[t] != before[t]]
+        bytes_written = sum((path / f"{t}-eng.zip").stat().st_size for t in updated)
+
+        vectors_updated = 0
+        if vectors:
+            vectors_updated, vectors_bytes = _refresh_vectors(
+                path, vectors, periods, last_run, today
+            )
+            bytes_written += vectors_bytes
+
+        with open(path / STATE_FILE, "w") as outfile:
+            json.dump({"last_run": str(today)}, outfile)
+    report = {
+        "date": str(today),
+        "seconds": round(time.perf_counter() - started, 3),
+        "tables_checked": len(stale),
+        "tables_updated": updated,
+        "vectors_updated": vectors_updated,
+        "bytes_written": bytes_written,
+    }
+    logger.info(
+        "Mirror refresh took %.1fs: %d of %d tables updated, %d vectors, %d bytes",
+        report["seconds"],
+        len(updated),
+        len(stale),
+        vectors_updated,
+        bytes_written,
+    )
+    return report
+
+
+def next_release(now: dt.datetime | None = None) -> dt.datetime:
+    """The next weekday 8:30 Eastern, when StatsCan publishes releases.
+
+    Parameters
+    ----------
+    now
+        time to look forward from (timezone aware), defaults to the current
+        time
+
+    Returns
+    -------
+    :
+        next release time in Eastern time
+    """
+    now = (now or dt.datetime.now(RELEASE_TIMEZONE)).astimezone(RELEASE_TIMEZONE)
+    candidate = dt.datetime.combine(now.date(), RELEASE_TIME, RELEASE_TIMEZONE)
+    if candidate <= now:
+        candidate += dt.timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += dt.timedelta(days=1)
+    return candidate
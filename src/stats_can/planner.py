@@ -0,0 +1,262 @@
+"""Fetch vectors by whichever route is cheaper for each of their tables.
+
+Vectors can come from the WDS vector endpoints or out of their table's full
+download. The vector endpoints cost little per request but a lot per data
+point, a full table costs about the same per row whatever is needed from it.
+`plan_vector_fetch` estimates both for every table the vectors belong to,
+from the cube metadata's ``nbSeriesCube`` and ``nbDatapointsCube`` and the
+number of vectors and periods asked for, and `fetch_vectors` runs the plan.
+
+The costs are in rows of a full table download. They're rough, so the
+constants below can be tuned for a given connection.
+"""
+
+import datetime as dt
+import math
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from stats_can.helpers import parse_vectors
+from stats_can.sc import (
+    _table_source,
+    _vector_data_to_df,
+    download_tables,
+    zip_table_to_dataframe,
+)
+from stats_can.scwds import (
+    _MAX_CHUNK_VECTORS,
+    _TARGET_CHUNK_POINTS,
+    _months_between,
+    get_bulk_vector_data_by_reference_period_range,
+    get_cube_metadata,
+    get_data_from_vectors_and_latest_n_periods,
+    get_series_info_from_vector,
+)
+
+# A data point from the vector endpoints (around 300 bytes of JSON, then
+# validated) against a row of a zipped table CSV (around 15 bytes)
+POINT_COST = 20.0
+# Round trip of one WDS request
+REQUEST_COST = 2_000.0
+# A table whose zip is already in path usually only needs parsing, the
+# download is conditional
+LOCAL_TABLE_COST = 0.5
+
+
+def _window_fraction(
+    meta: dict, start_ref_date: dt.date | None, end_ref_date: dt.date | None
+) -> float:
+    """Share of a cube's reference periods that fall in the requested range."""
+    if not meta.get("cubeStartDate") or not meta.get("cubeEndDate"):
+        return 1.0
+    cube_start = dt.date.fromisoformat(meta["cubeStartDate"][:10])
+    cube_end = dt.date.fromisoformat(meta["cubeEndDate"][:10])
+    start = max(start_ref_date or cube_start, cube_start)
+    end = min(end_ref_date or cube_end, cube_end)
+    if end < start:
+        return 0.0
+    return _months_between(start, end) / _months_between(cube_start, cube_end)
+
+
+def _route_costs(
+    meta: dict,
+    n_vectors: int,
+    periods: int | None,
+    start_ref_date: dt.date | None,
+    end_ref_date: dt.date | None,
+    local: bool,
+) -> tuple[float, float]:
+    """Estimated cost of the vector endpoints and of the full table."""
+    per_series = meta["nbDatapointsCube"] / max(meta["nbSeriesCube"], 1)
+    if periods is not None:
+        points = n_vectors * min(periods, per_series)
+    else:
+        fraction = _window_fraction(meta, start_ref_date, end_ref_date)
+        points = n_vectors * per_series * fraction
+    requests = max(
+        math.ceil(n_vectors / _MAX_CHUNK_VECTORS),
+        math.ceil(points / _TARGET_CHUNK_POINTS),
+    )
+    vector_cost = points * POINT_COST + requests * REQUEST_COST
+    # metadata, the download url and the zip itself
+    table_cost = meta["nbDatapointsCube"] * (LOCAL_TABLE_COST if local else 1.0)
+    table_cost += 3 * REQUEST_COST
+    return vector_cost, table_cost
+
+
+def plan_vector_fetch(
+    vectors: str | list[str],
+    periods: int | None = 1,
+    start_ref_date: dt.date | None = None,
+    end_ref_date: dt.date | None = None,
+    path: pathlib.Path | None = None,
+) -> list[dict]:
+    """Choose between the vector endpoints and a full download for each table.
+
+    Parameters
+    ----------
+    vectors
+        vector numbers to fetch
+    periods
+        latest periods of each vector to fetch, ignored if a reference period
+        range is given
+    start_ref_date
+        start of the reference period range to fetch
+    end_ref_date
+        end of the reference period range to fetch
+    path
+        where tables are or would be downloaded, tables already there are
+        cheaper to use, defaults to the current working directory
+
+    Returns
+    -------
+    :
+        one dict per table with its ``productId``, the ``vectors`` in it, the
+        ``route`` picked (``"vectors"`` or ``"table"``), the ``vector_cost``
+        and ``table_cost`` estimates behind the choice and the table's
+        ``cubeStartDate``
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    if start_ref_date is not None or end_ref_date is not None:
+        periods = None
+    by_table: dict[str, list[int]] = {}
+    for info in get_series_info_from_vector(vectors):
+        vector_ids = by_table.setdefault(str(info["productId"]), [])
+        if info["vectorId"] not in vector_ids:
+            vector_ids.append(info["vectorId"])
+    plan = []
+    for meta in get_cube_metadata(list(by_table)):
+        table = str(meta["productId"])
+        vector_cost, table_cost = _route_costs(
+            meta,
+            len(by_table[table]),
+            periods,
+            start_ref_date,
+            end_ref_date,
+            local=_table_source(table, path) is not None,
+        )
+        plan.append(
+            {
+                "productId": table,
+                "vectors": by_table[table],
+                "route": "vectors" if vector_cost <= table_cost else "table",
+                "vector_cost": vector_cost,
+                "table_cost": table_cost,
+                "cubeStartDate": meta.get("cubeStartDate"),
+            }
+        )
+    return plan
+
+
+def _fetch_by_api(
+    vectors: list[int],
+    periods: int | None,
+    start_ref_date: dt.date | None,
+    end_ref_date: dt.date | None,
+) -> pd.DataFrame:
+    if periods is not None:
+        data = get_data_from_vectors_and_latest_n_periods(vectors, periods)
+    else:
+        data = get_bulk_vector_data_by_reference_period_range(
+            vectors, start_ref_date, end_ref_date or dt.date.today()
+        )
+    return _vector_data_to_df(data)
+
+
+def _fetch_by_table(
+    table: str,
+    vectors: list[int],
+    periods: int | None,
+    start_ref_date: dt.date | None,
+    end_ref_date: dt.date | None,
+    path: pathlib.Path,
+) -> pd.DataFrame:
+    download_tables([table], path)
+    df = zip_table_to_dataframe(table, path=path, backend="pandas")
+    names = [f"v{v}" for v in vectors]
+    df = df.loc[df["VECTOR"].isin(names), ["REF_DATE", "VECTOR", "VALUE"]]
+    df["VECTOR"] = df["VECTOR"].astype(str)
+    if periods is not None:
+        df = df.sort_values("REF_DATE").groupby("VECTOR").tail(periods)
+    else:
+        if start_ref_date is not None:
+            df = df[df["REF_DATE"] >= pd.Timestamp(start_ref_date)]
+        if end_ref_date is not None:
+            df = df[df["REF_DATE"] <= pd.Timestamp(end_ref_date)]
+    wide = df.pivot(index="REF_DATE", columns="VECTOR", values="VALUE")
+    wide.index.name = "refPer"
+    wide.columns.name = None
+    return wide
+
+
+def fetch_vectors(
+    vectors: str | list[str],
+    periods: int | None = 1,
+    start_ref_date: dt.date | None = None,
+    end_ref_date: dt.date | None = None,
+    path: pathlib.Path | None = None,
+    workers: int = 4,
+) -> pd.DataFrame:
+    """Get vectors the cheapest way, as one DataFrame like `vectors_to_df`'s.
+
+    Vectors of tables planned for the vector endpoints are fetched together
+    in one chunked call, and tables planned for a full download are
+    downloaded (conditionally, see `stats_can.sc.download_tables`) to path
+    and read. These all run at once on ``workers`` threads.
+
+    Parameters
+    ----------
+    vectors
+        vector numbers to fetch
+    periods
+        latest periods of each vector to fetch, ignored if a reference period
+        range is given
+    start_ref_date
+        start of the reference period range to fetch
+    end_ref_date
+        end of the reference period range to fetch
+    path
+        where to download tables, defaults to the current working directory
+    workers
+        routes to run at once
+
+    Returns
+    -------
+    :
+        vectors as columns in the order asked for, reference period as the
+        index
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    if start_ref_date is not None or end_ref_date is not None:
+        periods = None
+    plan = plan_vector_fetch(vectors, periods, start_ref_date, end_ref_date, path)
+    api_plan = [p for p in plan if p["route"] == "vectors"]
+    api_vectors = [v for p in api_plan for v in p["vectors"]]
+    window = (periods, start_ref_date, end_ref_date)
+    if periods is None and start_ref_date is None:
+        # only an end was given, so start where the earliest table does
+        starts = [p["cubeStartDate"][:10] for p in api_plan if p["cubeStartDate"]]
+        api_start = dt.date.fromisoformat(min(starts)) if starts else dt.date(1, 1, 1)
+    else:
+        api_start = start_ref_date
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_fetch_by_table, p["productId"], p["vectors"], *window, path)
+            for p in plan
+            if p["route"] == "table"
+        ]
+        if api_vectors:
+            futures.append(
+                pool.submit(
+                    _fetch_by_api, api_vectors, periods, api_start, end_ref_date
+                )
+            )
+        frames = [f.result() for f in futures]
+    frames = [f for f in frames if not f.columns.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, axis=1, sort=True)
+    order = dict.fromkeys(f"v{v}" for v in parse_vectors(vectors))
+    return df[[c for c in order if c in df.columns]]
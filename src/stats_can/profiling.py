@@ -0,0 +1,185 @@
+"""Opt-in time and memory profiles of table and vector loads.
+
+When a big table runs a worker out of memory it's rarely obvious which part
+of the load did it. Inside `profile`, `stats_can.sc.zip_table_to_dataframe`
+and `stats_can.sc.vectors_to_df` record each stage they go through:
+
+- ``decompress``: writing the CSV to a temporary file for parallel parsing
+- ``header``: reading the header line
+- ``csv_parse``: parsing the rows (with processes, in the workers)
+- ``categories``: encoding label columns as categoricals
+- ``concat``: stacking parallel pieces, or joining vectors' series
+- ``download`` and ``series``: fetching vectors and building their series
+- ``dates``: parsing REF_DATE or refPer
+
+For each stage the profile has its wall time, how far tracemalloc's traced
+memory peaked above where it started (Python allocations, including pandas'
+and numpy's buffers), how much the process's peak RSS grew, and the deep
+memory of the frame the stage produced. Only this process is measured, so
+memory used by parallel parsing's workers isn't counted.
+
+Profiling traces allocations and deep-sizes frames, so it slows loads down;
+leave it off outside of investigations and benchmarks.
+"""
+
+import contextlib
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+import pandas as pd
+
+from stats_can import sc
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_MIB = 2**20
+
+
+def _max_rss() -> int | None:
+    """The process's peak resident set size in bytes so far."""
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _frame_mib(frame) -> float | None:
+    """Deep memory of a DataFrame or Series, index included."""
+    if frame is None:
+        return None
+    usage = frame.memory_usage(deep=True, index=True)
+    return float(usage.sum() if isinstance(usage, pd.Series) else usage) / _MIB
+
+
+class _Stage:
+    """Where a stage gives the profile what it built."""
+
+    frame = None
+
+
+class LoadProfile:
+    """The stages of the loads run inside `profile`, in the order they ran.
+
+    Each stage is a dict with its ``stage`` name, ``seconds``,
+    ``traced_peak_mib`` (traced memory's peak above where the stage started),
+    ``max_rss_growth_mib`` (how much the process's peak RSS rose, None where
+    the platform can't tell), ``max_rss_mib`` (the process's peak RSS after
+    it) and ``frame_mib`` (the deep size of what it built, None if it didn't
+    build a frame).
+    """
+
+    def __init__(self):
+        self.stages: list[dict] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[_Stage]:
+        """Record a stage of a load, see `stats_can.sc._stage`."""
+        stage = _Stage()
+        tracemalloc.reset_peak()
+        traced_start, _ = tracemalloc.get_traced_memory()
+        rss_start = _max_rss()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            seconds = time.perf_counter() - start
+            _, traced_peak = tracemalloc.get_traced_memory()
+            rss_end = _max_rss()
+            self.stages.append(
+                {
+                    "stage": name,
+                    "seconds": seconds,
+                    "traced_peak_mib": max(traced_peak - traced_start, 0) / _MIB,
+                    "max_rss_growth_mib": (
+                        None if rss_end is None else (rss_end - rss_start) / _MIB
+                    ),
+                    "max_rss_mib": None if rss_end is None else rss_end / _MIB,
+                    "frame_mib": _frame_mib(stage.frame),
+                }
+            )
+
+    def __getitem__(self, name: str) -> dict:
+        """The last stage recorded with a name.
+
+        Raises
+        ------
+        KeyError
+            if no stage had that name
+        """
+        for stage in reversed(self.stages):
+            if stage["stage"] == name:
+                return stage
+        raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return any(stage["stage"] == name for stage in self.stages)
+
+    @property
+    def seconds(self) -> float:
+        """Total wall time of the recorded stages."""
+        return sum(stage["seconds"] for stage in self.stages)
+
+    @property
+    def peak_stage(self) -> str | None:
+        """The stage whose traced memory peaked highest."""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda stage: stage["traced_peak_mib"])["stage"]
+
+    def to_df(self) -> pd.DataFrame:
+        """The stages as a DataFrame, one row each in the order they ran.
+
+        Returns
+        -------
+        :
+            a column for each of the stages' keys
+        """
+        return pd.DataFrame(
+            self.stages,
+            columns=[
+                "stage",
+                "seconds",
+                "traced_peak_mib",
+                "max_rss_growth_mib",
+                "max_rss_mib",
+                "frame_mib",
+            ],
+        )
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[LoadProfile]:
+    """Profile the table and vector loads run inside the block.
+
+    Starts tracemalloc if it isn't running and stops it again after. Traced
+    memory's peak is reset at the start of every stage, which also resets it
+    for anyone else watching it.
+
+    Yields
+    ------
+    :
+        the profile, filled in as stages finish
+
+    Examples
+    --------
+    >>> with profile() as report:  # doctest: +SKIP
+    ...     df = sc.zip_table_to_dataframe("18100204")
+    >>> report.to_df()  # doctest: +SKIP
+    """
+    report = LoadProfile()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    token = sc._PROFILE.set(report)
+    try:
+        yield report
+    finally:
+        sc._PROFILE.reset(token)
+        if started:
+            tracemalloc.stop()
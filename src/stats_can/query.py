@@ -0,0 +1,228 @@
+"""Query a directory of downloaded tables with SQL through DuckDB.
+
+`connect` opens a DuckDB connection where every table downloaded to a
+directory is a view named ``t<productId>``, so a query scans just the
+columns and row groups it needs, in parallel, instead of loading each table
+into pandas first:
+
+- a table with a `stats_can.table_store` store is read straight from its
+  memory maps, label columns as dictionaries over the stored codes
+- any other table is read from ``<productId>.parquet``, written next to the
+  zip the first time and again whenever the zip changes
+
+Two lookup tables come from the ``<productId>.json`` metadata:
+
+- ``cubes``: productId, titles, frequencyCode, start and end dates and
+  releaseTime of each table
+- ``members``: productId, dimensionPositionId, dimension names, memberId,
+  parentMemberId, member names, classificationCode, terminated and
+  memberUomCode of every dimension member
+
+COORDINATE holds the memberIds of a row in dimension position order, so
+``split_part(COORDINATE, '.', dimensionPositionId)::INTEGER = memberId``
+joins rows to their members. Install the ``duckdb`` extra to use this.
+"""
+
+import json
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from stats_can.backends import read_table_zip
+from stats_can.helpers import parse_tables
+from stats_can.sc import _table_source, list_zipped_tables
+from stats_can.table_store import NAT_DAYS, TableStore
+
+_CUBE_FIELDS = [
+    "productId",
+    "cubeTitleEn",
+    "cubeTitleFr",
+    "frequencyCode",
+    "cubeStartDate",
+    "cubeEndDate",
+    "releaseTime",
+]
+_DIMENSION_FIELDS = ["dimensionPositionId", "dimensionNameEn", "dimensionNameFr"]
+_MEMBER_FIELDS = [
+    "memberId",
+    "parentMemberId",
+    "memberNameEn",
+    "memberNameFr",
+    "classificationCode",
+    "terminated",
+    "memberUomCode",
+]
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            "querying tables needs duckdb, install the duckdb extra"
+        ) from e
+    return duckdb
+
+
+def _parquet_cache(table: str, path: pathlib.Path) -> pathlib.Path:
+    """Path to a table's Parquet copy, (re)writing it if the zip changed."""
+    import pyarrow.parquet as pq
+
+    source = _table_source(table, path)
+    parquet = path / f"{table}.parquet"
+    source_mtime = str(source.stat().st_mtime_ns).encode()
+    if parquet.is_file():
+        metadata = pq.read_schema(parquet).metadata or {}
+        if metadata.get(b"source_mtime_ns") == source_mtime:
+            return parquet
+    data = read_table_zip(source, f"{table}.csv")
+    data = data.replace_schema_metadata({"source_mtime_ns": source_mtime})
+    tmp = parquet.with_suffix(".parquet.tmp")
+    pq.write_table(data, tmp)
+    tmp.replace(parquet)
+    return parquet
+
+
+def _store_is_current(store_dir: pathlib.Path, source: pathlib.Path) -> bool:
+    with open(store_dir / "manifest.json") as json_file:
+        built_from = json.load(json_file)["source_mtime_ns"]
+    return source.stat().st_mtime_ns == built_from
+
+
+def _store_to_arrow(store: TableStore):
+    """A table store as an arrow Table over its memory maps."""
+    import pyarrow as pa
+
+    columns = {}
+    for col in store.columns:
+        if col == "VALUE":
+            # NaN is how the store writes a missing value
+            columns[col] = pa.array(store.values, from_pandas=True)
+        elif col == "REF_DATE":
+            days = store.ref_date_days
+            missing = days == NAT_DAYS
+            seconds = np.where(missing, 0, days) * 86_400
+            columns[col] = pa.array(seconds, pa.int64(), mask=missing).cast(
+                pa.timestamp("s")
+            )
+        else:
+            codes = store.codes(col)
+            columns[col] = pa.DictionaryArray.from_arrays(
+                pa.array(codes, mask=codes < 0),
+                pa.array(store.labels[col], pa.string()),
+            )
+    return pa.table(columns)
+
+
+def _lookup_tables(metadata: list[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """The cubes and members tables from tables' JSON metadata."""
+    cubes = pd.DataFrame(
+        [{field: meta.get(field) for field in _CUBE_FIELDS} for meta in metadata],
+        columns=_CUBE_FIELDS,
+    )
+    cubes["productId"] = cubes["productId"].astype(str)
+    members = pd.DataFrame(
+        [
+            {
+                "productId": str(meta["productId"]),
+                **{field: dim.get(field) for field in _DIMENSION_FIELDS},
+                **{field: member.get(field) for field in _MEMBER_FIELDS},
+            }
+            for meta in metadata
+            for dim in meta.get("dimension", [])
+            for member in dim.get("member", [])
+        ],
+        columns=["productId", *_DIMENSION_FIELDS, *_MEMBER_FIELDS],
+    )
+    return cubes, members
+
+
+def connect(
+    path: pathlib.Path | None = None,
+    tables: list[str] | None = None,
+    database: str = ":memory:",
+    threads: int | None = None,
+):
+    """Open a DuckDB connection with downloaded tables registered as views.
+
+    Parameters
+    ----------
+    path
+        where the tables were downloaded, defaults to the current working
+        directory
+    tables
+        tables to register, defaults to every one with a zip in path
+    database
+        DuckDB database file to open, defaults to an in-memory one
+    threads
+        threads DuckDB scans with, defaults to every core
+
+    Returns
+    -------
+    :
+        ``duckdb.DuckDBPyConnection`` with a ``t<productId>`` view of each
+        table and the ``cubes`` and ``members`` lookup tables
+
+    Examples
+    --------
+    >>> con = connect("tables")  # doctest: +SKIP
+    >>> con.sql(
+    ...     "SELECT m.memberNameEn AS geo, avg(t.VALUE) AS mean "
+    ...     "FROM t18100204 t JOIN members m ON m.productId = '18100204' "
+    ...     "AND m.dimensionPositionId = 1 "
+    ...     "AND split_part(t.COORDINATE, '.', 1)::INTEGER = m.memberId "
+    ...     "GROUP BY geo"
+    ... ).df()  # doctest: +SKIP
+    """
+    duckdb = _duckdb()
+    path = pathlib.Path(path) if path else pathlib.Path()
+    wanted = None if tables is None else set(parse_tables(tables))
+    # saved metadata has productId as an int, parse_tables gives strings
+    metadata = [
+        meta
+        for meta in list_zipped_tables(path)
+        if _table_source(str(meta["productId"]), path) is not None
+        and (wanted is None or str(meta["productId"]) in wanted)
+    ]
+    config = {} if threads is None else {"threads": threads}
+    con = duckdb.connect(database, config=config)
+    for meta in metadata:
+        table = str(meta["productId"])
+        store_dir = path / f"{table}.store"
+        if store_dir.is_dir() and _store_is_current(
+            store_dir, _table_source(table, path)
+        ):
+            con.register(f"t{table}", _store_to_arrow(TableStore(store_dir)))
+        else:
+            parquet = _parquet_cache(table, path)
+            con.read_parquet(str(parquet)).create_view(f"t{table}")
+    cubes, members = _lookup_tables(metadata)
+    con.register("cubes", cubes)
+    con.register("members", members)
+    return con
+
+
+def query(sql: str, path: pathlib.Path | None = None, **kwargs) -> pd.DataFrame:
+    """Run one SQL query over downloaded tables.
+
+    Parameters
+    ----------
+    sql
+        the query, over the views and lookup tables described in `connect`
+    path
+        where the tables were downloaded, defaults to the current working
+        directory
+    **kwargs
+        passed on to `connect`
+
+    Returns
+    -------
+    :
+        the result as a pandas DataFrame
+    """
+    con = connect(path, **kwargs)
+    try:
+        return con.sql(sql).df()
+    finally:
+        con.close()
@@ -3,24 +3,34 @@
 Todo
 ----
 Function to delete tables
-
-Extend getChangedCubeList with a function that returns all tables updated
-within a date range
 """
 
+import contextlib
+import contextvars
+import hashlib
+import io
+import itertools
 import json
 import logging
+import os
 import pathlib
+import shutil
+import tempfile
+import types
 import zipfile
 import datetime as dt
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 import pandas as pd
-from tqdm import tqdm
+from pandas.api.types import union_categoricals
 
 from stats_can.helpers import parse_tables
 from stats_can.scwds import (
-    _session,
+    _get_session,
     get_bulk_vector_data_by_range,
+    get_changed_cube_list,
     get_code_sets,
     get_cube_metadata,
     get_data_from_vectors_and_latest_n_periods,
@@ -28,6 +38,10 @@ from stats_can.scwds import (
     get_series_info_from_vector,
 )
 
+if TYPE_CHECKING:
+    import polars as pl
+    import pyarrow as pa
+
 logger = logging.getLogger(__name__)
 
 
@@ -78,11 +92,131 @@ def table_subsets_from_vectors(vectors: str | list[str]) -> dict[str, list[str]]
     return tables_dict
 
 
+def _download_state_file(zip_file: pathlib.Path) -> pathlib.Path:
+    """Where the ETag, Last-Modified and hash of a downloaded zip are kept.
+
+    It's deliberately not named like table metadata and has no productId, so
+    `list_zipped_tables` skips it.
+    """
+    return zip_file.with_name(zip_file.name.removesuffix(".zip") + ".download.json")
+
+
+def _read_download_state(zip_file: pathlib.Path) -> dict:
+    if not zip_file.is_file():
+        return {}
+    try:
+        with open(_download_state_file(zip_file)) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _check_zip(zip_file: pathlib.Path, name: str) -> None:
+    """Raise if a downloaded zip is truncated or any member fails its CRC."""
+    try:
+        with zipfile.ZipFile(zip_file) as zf:
+            bad_member = zf.testzip()
+    except zipfile.BadZipFile as exc:
+        raise zipfile.BadZipFile(f"Download of {name} is not a valid zip") from exc
+    if bad_member is not None:
+        raise zipfile.BadZipFile(f"Download of {name} has a corrupt {bad_member}")
+
+
+def _download_zip(zip_url: str, zip_file: pathlib.Path, verify: bool = True) -> bool:
+    """Download zip_url to zip_file unless the local copy is already current.
+
+    The request is conditional on the ETag and Last-Modified saved from the
+    last download. A full response is written to a temporary file, checked,
+    and only moved over zip_file if its sha256 differs from the saved one,
+    so an unchanged table keeps its modification time.
+
+    Parameters
+    ----------
+    zip_url
+        where to download the zip from
+    zip_file
+        local path of the zip
+    verify
+        test every member's CRC before keeping the download
+
+    Returns
+    -------
+    :
+        whether zip_file was (re)written
+    """
+    from tqdm import tqdm
+
+    state = _read_download_state(zip_file)
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    # Thanks http://evanhahn.com/python-requests-library-useragent/
+    response = _get_session().get(zip_url, stream=True, timeout=120, headers=headers)
+    if response.status_code == 304:
+        logger.info("%s is unchanged, keeping the local copy", zip_file.name)
+        response.close()
+        return False
+    response.raise_for_status()
+
+    progress_bar = tqdm(
+        desc=zip_file.name,
+        total=int(response.headers.get("content-length", 0)),
+        unit="B",
+        unit_scale=True,
+    )
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{zip_file.name}.", suffix=".part", dir=zip_file.parent
+    )
+    tmp_file = pathlib.Path(tmp_name)
+    try:
+        # Thanks https://bit.ly/2sPYPYw
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in response.iter_content(chunk_size=2**16):
+                if chunk:  # filter out keep-alive new chunks
+                    handle.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    progress_bar.update(len(chunk))
+        progress_bar.close()
+        if verify:
+            _check_zip(tmp_file, zip_file.name)
+        sha256 = digest.hexdigest()
+        changed = not (zip_file.is_file() and state.get("sha256") == sha256)
+        if changed:
+            os.replace(tmp_file, zip_file)
+        else:
+            logger.info("%s downloaded but unchanged", zip_file.name)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+    new_state = {
+        "url": zip_url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": sha256,
+        "size": size,
+    }
+    with open(_download_state_file(zip_file), "w") as outfile:
+        json.dump(new_state, outfile)
+    return changed
+
+
 def download_tables(
-    tables: str | list[str], path: pathlib.Path | None = None, csv: bool = True
+    tables: str | list[str],
+    path: pathlib.Path | None = None,
+    csv: bool = True,
+    verify: bool = True,
+    lang: str = "en",
 ) -> list[int]:
     """Download a json file and zip of data for a list of tables to path.
 
+    Zips that are already in path are only downloaded again if StatsCan's copy
+    has changed since, and a download replaces the local zip only once it has
+    been checked.
+
     Parameters
     ----------
     tables
@@ -91,42 +225,30 @@ def download_tables(
         Where to download the table and json
     csv
         download in CSV format, if not download SDMX
+    verify
+        test the CRC of every member of each downloaded zip, raising
+        ``zipfile.BadZipFile`` (and keeping any previous copy) if one fails
+    lang
+        ``"en"`` for ``<pid>-eng.zip`` or ``"fr"`` for ``<pid>-fra.zip``,
+        only used for CSV downloads
 
     Returns
     -------
     :
-        list of tables that were downloaded
+        list of tables that were downloaded or already up to date
     """
     dl_path = pathlib.Path(path) if path else pathlib.Path()
+    suffix = _lang_suffix(lang) if csv else ""
     metas = get_cube_metadata(tables)
     for meta in metas:
         product_id = meta["productId"]
-        zip_url = get_full_table_download(product_id, csv=csv)
-        zip_file_name = f"{product_id}{'-eng' if csv else ''}.zip"
-        json_file_name = f"{product_id}.json"
-        zip_file = dl_path / zip_file_name
-        json_file = dl_path / json_file_name
-
-        # Thanks http://evanhahn.com/python-requests-library-useragent/
-        response = _session.get(zip_url, stream=True, timeout=120)
-        response.raise_for_status()
-
-        progress_bar = tqdm(
-            desc=zip_file_name,
-            total=int(response.headers.get("content-length", 0)),
-            unit="B",
-            unit_scale=True,
-        )
-
-        # Thanks https://bit.ly/2sPYPYw
-        with open(json_file, "w") as outfile:
+        zip_url = get_full_table_download(product_id, csv=csv, lang=lang)
+        zip_file = dl_path / f"{product_id}{suffix}.zip"
+        _download_zip(zip_url, zip_file, verify=verify)
+        # Only record the metadata once the zip it describes is in place, so
+        # a failed download isn't mistaken for an up to date table
+        with open(dl_path / f"{product_id}.json", "w") as outfile:
             json.dump(meta, outfile)
-        with open(zip_file, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=512):
-                if chunk:  # filter out keep-alive new chunks
-                    handle.write(chunk)
-                    progress_bar.update(len(chunk))
-        progress_bar.close()
     return [meta["productId"] for meta in metas]
 
 
@@ -140,6 +262,10 @@ def zip_update_tables(path: pathlib.Path | None = None, csv: bool = True) -> lis
     data changes will at least include incremental releases, so this should
     capture what I want
 
+    Tables recompressed by `stats_can.transcode` count as downloaded, and are
+    transcoded again with the same codec once updated. Each language a table
+    was downloaded in is updated.
+
     Parameters
     ----------
     path
@@ -162,16 +288,533 @@ def zip_update_tables(path: pathlib.Path | None = None, csv: bool = True) -> lis
         if local["cubeEndDate"] != remote["cubeEndDate"]
     ]
 
-    download_tables(update_table_list, path, csv=csv)
+    dl_path = pathlib.Path(path) if path else pathlib.Path()
+    if not csv:
+        download_tables(update_table_list, path, csv=False)
+        return update_table_list
+    # update every language the table was downloaded in, English if none was
+    by_lang = {
+        lang: [t for t in update_table_list if _table_source(t, dl_path, lang)]
+        for lang in _LANG_SUFFIXES
+    }
+    by_lang["en"] += [
+        t for t in update_table_list if not any(t in ts for ts in by_lang.values())
+    ]
+    for lang, lang_tables in by_lang.items():
+        if not lang_tables:
+            continue
+        suffix = _lang_suffix(lang)
+        transcoded = {
+            table: (codec, (dl_path / f"{table}{suffix}.zip").is_file())
+            for table in lang_tables
+            if (codec := _transcoded_codec(table, dl_path, lang))
+        }
+        download_tables(lang_tables, path, csv=True, lang=lang)
+        if transcoded:
+            from stats_can.transcode import transcode_table
+
+            for table, (codec, keep_zip) in transcoded.items():
+                transcode_table(
+                    table, dl_path, codec=codec, keep_zip=keep_zip, lang=lang
+                )
     return update_table_list
 
 
-def zip_table_to_dataframe(
-    table: str, path: pathlib.Path | None = None
+# getChangedCubeList results for days before today, which never change after,
+# keyed by ISO date in the download directory
+CHANGED_CUBES_FILE = ".stats_can_changed_cubes.json"
+
+
+def _read_changed_cubes(path: pathlib.Path) -> dict[str, list]:
+    try:
+        with open(path / CHANGED_CUBES_FILE) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_changed_cubes(path: pathlib.Path, cached: dict[str, list]) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".json.tmp", dir=path)
+    with os.fdopen(fd, "w") as outfile:
+        json.dump(cached, outfile)
+    os.replace(tmp, path / CHANGED_CUBES_FILE)
+
+
+def changed_tables_in_range(
+    start: dt.date,
+    end: dt.date | None = None,
+    workers: int = 8,
+    path: pathlib.Path | None = None,
+) -> pd.DataFrame:
+    """Every table release from start through end, from getChangedCubeList.
+
+    Days are requested ``workers`` at a time. A past day's list can't change,
+    so given a path it's saved there in ``.stats_can_changed_cubes.json``,
+    and later calls with the same path, from any process, only ask for today
+    (and any later day) again. Without a path every day is requested and
+    nothing is written.
+
+    Parameters
+    ----------
+    start
+        first day to include
+    end
+        last day to include, defaults to today
+    workers
+        days to request at once
+    path
+        where to keep past days' lists, e.g. the directory tables are
+        downloaded to. None (the default) keeps nothing.
+
+    Returns
+    -------
+    :
+        productId and releaseTime of each release, indexed by productId and
+        sorted, with repeated entries dropped
+
+    Raises
+    ------
+    ValueError
+        if end is before start
+    """
+    today = dt.date.today()
+    end = end or today
+    if end < start:
+        raise ValueError(f"end {end} is before start {start}")
+    path = pathlib.Path(path) if path else None
+    days = [start + dt.timedelta(days=n) for n in range((end - start).days + 1)]
+    cached = {} if path is None else _read_changed_cubes(path)
+    to_fetch = [day for day in days if day >= today or day.isoformat() not in cached]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fetched = dict(zip(to_fetch, pool.map(get_changed_cube_list, to_fetch)))
+    new_days = {day.isoformat(): cubes for day, cubes in fetched.items() if day < today}
+    if new_days and path is not None:
+        _write_changed_cubes(path, {**cached, **new_days})
+    lists = [
+        fetched[day] if day in fetched else cached[day.isoformat()] for day in days
+    ]
+    df = pd.DataFrame(
+        [(c["productId"], c["releaseTime"]) for cubes in lists for c in cubes],
+        columns=["productId", "releaseTime"],
+    )
+    df = df.astype({"productId": "int64"})
+    df["releaseTime"] = pd.to_datetime(df["releaseTime"])
+    return (
+        df.drop_duplicates()
+        .sort_values(["productId", "releaseTime"])
+        .set_index("productId")
+    )
+
+
+_POSSIBLE_CATS = [
+    "GEO",
+    "DGUID",
+    "STATUS",
+    "SYMBOL",
+    "TERMINATED",
+    "DECIMALS",
+    "UOM",
+    "UOM_ID",
+    "SCALAR_FACTOR",
+    "SCALAR_ID",
+    "VECTOR",
+    "COORDINATE",
+    "Wages",
+    "National Occupational Classification for Statistics (NOC-S)",
+    "Supplementary unemployment rates",
+    "Sex",
+    "Age group",
+    "Labour force characteristics",
+    "Statistics",
+    "Data type",
+    "Job permanency",
+    "Union coverage",
+    "Educational attainment",
+]
+# Headers of French full table CSVs, by the English header they stand for
+_FRENCH_COLUMNS = {
+    "REF_DATE": "PÉRIODE DE RÉFÉRENCE",
+    "GEO": "GÉO",
+    "DGUID": "DGUID",
+    "UOM": "UNITÉ DE MESURE",
+    "UOM_ID": "IDENTIFICATEUR D'UNITÉ DE MESURE",
+    "SCALAR_FACTOR": "FACTEUR SCALAIRE",
+    "SCALAR_ID": "IDENTIFICATEUR SCALAIRE",
+    "VECTOR": "VECTEUR",
+    "COORDINATE": "COORDONNÉES",
+    "VALUE": "VALEUR",
+    "STATUS": "STATUT",
+    "SYMBOL": "SYMBOLE",
+    "TERMINATED": "TERMINÉ",
+    "DECIMALS": "DÉCIMALES",
+}
+_ENGLISH_COLUMNS = {fr: en for en, fr in _FRENCH_COLUMNS.items()}
+_LANG_SUFFIXES = {"en": "-eng", "fr": "-fra"}
+# Recompressed copies of a table's CSV by file suffix, see stats_can.transcode
+_TRANSCODED = {".csv.zst": "zstd", ".csv.lz4": "lz4"}
+# Byte ranges per worker process when loading a table in parallel, more than
+# one each so a slow range doesn't hold the rest up
+_RANGES_PER_PROCESS = 4
+
+
+# pandas period frequency for the WDS frequencyCodes that have a natural one,
+# anything else (e.g. occasional) is inferred from how the dates are written
+_PERIOD_FREQS = {
+    1: "D",  # daily
+    2: "D",  # weekly, each week labelled by a day
+    6: "M",  # monthly
+    7: "M",  # every 2 months, labelled by the first
+    9: "Q",  # quarterly
+    11: "M",  # semi-annual, labelled by the first month
+    12: "Y",  # annual
+    13: "Y",  # every 2 years
+    14: "Y",  # every 3 years
+    15: "Y",  # every 4 years
+    16: "Y",  # every 5 years
+    17: "Y",  # every 10 years
+}
+# Padding that turns each REF_DATE layout (by length) into a full ISO date
+_REF_DATE_PADDING = {4: "-01-01", 7: "-01", 10: ""}
+
+
+def _lang_suffix(lang: str) -> str:
+    try:
+        return _LANG_SUFFIXES[lang]
+    except KeyError:
+        raise ValueError(f"lang must be 'en' or 'fr', not {lang!r}") from None
+
+
+def _table_source(
+    table: str, path: pathlib.Path, lang: str = "en"
+) -> pathlib.Path | None:
+    """The file holding a downloaded table's CSV, None if it isn't downloaded.
+
+    That's the zip, unless `stats_can.transcode` has recompressed it. A copy
+    takes the zip's modification time, so a zip downloaded after it wins.
+    """
+    stem = f"{table}{_lang_suffix(lang)}"
+    table_zip = path / f"{stem}.zip"
+    zip_mtime = table_zip.stat().st_mtime_ns if table_zip.is_file() else None
+    for suffix in _TRANSCODED:
+        copy = path / f"{stem}{suffix}"
+        if copy.is_file() and (
+            zip_mtime is None or copy.stat().st_mtime_ns >= zip_mtime
+        ):
+            return copy
+    return table_zip if zip_mtime is not None else None
+
+
+def _transcoded_codec(table: str, path: pathlib.Path, lang: str = "en") -> str | None:
+    lang_suffix = _lang_suffix(lang)
+    for suffix, codec in _TRANSCODED.items():
+        if (path / f"{table}{lang_suffix}{suffix}").is_file():
+            return codec
+    return None
+
+
+@contextlib.contextmanager
+def _open_table_csv(source: pathlib.Path, csv_file: str):
+    """A table's CSV as a binary stream, from its zip or a transcoded copy."""
+    for suffix, codec in _TRANSCODED.items():
+        if source.name.endswith(suffix):
+            import pyarrow as pa
+
+            with io.BufferedReader(
+                pa.input_stream(str(source), compression=codec), buffer_size=2**20
+            ) as myfile:
+                yield myfile
+            return
+    with zipfile.ZipFile(source) as myzip, myzip.open(csv_file) as myfile:
+        yield myfile
+
+
+def _normalize_ref_date(ref_date: str) -> str:
+    # Fiscal, crop and school years ("2019/2020") go by the year they start in
+    ref_date = str(ref_date).split("/")[0]
+    if len(ref_date) == 7 and ref_date[5] == "Q" and ref_date[6] in "1234":
+        # SDMX writes quarters as 2020-Q1
+        ref_date = f"{ref_date[:4]}-{3 * int(ref_date[6]) - 2:02d}"
+    return ref_date + _REF_DATE_PADDING.get(len(ref_date), "")
+
+
+def parse_ref_dates(
+    ref_dates: pd.Series, frequency_code: int | None = None, kind: str = "timestamp"
+) -> pd.Series:
+    """Parse REF_DATE (or refPer) strings of any StatsCan frequency.
+
+    Full table CSVs write dates as ``2020`` for annual tables, ``2020-01`` for
+    monthly and quarterly ones, ``2020-01-15`` for daily ones and
+    ``2019/2020`` for fiscal or crop years, and SDMX files write quarters as
+    ``2020-Q1``. Each distinct string is parsed
+    once and the result mapped back onto the rows, so this takes time
+    proportional to the number of periods rather than the number of rows.
+
+    Parameters
+    ----------
+    ref_dates
+        reference dates as strings, or a categorical of them
+    frequency_code
+        WDS frequencyCode of the series (from cube metadata or series info),
+        sets the period frequency. If not given it's inferred from the dates.
+    kind
+        ``"timestamp"`` for the start of each period as datetime64,
+        ``"period"`` for pandas Periods at the series' frequency
+
+    Returns
+    -------
+    :
+        parsed dates with the same index as ref_dates, NaT where a date
+        couldn't be read
+
+    Raises
+    ------
+    ValueError
+        if kind isn't one of timestamp or period
+    """
+    if kind not in ("timestamp", "period"):
+        raise ValueError(f"kind must be 'timestamp' or 'period', not {kind!r}")
+    ref_dates = ref_dates.astype("category")
+    labels = ref_dates.cat.categories
+    normalized = [_normalize_ref_date(label) for label in labels]
+    parsed = pd.to_datetime(
+        pd.Index(normalized, dtype=object), format="%Y-%m-%d", errors="coerce"
+    ).as_unit("s")
+    if kind == "period":
+        freq = _PERIOD_FREQS.get(frequency_code) or _infer_period_freq(labels)
+        parsed = parsed.to_period(freq)
+    return pd.Series(
+        parsed.take(ref_dates.cat.codes, allow_fill=True, fill_value=pd.NaT),
+        index=ref_dates.index,
+        name=ref_dates.name,
+    )
+
+
+# The profile stages of table and vector loads are recorded to, set by
+# stats_can.profiling.profile
+_PROFILE = contextvars.ContextVar("stats_can_profile", default=None)
+
+
+@contextlib.contextmanager
+def _stage(name: str):
+    """Record a stage of a load to the active profile, if there is one.
+
+    Set the yielded object's ``frame`` to what the stage built to record its
+    memory too.
+    """
+    profile = _PROFILE.get()
+    if profile is None:
+        yield types.SimpleNamespace()
+        return
+    with profile.stage(name) as stage:
+        yield stage
+
+
+def _output_backend(backend: str | None, ref_date: str = "timestamp") -> str:
+    """The output backend a call uses, see `stats_can.backends`."""
+    from stats_can import backends
+
+    return backends._resolve(backend, ref_date)
+
+
+def _infer_period_freq(labels: pd.Index) -> str:
+    lengths = {len(str(label).split("/")[0]) for label in labels}
+    if max(lengths, default=4) >= 10:
+        return "D"
+    return "M" if 7 in lengths else "Y"
+
+
+def _table_frequency(table: str, path: pathlib.Path) -> int | None:
+    """FrequencyCode from the metadata saved next to a downloaded table."""
+    try:
+        with open(path / f"{table}.json") as json_file:
+            return json.load(json_file).get("frequencyCode")
+    except (OSError, ValueError):
+        return None
+
+
+def _table_dtypes(col_names: list[str], engine: str = "c") -> dict[str, object]:
+    """Final dtype of each column, set while parsing rather than afterwards.
+
+    REF_DATE is read as a categorical too, so `parse_ref_dates` only has to
+    parse each distinct period once. The pyarrow engine reads label
+    columns as strings and they're encoded after, since it would otherwise
+    infer integer categories for columns like UOM_ID and drop leading zeros.
+    French headers are typed like the English ones they stand for.
+    """
+    types_dict: dict[str, object] = {}
+    for col in col_names:
+        name = _ENGLISH_COLUMNS.get(col, col)
+        if name == "VALUE":
+            types_dict[col] = float
+            continue
+        is_cat = name in _POSSIBLE_CATS or name == "REF_DATE"
+        types_dict[col] = "category" if is_cat and engine != "pyarrow" else str
+    return types_dict
+
+
+def _csv_options(header: bytes) -> dict[str, str]:
+    """Separator and decimal mark of a table CSV, from its header line.
+
+    French CSVs may be written with semicolons and decimal commas.
+    """
+    if header.count(b";") > header.count(b","):
+        return {"sep": ";", "decimal": ","}
+    return {}
+
+
+def _header_columns(header: bytes) -> list[str]:
+    return pd.read_csv(
+        io.BytesIO(header), nrows=0, encoding="utf-8-sig", **_csv_options(header)
+    ).columns.tolist()
+
+
+def _read_table_csv(
+    source,
+    col_names: list[str],
+    engine: str = "c",
+    csv_options: dict[str, str] | None = None,
+) -> pd.DataFrame:
+    """Parse headerless table CSV rows straight to their final dtypes."""
+    kwargs = dict(csv_options or {})
+    if engine != "pyarrow":
+        kwargs["low_memory"] = False
+    # low_memory parses in blocks and can't merge a block where a category
+    # column is all empty with one where it isn't
+    with _stage("csv_parse") as stage:
+        stage.frame = df = pd.read_csv(
+            source,
+            header=None,
+            names=col_names,
+            dtype=_table_dtypes(col_names, engine),
+            engine=engine,
+            **kwargs,
+        )
+    with _stage("categories") as stage:
+        stage.frame = df = _finish_table(df)
+    return df
+
+
+def _finish_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Encode the label columns of a freshly read table (or piece of one)."""
+    for col in [c for c in df.columns if _ENGLISH_COLUMNS.get(c, c) in _POSSIBLE_CATS]:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        elif df[col].cat.categories.empty:
+            # an all empty column gets untyped categories, match the str ones
+            df[col] = df[col].cat.set_categories(pd.Index([], dtype=str))
+    return df
+
+
+def _parse_csv_range(
+    csv_path: pathlib.Path,
+    start: int,
+    end: int,
+    col_names: list[str],
+    engine: str,
+    csv_options: dict[str, str],
+) -> pd.DataFrame:
+    """Parse the rows between two line-aligned byte offsets of a table CSV.
+
+    Runs in a worker process for the parallel loader.
+    """
+    with open(csv_path, "rb") as csv_file:
+        csv_file.seek(start)
+        chunk = csv_file.read(end - start)
+    return _read_table_csv(io.BytesIO(chunk), col_names, engine, csv_options)
+
+
+def _line_aligned_ranges(
+    csv_path: pathlib.Path, start: int, n_ranges: int
+) -> list[tuple[int, int]]:
+    """Split a file from start into about n_ranges byte ranges on line ends.
+
+    StatsCan CSVs quote every field but never put newlines inside them, so
+    every newline is a row boundary.
+    """
+    size = csv_path.stat().st_size
+    step = max((size - start) // n_ranges, 1)
+    bounds = [start]
+    with open(csv_path, "rb") as csv_file:
+        while bounds[-1] + step < size:
+            csv_file.seek(bounds[-1] + step)
+            csv_file.readline()
+            if csv_file.tell() >= size:
+                break
+            bounds.append(csv_file.tell())
+    bounds.append(size)
+    return list(itertools.pairwise(bounds))
+
+
+def _merge_table_pieces(pieces: list[pd.DataFrame]) -> pd.DataFrame:
+    """Stack parsed pieces, unifying each categorical's categories.
+
+    Categories are unioned and sorted, which is what ``astype("category")``
+    gives on the whole column, so the result matches a serial load.
+    """
+    merged = {}
+    for col in pieces[0].columns:
+        if isinstance(pieces[0][col].dtype, pd.CategoricalDtype):
+            merged[col] = union_categoricals(
+                [p[col] for p in pieces], sort_categories=True
+            )
+        else:
+            merged[col] = pd.concat([p[col] for p in pieces], ignore_index=True)
+    return pd.DataFrame(merged)
+
+
+def _read_table_csv_parallel(
+    source: pathlib.Path, csv_file: str, processes: int | None, engine: str
 ) -> pd.DataFrame:
+    """Decompress a table CSV once, then parse byte ranges in a process pool."""
+    processes = processes or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = pathlib.Path(tmp_dir) / csv_file
+        with (
+            _stage("decompress"),
+            _open_table_csv(source, csv_file) as src,
+            open(csv_path, "wb") as dest,
+        ):
+            shutil.copyfileobj(src, dest, length=2**20)
+        with _stage("header"), open(csv_path, "rb") as f:
+            header = f.readline()
+            data_start = f.tell()
+            col_names = _header_columns(header)
+            csv_options = _csv_options(header)
+            ranges = _line_aligned_ranges(
+                csv_path, data_start, processes * _RANGES_PER_PROCESS
+            )
+        # the workers parse and encode categories, only their pieces come back
+        with _stage("csv_parse"), ProcessPoolExecutor(max_workers=processes) as pool:
+            pieces = list(
+                pool.map(
+                    _parse_csv_range,
+                    *zip(
+                        *[
+                            (csv_path, a, b, col_names, engine, csv_options)
+                            for a, b in ranges
+                        ]
+                    ),
+                )
+            )
+    with _stage("concat") as stage:
+        stage.frame = df = _merge_table_pieces(pieces)
+    return df
+
+
+def zip_table_to_dataframe(
+    table: str,
+    path: pathlib.Path | None = None,
+    processes: int | None = 1,
+    engine: str = "c",
+    ref_date: str = "timestamp",
+    lang: str = "en",
+    backend: str | None = None,
+) -> "pd.DataFrame | pa.Table | pl.DataFrame":
     """Read a StatsCan table into a pandas DataFrame.
 
-    If a zip file of the table does not exist in path, downloads it
+    If a zip file of the table does not exist in path, downloads it. A copy
+    recompressed by `stats_can.transcode` is read in place of the zip.
 
     Parameters
     ----------
@@ -179,60 +822,127 @@ def zip_table_to_dataframe(
         the table to load to dataframe from zipped csv
     path
         where to download the tables or load them, default will go to current working directory
+    processes
+        worker processes to parse the CSV with. 1 (the default) parses in
+        this process, None uses every core. More than one decompresses the
+        CSV to a temporary file and parses line-aligned pieces of it in
+        parallel, which pays off for tables with millions of rows.
+    engine
+        CSV parser for ``pandas.read_csv``. ``"pyarrow"`` (install the
+        ``arrow`` extra) parses with every core, which beats the default C
+        parser on large tables given a few of them
+    ref_date
+        ``"timestamp"`` parses REF_DATE to the start of each period,
+        ``"period"`` to pandas Periods at the table's frequency (read from the
+        ``<table>.json`` metadata saved alongside the zip)
+    lang
+        ``"en"`` loads ``<table>-eng.zip``, ``"fr"`` loads ``<table>-fra.zip``
+        with its French headers and labels. To have both languages without
+        keeping both zips, load English and use `translate_table`.
+    backend
+        ``"arrow"`` or ``"polars"`` to parse with pyarrow's CSV reader into a
+        pyarrow Table or Polars DataFrame instead, see `stats_can.backends`.
+        processes and engine only apply to pandas. Defaults to the backend
+        set with `stats_can.backends.set_backend`.
 
     Returns
     -------
     :
-        the table as a dataframe
+        the table as a dataframe, or a pyarrow Table or Polars DataFrame
+        with those backends
     """
+    backend = _output_backend(backend, ref_date)
     path = pathlib.Path(path) if path else pathlib.Path()
     # Parse tables returns a list, can only do one table at a time here though
     table = parse_tables(table)[0]
-    table_zip = table + "-eng.zip"
-    table_zip = path / table_zip
-    if not table_zip.is_file():
-        download_tables([table], path)
+    source = _table_source(table, path, lang)
+    if source is None:
+        download_tables([table], path, lang=lang)
+        source = path / f"{table}{_lang_suffix(lang)}.zip"
     csv_file = table + ".csv"
-    with zipfile.ZipFile(table_zip) as myzip:
-        with myzip.open(csv_file) as myfile:
-            col_names = pd.read_csv(myfile, nrows=0).columns
-        # reopen the file or it misses the first row
-        with myzip.open(csv_file) as myfile:
-            types_dict = {"VALUE": float}
-            types_dict.update({col: str for col in col_names if col not in types_dict})
-            df = pd.read_csv(myfile, dtype=types_dict)
-
-    possible_cats = [
-        "GEO",
-        "DGUID",
-        "STATUS",
-        "SYMBOL",
-        "TERMINATED",
-        "DECIMALS",
-        "UOM",
-        "UOM_ID",
-        "SCALAR_FACTOR",
-        "SCALAR_ID",
-        "VECTOR",
-        "COORDINATE",
-        "Wages",
-        "National Occupational Classification for Statistics (NOC-S)",
-        "Supplementary unemployment rates",
-        "Sex",
-        "Age group",
-        "Labour force characteristics",
-        "Statistics",
-        "Data type",
-        "Job permanency",
-        "Union coverage",
-        "Educational attainment",
-    ]
-    actual_cats = [col for col in possible_cats if col in col_names]
-    df[actual_cats] = df[actual_cats].astype("category")
-    df["REF_DATE"] = pd.to_datetime(df["REF_DATE"], format="%Y-%m-%d", errors="coerce")
+    if backend != "pandas":
+        from stats_can import backends
+
+        return backends.read_table_zip(source, csv_file, backend)
+    if processes != 1:
+        df = _read_table_csv_parallel(source, csv_file, processes, engine)
+    else:
+        with _open_table_csv(source, csv_file) as myfile:
+            with _stage("header"):
+                header = myfile.readline()
+                col_names = _header_columns(header)
+            df = _read_table_csv(myfile, col_names, engine, _csv_options(header))
+    ref_col = "REF_DATE" if lang == "en" else _FRENCH_COLUMNS["REF_DATE"]
+    with _stage("dates") as stage:
+        df[ref_col] = parse_ref_dates(
+            df[ref_col], _table_frequency(table, path), kind=ref_date
+        )
+        stage.frame = df
     return df
 
 
+def _relabel(col: pd.Series, mapping: dict[str, str]) -> pd.Series:
+    """Swap a label column's categories, leaving its codes where they are."""
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype("category")
+    new = [mapping.get(label, label) for label in col.cat.categories]
+    if len(set(new)) == len(new):
+        return col.cat.rename_categories(new)
+    # two labels translate to the same one, so categories have to merge
+    return col.map(mapping).astype("category")
+
+
+def translate_table(
+    df: pd.DataFrame, table: str, path: pathlib.Path | None = None, lang: str = "fr"
+) -> pd.DataFrame:
+    """Switch a loaded table's headers and dimension labels to another language.
+
+    Member names come from the ``<table>.json`` cube metadata saved with the
+    zip, which has every member in English and French. Dimension columns
+    become categoricals whose categories are renamed in place, so both
+    language versions share one copy of the codes and the numeric columns,
+    and only one language's zip has to be downloaded and parsed.
+
+    Parameters
+    ----------
+    df
+        the table, as loaded by `zip_table_to_dataframe` in the other language
+    table
+        the table's id
+    path
+        where the table's json metadata is, defaults to the current working
+        directory
+    lang
+        ``"fr"`` to translate an English table, ``"en"`` for a French one
+
+    Returns
+    -------
+    :
+        the table with translated headers and dimension labels
+    """
+    _lang_suffix(lang)
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    with open(path / f"{table}.json") as json_file:
+        meta = json.load(json_file)
+    src, dest = ("En", "Fr") if lang == "fr" else ("Fr", "En")
+    headers = _FRENCH_COLUMNS if lang == "fr" else _ENGLISH_COLUMNS
+    out = df.copy(deep=False)
+    renames = {}
+    for dim in meta["dimension"]:
+        if dim["dimensionPositionId"] == 1:
+            old, new = ("GEO", "GÉO") if lang == "fr" else ("GÉO", "GEO")
+        else:
+            old, new = dim[f"dimensionName{src}"], dim[f"dimensionName{dest}"]
+        if old not in out.columns:
+            continue
+        mapping = {m[f"memberName{src}"]: m[f"memberName{dest}"] for m in dim["member"]}
+        out[old] = _relabel(out[old], mapping)
+        renames[old] = new
+    renames.update({c: headers[c] for c in out.columns if c in headers})
+    return out.rename(columns=renames)
+
+
 def list_zipped_tables(path: pathlib.Path | None = None) -> list[str]:
     """List StatsCan tables available.
 
@@ -264,11 +974,13 @@ def list_zipped_tables(path: pathlib.Path | None = None) -> list[str]:
 
 
 def vectors_to_df(
-    vectors: str | list[str],
+    vectors: str | list[str] | Mapping[str | int, int],
     periods: int = 1,
     start_release_date: dt.date | None = None,
     end_release_date: dt.date | None = None,
-) -> pd.DataFrame:
+    ref_date: str = "timestamp",
+    backend: str | None = None,
+) -> "pd.DataFrame | pa.Table | pl.DataFrame":
     """Get DataFrame of vectors with n periods data or over range of release dates.
 
     Wrapper on get_bulk_vector_data_by_range and
@@ -278,59 +990,105 @@ def vectors_to_df(
     Parameters
     ----------
     vectors
-        vector numbers to get info for
+        vector numbers to get info for, or a mapping of vector number to how
+        many periods to retrieve for it
     periods
-        number of periods to retrieve data for
+        number of periods to retrieve data for, unless vectors is a mapping
     start_release_date
         start release date for the data
     end_release_date
         end release date for the data
+    ref_date
+        ``"timestamp"`` for a DatetimeIndex, ``"period"`` for a PeriodIndex at
+        the vectors' frequency (daily if they don't all share one)
+    backend
+        ``"arrow"`` or ``"polars"`` to build a pyarrow Table or Polars
+        DataFrame with a refPer column instead of the index, see
+        `stats_can.backends`. Defaults to the backend set with
+        `stats_can.backends.set_backend`.
 
     Returns
     -------
     :
-        vectors as columns and ref_date as the index (not release date)
+        vectors as columns and ref_date as the index (not release date), or
+        a pyarrow Table or Polars DataFrame with those backends
     """
-    df = pd.DataFrame()
-    if (end_release_date is None) | (start_release_date is None):
-        start_list = get_data_from_vectors_and_latest_n_periods(vectors, periods)
-    else:
-        start_list = get_bulk_vector_data_by_range(
-            vectors, start_release_date, end_release_date
-        )
-    for vec in start_list:
-        name = "v" + str(vec["vectorId"])
-        # If there's no data for the series just skip it
-        if not vec["vectorDataPoint"]:
-            continue
-        ser = (
-            pd.DataFrame(vec["vectorDataPoint"])
-            .assign(
-                refPer=lambda x: pd.to_datetime(
-                    x["refPer"], format="%Y-%m-%d", errors="coerce"
+    backend = _output_backend(backend, ref_date)
+    with _stage("download"):
+        if (end_release_date is None) | (start_release_date is None):
+            start_list = get_data_from_vectors_and_latest_n_periods(vectors, periods)
+        else:
+            start_list = get_bulk_vector_data_by_range(
+                vectors, start_release_date, end_release_date
+            )
+    if backend != "pandas":
+        from stats_can import backends
+
+        return backends.vector_data_to_table(start_list, backend)
+    return _vector_data_to_df(start_list, ref_date)
+
+
+def _vector_data_to_df(start_list: list, ref_date: str = "timestamp") -> pd.DataFrame:
+    """One column per VectorData, indexed by parsed refPer."""
+    columns = []
+    frequencies = set()
+    with _stage("series"):
+        for vec in start_list:
+            points = vec["vectorDataPoint"]
+            # If there's no data for the series just skip it
+            if not points:
+                continue
+            frequencies.update(point["frequencyCode"] for point in points)
+            columns.append(
+                pd.Series(
+                    [point["value"] for point in points],
+                    index=[point["refPer"] for point in points],
+                    name="v" + str(vec["vectorId"]),
+                    dtype=float,
                 )
             )
-            .set_index("refPer")
-            .rename(columns={"value": name})
-            .filter([name])
+    if not columns:
+        return pd.DataFrame()
+    with _stage("concat") as stage:
+        # refPer is always YYYY-MM-DD so sorting the strings sorts the dates
+        stage.frame = df = pd.concat(columns, axis=1, sort=True)
+    frequency_code = frequencies.pop() if len(frequencies) == 1 else None
+    with _stage("dates") as stage:
+        df.index = pd.Index(
+            parse_ref_dates(pd.Series(df.index), frequency_code, kind=ref_date),
+            name="refPer",
         )
-        df = pd.concat([df, ser], axis=1, sort=True)
+        stage.frame = df
     return df
 
 
-def code_sets_to_df_dict() -> dict[str, pd.DataFrame]:
+def code_sets_to_df_dict(
+    backend: str | None = None,
+) -> "dict[str, pd.DataFrame | pa.Table | pl.DataFrame]":
     """Get all code sets.
 
     Code sets provide additional metadata to describe
     information. Code sets are grouped into scales, frequencies, symbols etc.
     and returned as dictionary of dataframes.
 
+    Parameters
+    ----------
+    backend
+        ``"arrow"`` or ``"polars"`` for pyarrow Tables or Polars DataFrames,
+        see `stats_can.backends`. Defaults to the backend set with
+        `stats_can.backends.set_backend`.
+
     Returns
     -------
     :
         dictionary of dataframes
     """
+    backend = _output_backend(backend)
     codes = get_code_sets()
+    if backend != "pandas":
+        from stats_can import backends
+
+        return backends.code_sets_to_tables(codes, backend)
     # Packs each code group in a dataframe for better lookup via dictionary
     codes_df_lookup = {key: pd.DataFrame(codes[key]) for key in codes.keys()}
     return codes_df_lookup
@@ -23,21 +23,19 @@ Missing api implementations:
     GetFullTableDownloadSDMX
 """
 
+import copy
 import datetime as dt
 import functools
+import json
+import threading
 import time
-from importlib.metadata import version
-from typing import TypeVar
-from pydantic import TypeAdapter
-
-import requests
-from requests import Response
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from collections.abc import Callable, Hashable, Mapping
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, TypeVar
 
 from stats_can.helpers import (
-    chunk_vectors,
     parse_tables,
+    parse_vectors,
 )
 from stats_can.schemas import (
     ChangedSeries,
@@ -48,25 +46,140 @@ from stats_can.schemas import (
     CodeSet,
 )
 
+if TYPE_CHECKING:  # pragma: no cover
+    import requests
+    from pydantic import TypeAdapter
+
 SC_URL = "https://www150.statcan.gc.ca/t1/wds/rest/"
 DEFAULT_TIMEOUT = 30
 _CHUNK_DELAY = 0.1
-_USER_AGENT = f"stats_can/{version('stats_can')}"
+# Most vectors the api takes in one request
+_MAX_CHUNK_VECTORS = 300
+# Data points to aim for per response, big enough to keep request counts low
+# and small enough that 20 years of monthly data doesn't time out
+_TARGET_CHUNK_POINTS = 20_000
+_MIN_CHUNK_POINTS = 250
+# Requests (and single vectors) some thread is fetching right now, so other
+# threads asking for the same thing wait for it instead of asking again
+_IN_FLIGHT: dict[Hashable, Future] = {}
+_IN_FLIGHT_LOCK = threading.Lock()
 
 T = TypeVar("T")
 
-_retry = Retry(
-    total=3,
-    backoff_factor=1,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET", "POST"],
-)
-_adapter = HTTPAdapter(max_retries=_retry)
 
-_session = requests.Session()
-_session.headers["User-Agent"] = _USER_AGENT
-_session.mount("https://", _adapter)
-_session.mount("http://", _adapter)
+@functools.cache
+def _get_session() -> "requests.Session":
+    """Build the shared HTTP session the first time it's needed.
+
+    requests and urllib3 are only imported here so that importing the package
+    doesn't pay for them until a call actually goes out.
+
+    Returns
+    -------
+    :
+        session with retries and the package user agent configured
+    """
+    from importlib.metadata import version
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.headers["User-Agent"] = f"stats_can/{version('stats_can')}"
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@functools.cache
+def _type_adapter(schema: type[T]) -> "TypeAdapter[T]":
+    """Build (once per schema) the pydantic validator for a response type.
+
+    Parameters
+    ----------
+    schema
+        type to validate responses against
+
+    Returns
+    -------
+    :
+        cached pydantic TypeAdapter for schema
+    """
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(schema)
+
+
+def __getattr__(name: str):
+    """Create ``_session`` lazily so importing the module stays cheap.
+
+    Parameters
+    ----------
+    name
+        attribute being looked up on the module
+
+    Returns
+    -------
+    :
+        the shared requests session
+
+    Raises
+    ------
+    AttributeError
+        for anything other than ``_session``
+    """
+    if name == "_session":
+        return _get_session()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _single_flight(key: Hashable, func: Callable[[], T]) -> T:
+    """Call func, unless a call with the same key is already running.
+
+    Parameters
+    ----------
+    key
+        identifies calls that would return the same thing
+    func
+        makes the call
+
+    Returns
+    -------
+    :
+        func's result, from this thread's call or the one already running
+    """
+    with _IN_FLIGHT_LOCK:
+        future = _IN_FLIGHT.get(key)
+        leader = future is None
+        if leader:
+            future = _IN_FLIGHT[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = func()
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _IN_FLIGHT_LOCK:
+            del _IN_FLIGHT[key]
+
+
+def _get_json(method: str, url: str, **kwargs):
+    response = _get_session().request(method, url, **kwargs)
+    response.raise_for_status()
+    return response.json()
 
 
 def _fetch_and_validate(
@@ -78,16 +191,17 @@ def _fetch_and_validate(
     ``list[T]`` when the API responds with a list of wrappers (bulk endpoints).
     """
     kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
-    response: Response = _session.request(method, url, **kwargs)
-    response.raise_for_status()
-    data = response.json()
+    # Identical requests in flight share the raw response, validation below
+    # still builds each caller its own objects
+    key = (method, url, json.dumps(kwargs, sort_keys=True, default=str))
+    data = _single_flight(key, lambda: _get_json(method, url, **kwargs))
 
     # Handle StatsCan sometimes returning lists and sometimes just a single object
     items = data if isinstance(data, list) else [data]
     for item in items:
         if item.get("status") != "SUCCESS":
             raise RuntimeError(str(item.get("object")))
-    adapter = TypeAdapter(schema)
+    adapter = _type_adapter(schema)
     if isinstance(data, dict):
         payload = data.get("object")
         return adapter.validate_python(payload)
@@ -98,6 +212,192 @@ def _fetch_and_validate(
         raise RuntimeError(f"data came back weird. We should never get here: {data}")
 
 
+class _AdaptiveChunker:
+    """Size vector requests by how big their responses are expected to be.
+
+    Each vector comes with an estimate of how many data points it will
+    return, and vectors are packed into a request until the estimates add up
+    to the point budget. How far off the estimates are is learned from every
+    response, so chunks grow when series turn out shorter than expected. A
+    request that times out or gets a 5xx is split in half and retried, and
+    the budget halves with it before creeping back up on later successes.
+    """
+
+    def __init__(self):
+        self.budget = _TARGET_CHUNK_POINTS
+        # observed points per estimated point, smoothed across responses
+        self.scale = 1.0
+
+    def take(self, pending: list[tuple[int, float]]) -> list[tuple[int, float]]:
+        """Pop the next chunk off the front of pending."""
+        points = 0.0
+        size = 0
+        for _, estimate in pending[:_MAX_CHUNK_VECTORS]:
+            points += estimate * self.scale
+            if size and points > self.budget:
+                break
+            size += 1
+        chunk = pending[:size]
+        del pending[:size]
+        return chunk
+
+    def succeeded(self, estimated: float, observed: int) -> None:
+        if estimated:
+            ratio = max(observed / estimated, 0.01)
+            self.scale = (self.scale + ratio) / 2
+        self.budget = min(self.budget * 1.25, _TARGET_CHUNK_POINTS)
+
+    def failed(self) -> None:
+        self.budget = max(self.budget / 2, _MIN_CHUNK_POINTS)
+
+
+# One chunker per endpoint so what's learned carries over between calls
+_CHUNKERS: dict[str, _AdaptiveChunker] = {}
+
+
+def _is_overload(exc: Exception) -> bool:
+    """Whether a failed request looks like it asked for too much at once."""
+    import requests
+    from urllib3.exceptions import ReadTimeoutError
+
+    if isinstance(exc, (requests.Timeout, requests.exceptions.RetryError)):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        # the session retries read timeouts, and requests reports them as
+        # connection errors once the retries run out
+        reason = getattr(exc.args[0], "reason", None)
+        return isinstance(reason, ReadTimeoutError)
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500
+    return False
+
+
+def _fetch_vectors_in_chunks(
+    endpoint: str,
+    vectors: list[int],
+    estimates: list[float],
+    fetch: Callable[[list[int]], list[T]],
+    count: Callable[[T], int],
+    params: Callable[[int], Hashable] | None = None,
+) -> list[T]:
+    """Fetch each distinct vector once, in adaptively sized chunks.
+
+    Repeated vectors are only requested once, and so are vectors another
+    thread already has in flight with the same parameters: this call waits for
+    that thread's result rather than asking again. Results come back in the
+    order of vectors, repeats included, each caller getting its own copy.
+
+    Parameters
+    ----------
+    endpoint
+        name of the api endpoint, each learns its own chunk sizes
+    vectors
+        parsed vector ids to fetch
+    estimates
+        expected data points for each vector
+    fetch
+        makes one request for a chunk of vector ids, returning an item with
+        a vectorId for each vector it has a result for
+    count
+        data points in one returned item, what the estimates are checked by
+    params
+        anything besides the vector id that changes what's returned for it
+
+    Returns
+    -------
+    :
+        one result per entry in vectors
+    """
+
+    def key(vector: int) -> tuple:
+        return (endpoint, vector, params(vector) if params else None)
+
+    owned: dict[tuple, Future] = {}
+    waiting: dict[tuple, Future] = {}
+    to_fetch = []
+    with _IN_FLIGHT_LOCK:
+        for vector, estimate in zip(vectors, estimates):
+            k = key(vector)
+            if k in owned or k in waiting:
+                continue
+            if k in _IN_FLIGHT:
+                waiting[k] = _IN_FLIGHT[k]
+            else:
+                owned[k] = _IN_FLIGHT[k] = Future()
+                to_fetch.append((vector, estimate))
+    try:
+        for vector, item in _fetch_adaptively(endpoint, to_fetch, fetch, count):
+            future = owned.get(key(vector))
+            if future is not None and not future.done():
+                future.set_result(item)
+        # a vector the api left out of its response fails rather than hangs
+        for (_, vector, _), future in owned.items():
+            if not future.done():
+                future.set_exception(
+                    RuntimeError(f"No result returned for vector {vector}")
+                )
+    except BaseException as exc:
+        for future in owned.values():
+            if not future.done():
+                future.set_exception(exc)
+        raise
+    finally:
+        with _IN_FLIGHT_LOCK:
+            for k in owned:
+                del _IN_FLIGHT[k]
+    final_list = []
+    handed_out = set()
+    for vector in vectors:
+        k = key(vector)
+        item = (owned.get(k) or waiting[k]).result()
+        if k in handed_out or k in waiting:
+            item = copy.deepcopy(item)
+        handed_out.add(k)
+        final_list.append(item)
+    return final_list
+
+
+def _fetch_adaptively(
+    endpoint: str,
+    to_fetch: list[tuple[int, float]],
+    fetch: Callable[[list[int]], list[T]],
+    count: Callable[[T], int],
+):
+    """Yield (vector, result) pairs, chunking by expected response size."""
+    chunker = _CHUNKERS.setdefault(endpoint, _AdaptiveChunker())
+    pending = list(to_fetch)
+    # halves of chunks that failed, retried before anything new is taken
+    split: list[list[tuple[int, float]]] = []
+    first = True
+    while split or pending:
+        chunk = split.pop(0) if split else chunker.take(pending)
+        if not first:
+            time.sleep(_CHUNK_DELAY)
+        first = False
+        chunk_vectors = [v for v, _ in chunk]
+        try:
+            result = fetch(chunk_vectors)
+        except Exception as exc:
+            if len(chunk) == 1 or not _is_overload(exc):
+                raise
+            chunker.failed()
+            half = len(chunk) // 2
+            split[:0] = [chunk[:half], chunk[half:]]
+            continue
+        chunker.succeeded(sum(e for _, e in chunk), sum(count(r) for r in result))
+        # matched by id, the api doesn't promise order or one item per vector
+        for item in result:
+            yield item["vectorId"], item
+
+
+def _months_between(start: dt.date, end: dt.date) -> int:
+    return max((end.year - start.year) * 12 + end.month - start.month + 1, 1)
+
+
+def _n_points(vector_data: VectorData) -> int:
+    return len(vector_data["vectorDataPoint"])
+
+
 def get_changed_series_list() -> list[ChangedSeries]:
     """[api reference](https://www.statcan.gc.ca/eng/developers/wds/user-guide#a10-1)
 
@@ -109,6 +409,8 @@ def get_changed_series_list() -> list[ChangedSeries]:
         list of changed series, one for each vector and when it was released.
         Returns an empty list if no series have been released yet today.
     """
+    import requests
+
     try:
         return _fetch_and_validate(
             url=f"{SC_URL}getChangedSeriesList",
@@ -188,17 +490,21 @@ def get_series_info_from_vector(vectors: str | list[str]) -> list[SeriesInfo]:
         List of dicts containing metadata for each v#
     """
     url = f"{SC_URL}getSeriesInfoFromVector"
-    chunks = chunk_vectors(vectors)
-    final_list = []
-    for i, chunk in enumerate(chunks):
-        if i > 0:
-            time.sleep(_CHUNK_DELAY)
+    vectors = parse_vectors(vectors)
+
+    def fetch(chunk: list[int]) -> list[SeriesInfo]:
         vector_dict = [{"vectorId": v} for v in chunk]
-        result = _fetch_and_validate(
+        return _fetch_and_validate(
             url, schema=SeriesInfo, method="POST", json=vector_dict
         )
-        final_list += result
-    return final_list
+
+    return _fetch_vectors_in_chunks(
+        "getSeriesInfoFromVector",
+        vectors,
+        [1.0] * len(vectors),
+        fetch,
+        count=lambda info: 1,
+    )
 
 
 def get_changed_series_data_from_cube_pid_coord():
@@ -226,33 +532,53 @@ def get_data_from_cube_pid_coord_and_latest_n_periods():
 
 
 def get_data_from_vectors_and_latest_n_periods(
-    vectors: str | list[str], periods: int
+    vectors: str | list[str] | Mapping[str | int, int], periods: int | None = None
 ) -> list[VectorData]:
     """[api reference](https://www.statcan.gc.ca/eng/developers/wds/user-guide#a12-4)
 
     Parameters
     ----------
     vectors
-        vector numbers to get info for
+        vector numbers to get info for, or a mapping of vector number to how
+        many periods to retrieve for it. Vectors wanting different numbers of
+        periods share requests, since the api takes an N for each vector.
     periods
-        number of periods (starting at latest) to retrieve data for
+        number of periods (starting at latest) to retrieve data for, ignored
+        when vectors is a mapping
 
     Returns
     -------
     :
         List of dicts containing data for each vector
+
+    Raises
+    ------
+    ValueError
+        if periods isn't given and vectors isn't a mapping
     """
     url = f"{SC_URL}getDataFromVectorsAndLatestNPeriods"
-    chunks = chunk_vectors(vectors)
-    final_list = []
-    for i, chunk in enumerate(chunks):
-        if i > 0:
-            time.sleep(_CHUNK_DELAY)
-        periods_l = [periods for i in range(len(chunk))]
-        json = [{"vectorId": v, "latestN": n} for v, n in zip(chunk, periods_l)]
-        result = _fetch_and_validate(url, schema=VectorData, method="POST", json=json)
-        final_list += result
-    return final_list
+    if isinstance(vectors, Mapping):
+        latest_n = list(vectors.values())
+        vectors = parse_vectors(list(vectors))
+    elif periods is None:
+        raise ValueError("periods is required unless vectors maps vector to N")
+    else:
+        vectors = parse_vectors(vectors)
+        latest_n = [periods] * len(vectors)
+    n_for = dict(zip(vectors, latest_n))
+
+    def fetch(chunk: list[int]) -> list[VectorData]:
+        payload = [{"vectorId": v, "latestN": n_for[v]} for v in chunk]
+        return _fetch_and_validate(url, schema=VectorData, method="POST", json=payload)
+
+    return _fetch_vectors_in_chunks(
+        "getDataFromVectorsAndLatestNPeriods",
+        vectors,
+        [float(n) for n in latest_n],
+        fetch,
+        count=_n_points,
+        params=n_for.get,
+    )
 
 
 def get_bulk_vector_data_by_range(
@@ -277,12 +603,12 @@ def get_bulk_vector_data_by_range(
     url = f"{SC_URL}getBulkVectorDataByRange"
     start_release_date_str = str(start_release_date) + "T13:00"
     end_release_date_str = str(end_release_date) + "T13:00"
-    chunks = chunk_vectors(vectors)
-    final_list = []
-    for i, vector_ids in enumerate(chunks):
-        if i > 0:
-            time.sleep(_CHUNK_DELAY)
-        result = _fetch_and_validate(
+    vectors = parse_vectors(vectors)
+    # assume monthly until responses say otherwise
+    months = _months_between(start_release_date, end_release_date)
+
+    def fetch(vector_ids: list[int]) -> list[VectorData]:
+        return _fetch_and_validate(
             url,
             schema=VectorData,
             method="POST",
@@ -292,8 +618,15 @@ def get_bulk_vector_data_by_range(
                 "endDataPointReleaseDate": end_release_date_str,
             },
         )
-        final_list += result
-    return final_list
+
+    return _fetch_vectors_in_chunks(
+        "getBulkVectorDataByRange",
+        vectors,
+        [float(months)] * len(vectors),
+        fetch,
+        count=_n_points,
+        params=lambda v: (start_release_date_str, end_release_date_str),
+    )
 
 
 def get_bulk_vector_data_by_reference_period_range(
@@ -316,21 +649,27 @@ def get_bulk_vector_data_by_reference_period_range(
         List of dicts containing data for each vector
     """
     url = f"{SC_URL}getDataFromVectorByReferencePeriodRange"
-    chunks = chunk_vectors(vectors)
-    final_list = []
-    for i, vector_ids in enumerate(chunks):
-        if i > 0:
-            time.sleep(_CHUNK_DELAY)
+    vectors = parse_vectors(vectors)
+    months = _months_between(start_ref_date, end_ref_date)
+
+    def fetch(vector_ids: list[int]) -> list[VectorData]:
         # I know the rest are .post, they changed it just for this one
         v_string = ",".join(f"{v}" for v in vector_ids)
         vector_param = f"vectorIds={v_string}"
         full_url = f"{url}?{vector_param}&startRefPeriod={start_ref_date}&endReferencePeriod={end_ref_date}"
-        result = _fetch_and_validate(url=full_url, schema=VectorData)
-        final_list += result
-    return final_list
+        return _fetch_and_validate(url=full_url, schema=VectorData)
+
+    return _fetch_vectors_in_chunks(
+        "getDataFromVectorByReferencePeriodRange",
+        vectors,
+        [float(months)] * len(vectors),
+        fetch,
+        count=_n_points,
+        params=lambda v: (str(start_ref_date), str(end_ref_date)),
+    )
 
 
-def get_full_table_download(table: str, csv: bool = True) -> str:
+def get_full_table_download(table: str, csv: bool = True, lang: str = "en") -> str:
     """Take a table name and return a url to a zipped file of that table.
 
     [api reference](https://www.statcan.gc.ca/eng/developers/wds/user-guide#a12-6)
@@ -343,15 +682,25 @@ def get_full_table_download(table: str, csv: bool = True) -> str:
         table name to download
     csv
         download in CSV format, if not download SDMX
+    lang
+        ``"en"`` or ``"fr"``, the language of the CSV. SDMX downloads carry
+        both languages so this is ignored for them.
 
     Returns
     -------
     :
         path to the file download
+
+    Raises
+    ------
+    ValueError
+        if lang isn't en or fr
     """
+    if lang not in ("en", "fr"):
+        raise ValueError(f"lang must be 'en' or 'fr', not {lang!r}")
     parsed_table = parse_tables(table)[0]
     if csv:
-        url = f"{SC_URL}getFullTableDownloadCSV/{parsed_table}/en"
+        url = f"{SC_URL}getFullTableDownloadCSV/{parsed_table}/{lang}"
     else:
         url = f"{SC_URL}getFullTableDownloadSDMX/{parsed_table}"
     return _fetch_and_validate(url, schema=str)
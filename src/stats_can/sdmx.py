@@ -0,0 +1,348 @@
+"""Read full table SDMX downloads into pandas.
+
+``download_tables(csv=False)`` saves a table as ``<pid>.zip`` holding an SDMX
+2.1 structure specific data file and a ``_Structure`` file with the table's
+code lists. The data file is streamed with ``iterparse`` and cleared as it
+goes, so memory stays flat however big the table is, and rows come out in
+chunks.
+
+Dimension members in the data file are short codes, so each dimension column
+is built straight from integer codes into its code list's labels instead of
+parsing a label string on every row like the CSV path has to.
+"""
+
+import json
+import pathlib
+import zipfile
+from collections.abc import Iterator
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+from stats_can.helpers import parse_tables
+from stats_can.sc import _merge_table_pieces, download_tables, parse_ref_dates
+
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+DEFAULT_CHUNKSIZE = 100_000
+# SDMX attribute names that have a different name in full table CSVs
+_RENAMES = {
+    "TIME_PERIOD": "REF_DATE",
+    "OBS_VALUE": "VALUE",
+    "VECTOR_ID": "VECTOR",
+    "OBS_STATUS": "STATUS",
+    "UNIT_MEASURE": "UOM_ID",
+    "UNIT_MULT": "SCALAR_ID",
+}
+
+
+def _local(tag: str) -> str:
+    """Tag name without its namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_sdmx_structure(xml_file) -> dict:
+    """Pull the dimensions and code lists out of an SDMX structure file.
+
+    Parameters
+    ----------
+    xml_file
+        path or binary file object of the ``_Structure`` XML
+
+    Returns
+    -------
+    :
+        ``dimensions``, a list of dicts with the ``id``, ``position`` and
+        ``codelist`` of each dimension in position order, ``codelists``,
+        mapping code list id to code id to a dict of label by language, and
+        ``attributes``, a list of dicts with the ``id`` and ``level``
+        (``"observation"``, ``"series"`` or ``"dataset"``) of each attribute
+    """
+    codelists = {}
+    dimensions = []
+    attributes = []
+    for _, elem in ElementTree.iterparse(xml_file, events=("end",)):
+        tag = _local(elem.tag)
+        if tag == "Codelist":
+            codes = {}
+            for code in elem:
+                if _local(code.tag) == "Code":
+                    codes[code.get("id")] = {
+                        name.get(XML_LANG, "en"): name.text
+                        for name in code
+                        if _local(name.tag) == "Name"
+                    }
+            codelists[elem.get("id")] = codes
+            elem.clear()
+        elif tag == "Dimension":
+            codelist = None
+            for child in elem.iter():
+                if _local(child.tag) == "Enumeration" and len(child):
+                    codelist = child[0].get("id")
+            dimensions.append(
+                {
+                    "id": elem.get("id"),
+                    "position": int(elem.get("position", len(dimensions) + 1)),
+                    "codelist": codelist,
+                }
+            )
+        elif tag == "Attribute":
+            related = {_local(child.tag) for child in elem.iter()}
+            if "PrimaryMeasure" in related:
+                level = "observation"
+            elif "Dimension" in related or "Group" in related:
+                level = "series"
+            else:
+                level = "dataset"
+            attributes.append({"id": elem.get("id"), "level": level})
+    dimensions.sort(key=lambda d: d["position"])
+    return {"dimensions": dimensions, "codelists": codelists, "attributes": attributes}
+
+
+def _sdmx_members(zf: zipfile.ZipFile) -> tuple[str, str | None]:
+    xml_names = [n for n in zf.namelist() if n.lower().endswith(".xml")]
+    structure = [n for n in xml_names if "structure" in n.lower()]
+    data = [n for n in xml_names if n not in structure]
+    if not data:
+        raise ValueError(f"No SDMX data file in {zf.filename}")
+    return data[0], structure[0] if structure else None
+
+
+def _dimension_columns(
+    structure: dict | None, metadata: dict | None
+) -> dict[str, tuple[str, list[str], dict[str, int]]]:
+    """Column name, labels and code lookup for each dimension attribute.
+
+    Columns are named like the CSV: GEO for the first dimension and the
+    cube metadata's English dimension name for the rest.
+    """
+    if structure is None:
+        return {}
+    meta_names = {}
+    if metadata is not None:
+        for dim in metadata["dimension"]:
+            meta_names[dim["dimensionPositionId"]] = dim["dimensionNameEn"]
+    columns = {}
+    for dim in structure["dimensions"]:
+        codes = structure["codelists"].get(dim["codelist"], {})
+        labels = [names.get("en") or code for code, names in codes.items()]
+        lookup = {code: i for i, code in enumerate(codes)}
+        if dim["position"] == 1:
+            name = "GEO"
+        else:
+            name = meta_names.get(dim["position"], dim["id"])
+        columns[dim["id"]] = (name, labels, lookup)
+    return columns
+
+
+def _categorical(codes: np.ndarray, labels: list[str]) -> pd.Categorical:
+    if len(set(labels)) == len(labels):
+        return pd.Categorical.from_codes(codes, categories=labels)
+    # repeated labels under different codes get merged into one category
+    values = np.asarray(labels + [None], dtype=object)[codes]
+    return pd.Categorical(values)
+
+
+def _attribute_column(values) -> pd.Categorical:
+    column = pd.Categorical(np.asarray(values, dtype=object))
+    if column.categories.empty:
+        # an all empty attribute gets untyped categories, match the str ones
+        column = column.set_categories(pd.Index([], dtype=str))
+    return column
+
+
+def _build_chunk(
+    series: list[dict],
+    obs_series: list[int],
+    obs_attrs: dict[str, list],
+    dimensions: dict,
+    frequency_code: int | None,
+    attributes: dict[str, list[str]],
+) -> pd.DataFrame:
+    rows = np.asarray(obs_series, dtype=np.intp)
+    data = {"REF_DATE": pd.Series(obs_attrs.pop("TIME_PERIOD", [None] * len(rows)))}
+    # attributes the structure declares get a column even where no series or
+    # observation in this chunk has them, so every chunk has the same columns
+    series_keys = list(
+        dict.fromkeys([*(k for s in series for k in s), *attributes["series"]])
+    )
+    dim_keys = [k for k in dimensions if k in series_keys]
+    for key in dim_keys:
+        name, labels, lookup = dimensions[key]
+        codes = np.asarray([lookup.get(s.get(key), -1) for s in series])
+        data[name] = _categorical(codes[rows], labels)
+    for key in series_keys:
+        if key in dimensions:
+            continue
+        values = [s.get(key) for s in series]
+        if key == "VECTOR_ID":
+            values = [f"v{v}" if v is not None else None for v in values]
+        data[_RENAMES.get(key, key)] = _attribute_column(
+            np.asarray(values, dtype=object)[rows]
+        )
+    if dim_keys:
+        coordinates = [".".join(s.get(k, "") for k in dim_keys) for s in series]
+        data["COORDINATE"] = pd.Categorical(np.asarray(coordinates, dtype=object)[rows])
+    data["VALUE"] = pd.to_numeric(
+        pd.Series(obs_attrs.pop("OBS_VALUE", [None] * len(rows)), dtype=object),
+        errors="coerce",
+    ).astype(float)
+    for key in attributes["observation"]:
+        obs_attrs.setdefault(key, [None] * len(rows))
+    for key, values in obs_attrs.items():
+        data[_RENAMES.get(key, key)] = _attribute_column(values)
+    df = pd.DataFrame(data)
+    df["REF_DATE"] = parse_ref_dates(df["REF_DATE"], frequency_code)
+    return df
+
+
+def _iter_observations(
+    xml_file,
+    dimensions: dict,
+    frequency_code: int | None,
+    chunksize: int,
+    attributes: dict[str, list[str]],
+) -> Iterator[pd.DataFrame]:
+    series: list[dict] = []
+    obs_series: list[int] = []
+    obs_attrs: dict[str, list] = {}
+    n_obs = 0
+    dataset = None
+    for event, elem in ElementTree.iterparse(xml_file, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "DataSet":
+                dataset = elem
+            elif tag == "Series":
+                series.append(dict(elem.attrib))
+            continue
+        if tag == "Obs":
+            for key, value in elem.attrib.items():
+                obs_attrs.setdefault(key, [None] * n_obs).append(value)
+            n_obs += 1
+            obs_series.append(len(series) - 1)
+            for values in obs_attrs.values():
+                if len(values) < n_obs:
+                    values.append(None)
+        elif tag == "Series":
+            # drop finished series so the tree never grows
+            if dataset is not None:
+                dataset.clear()
+            if n_obs >= chunksize:
+                yield _build_chunk(
+                    series,
+                    obs_series,
+                    obs_attrs,
+                    dimensions,
+                    frequency_code,
+                    attributes,
+                )
+                series, obs_series, obs_attrs, n_obs = [], [], {}, 0
+    if n_obs:
+        yield _build_chunk(
+            series, obs_series, obs_attrs, dimensions, frequency_code, attributes
+        )
+
+
+def iter_sdmx_table_chunks(
+    table: str,
+    path: pathlib.Path | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[pd.DataFrame]:
+    """Stream a table's SDMX download as DataFrames of about chunksize rows.
+
+    If ``<table>.zip`` isn't in path it's downloaded first. Every chunk of a
+    dimension column shares the full set of that dimension's labels as its
+    categories, so chunks can be combined without recoding. Every chunk also
+    has a column for each attribute the structure file declares, empty where
+    the chunk doesn't use it. Attributes are named like the CSV's columns,
+    e.g. OBS_STATUS is STATUS.
+
+    Parameters
+    ----------
+    table
+        the table to read
+    path
+        where the SDMX zip is or should be downloaded to, defaults to the
+        current working directory
+    chunksize
+        observations per chunk, a chunk always ends on a whole series
+
+    Yields
+    ------
+    pandas.DataFrame
+        REF_DATE, one categorical column per dimension, the remaining series
+        attributes, COORDINATE, VALUE and the observation attributes. Without
+        a structure file, only the attributes the chunk uses.
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    zip_file = path / f"{table}.zip"
+    if not zip_file.is_file():
+        download_tables([table], path, csv=False)
+    metadata = None
+    meta_file = path / f"{table}.json"
+    if meta_file.is_file():
+        with open(meta_file) as json_file:
+            metadata = json.load(json_file)
+    frequency_code = metadata.get("frequencyCode") if metadata else None
+    with zipfile.ZipFile(zip_file) as zf:
+        data_member, structure_member = _sdmx_members(zf)
+        structure = None
+        if structure_member is not None:
+            with zf.open(structure_member) as xml_file:
+                structure = read_sdmx_structure(xml_file)
+        dimensions = _dimension_columns(structure, metadata)
+        attributes = {"series": [], "observation": []}
+        for attribute in (structure or {}).get("attributes", []):
+            if attribute["level"] in attributes:
+                attributes[attribute["level"]].append(attribute["id"])
+        with zf.open(data_member) as xml_file:
+            yield from _iter_observations(
+                xml_file, dimensions, frequency_code, chunksize, attributes
+            )
+
+
+def _align_chunks(chunks: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """Give every chunk the columns of all of them.
+
+    Only attributes can be missing from a chunk, they're added empty.
+    """
+    columns = list(dict.fromkeys(col for chunk in chunks for col in chunk.columns))
+    aligned = []
+    for chunk in chunks:
+        missing = [col for col in columns if col not in chunk.columns]
+        if missing:
+            empty = _attribute_column([None] * len(chunk))
+            chunk = chunk.assign(**{col: empty for col in missing})
+        aligned.append(chunk[columns])
+    return aligned
+
+
+def sdmx_table_to_dataframe(
+    table: str,
+    path: pathlib.Path | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> pd.DataFrame:
+    """Read a table's SDMX download into one DataFrame.
+
+    Parameters
+    ----------
+    table
+        the table to read
+    path
+        where the SDMX zip is or should be downloaded to, defaults to the
+        current working directory
+    chunksize
+        observations to parse at a time, see `iter_sdmx_table_chunks`
+
+    Returns
+    -------
+    :
+        the table, see `iter_sdmx_table_chunks` for its columns. Attributes
+        only some chunks used are empty in the rows of the rest.
+    """
+    chunks = list(iter_sdmx_table_chunks(table, path, chunksize))
+    if not chunks:
+        return pd.DataFrame()
+    return _merge_table_pieces(_align_chunks(chunks))
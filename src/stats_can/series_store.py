@@ -0,0 +1,163 @@
+"""Keep vectors locally and fetch only what's been released since.
+
+`vectors_to_df` refetches the whole requested history every call.
+`SeriesStore` keeps the points in a directory, one `VintageStore` partition
+per table:
+
+- ``<productId>/``: the table's vectors' points, see `stats_can.vintages`
+- ``state.json``: the table, latest refPer and latest releaseTime held for
+  each vector
+
+`SeriesStore.update` backfills vectors it hasn't seen with their latest
+periods, and asks `get_bulk_vector_data_by_range` only for releases since the
+last one it holds for the rest, so a daily update of thousands of vectors
+only moves the points released that day.
+"""
+
+import datetime as dt
+import json
+import os
+import pathlib
+import tempfile
+
+import pandas as pd
+
+from stats_can.helpers import parse_vectors
+from stats_can.scwds import (
+    get_bulk_vector_data_by_range,
+    get_data_from_vectors_and_latest_n_periods,
+    get_series_info_from_vector,
+)
+from stats_can.vintages import VintageStore
+
+STATE_FILE = "state.json"
+
+
+class SeriesStore:
+    """A directory of vectors that's updated incrementally.
+
+    Parameters
+    ----------
+    path
+        directory holding the store, created if it doesn't exist
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.path / STATE_FILE) as json_file:
+                self.state: dict[str, dict] = json.load(json_file)
+        except FileNotFoundError:
+            self.state = {}
+
+    def _save_state(self) -> None:
+        fd, tmp = tempfile.mkstemp(suffix=".json.tmp", dir=self.path)
+        with os.fdopen(fd, "w") as outfile:
+            json.dump(self.state, outfile)
+        os.replace(tmp, self.path / STATE_FILE)
+
+    def partition(self, product_id: int | str) -> VintageStore:
+        """The vintage store holding one table's vectors."""
+        return VintageStore(self.path / str(product_id))
+
+    def _store(self, vector_data: list, tables: dict[int, str]) -> int:
+        stored = 0
+        for product_id in set(tables.values()):
+            part = [v for v in vector_data if tables[v["vectorId"]] == product_id]
+            stored += self.partition(product_id).append(part)
+        for vec in vector_data:
+            points = vec["vectorDataPoint"]
+            if not points:
+                continue
+            entry = self.state.setdefault(
+                str(vec["vectorId"]),
+                {"productId": tables[vec["vectorId"]], "refPer": "", "releaseTime": ""},
+            )
+            entry["refPer"] = max([entry["refPer"]] + [p["refPer"] for p in points])
+            entry["releaseTime"] = max(
+                [entry["releaseTime"]] + [p["releaseTime"] for p in points]
+            )
+        return stored
+
+    def update(
+        self,
+        vectors: str | list[str],
+        periods: int = 120,
+        today: dt.date | None = None,
+    ) -> int:
+        """Bring vectors up to date, fetching only what's new.
+
+        Parameters
+        ----------
+        vectors
+            vector numbers to keep
+        periods
+            latest periods to backfill for vectors the store doesn't hold yet
+        today
+            last release date to fetch up to, defaults to today
+
+        Returns
+        -------
+        :
+            number of new points stored
+        """
+        today = today or dt.date.today()
+        vector_ids = list(dict.fromkeys(parse_vectors(vectors)))
+        new = [v for v in vector_ids if str(v) not in self.state]
+        tables = {
+            int(v): entry["productId"]
+            for v, entry in self.state.items()
+            if int(v) in vector_ids
+        }
+        stored = 0
+        if new:
+            for info in get_series_info_from_vector(new):
+                tables[info["vectorId"]] = str(info["productId"])
+            data = get_data_from_vectors_and_latest_n_periods(new, periods)
+            stored += self._store(data, tables)
+        # one request per distinct last release date, usually just one
+        since: dict[dt.date, list[int]] = {}
+        for v in vector_ids:
+            if v in new or not self.state.get(str(v), {}).get("releaseTime"):
+                continue
+            last = dt.date.fromisoformat(self.state[str(v)]["releaseTime"][:10])
+            since.setdefault(last, []).append(v)
+        for start, group in since.items():
+            data = get_bulk_vector_data_by_range(group, start, today)
+            stored += self._store(data, tables)
+        self._save_state()
+        return stored
+
+    def to_df(self, vectors: str | list[str] | None = None) -> pd.DataFrame:
+        """The latest value of each period of some vectors.
+
+        Parameters
+        ----------
+        vectors
+            vectors to get, defaults to every one in the store
+
+        Returns
+        -------
+        :
+            vectors as columns and reference period as the index, like
+            `stats_can.sc.vectors_to_df`
+        """
+        if vectors is None:
+            vector_ids = [int(v) for v in self.state]
+        else:
+            vector_ids = list(dict.fromkeys(parse_vectors(vectors)))
+        by_table: dict[str, list[int]] = {}
+        for v in vector_ids:
+            if str(v) in self.state:
+                by_table.setdefault(self.state[str(v)]["productId"], []).append(v)
+        latest = dt.datetime.max
+        frames = [
+            self.partition(table).as_of(latest, group)
+            for table, group in by_table.items()
+        ]
+        frames = [f for f in frames if not f.columns.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, axis=1, sort=True)
+        return df[[f"v{v}" for v in vector_ids if f"v{v}" in df.columns]]
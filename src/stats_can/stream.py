@@ -0,0 +1,353 @@
+"""Load a table straight from its download, without writing the zip first.
+
+`stats_can.sc.zip_table_to_dataframe` downloads the whole zip to disk and
+then reads it back. On workers with slow or small disks that round trip is
+all overhead, so `stream_table_to_dataframe` and `stream_table_chunks`
+inflate the CSV out of the HTTP response as it arrives and feed it to the
+parser. Only a network chunk and a read buffer of it are held at a time, on
+top of the rows parsed so far (or just the current chunk's, for the
+iterator).
+
+StatsCan's zips hold the table's CSV as their first, deflated member, with
+its CRC in a data descriptor after the data, so the CSV can be read from the
+local file header onwards without the central directory at the end. The
+CRC is still checked once the CSV has been read to the end.
+
+Passing ``tee`` also writes the response to ``<table>-eng.zip`` (and the
+metadata to ``<table>.json``) in that directory as it streams, exactly as
+`stats_can.sc.download_tables` would have, so the next load can come from
+disk.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+import struct
+import tempfile
+import zipfile
+import zlib
+from collections.abc import Iterator
+
+import pandas as pd
+
+from stats_can.helpers import parse_tables
+from stats_can.sc import (
+    _FRENCH_COLUMNS,
+    _check_zip,
+    _csv_options,
+    _download_state_file,
+    _finish_table,
+    _header_columns,
+    _lang_suffix,
+    _read_table_csv,
+    _table_dtypes,
+    parse_ref_dates,
+)
+from stats_can.scwds import _get_session, get_cube_metadata, get_full_table_download
+
+logger = logging.getLogger(__name__)
+
+# signature, version, flags, method, time, date, crc, sizes, name and extra
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+_HAS_DESCRIPTOR = 0x08
+_UTF8_NAME = 0x800
+_ZIP64_EXTRA = 0x0001
+READ_BUFFER = 2**20
+
+
+def _has_zip64_extra(extra: bytes) -> bool:
+    """Whether a local header's extra field has a zip64 record."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<2H", extra, offset)
+        if header_id == _ZIP64_EXTRA:
+            return True
+        offset += 4 + size
+    return False
+
+
+class _ZipMemberStream(io.RawIOBase):
+    """The inflated bytes of one member of a zip arriving in chunks.
+
+    Parameters
+    ----------
+    chunks
+        the zip's bytes in order, e.g. an HTTP response's ``iter_content``
+    name
+        the member to read, members before it are inflated and dropped
+    tee
+        binary file every chunk is also written to, in full even if the
+        member isn't read to the end
+    """
+
+    def __init__(self, chunks: Iterator[bytes], name: str, tee=None):
+        super().__init__()
+        self._chunks = chunks
+        self._tee = tee
+        self._pending = b""
+        self.verified = False
+        while True:
+            member, flags, expected_crc = self._read_local_header()
+            if member == name:
+                break
+            while self._inflate(READ_BUFFER):
+                pass
+            self._skip_descriptor(flags)
+        self._flags = flags
+        self._expected_crc = expected_crc
+        self._crc = 0
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:  # filter out keep-alive new chunks
+                if self._tee is not None:
+                    self._tee.write(chunk)
+                self._pending += chunk
+                return True
+        return False
+
+    def _take(self, n: int) -> bytes:
+        while len(self._pending) < n:
+            if not self._fill():
+                raise zipfile.BadZipFile("Download ended in the middle of the zip")
+        data, self._pending = self._pending[:n], self._pending[n:]
+        return data
+
+    def _read_local_header(self) -> tuple[str, int, int]:
+        header = self._take(_LOCAL_HEADER.size)
+        (signature, _, flags, method, _, _, crc, _, _, n_name, n_extra) = (
+            _LOCAL_HEADER.unpack(header)
+        )
+        if signature != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile("No table CSV in the downloaded zip")
+        name = self._take(n_name).decode("utf-8" if flags & _UTF8_NAME else "cp437")
+        self._zip64 = _has_zip64_extra(self._take(n_extra))
+        if method != zipfile.ZIP_DEFLATED:
+            raise zipfile.BadZipFile(f"{name} isn't deflated, it can't be streamed")
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        return name, flags, crc
+
+    def _inflate(self, max_length: int) -> bytes:
+        """Up to max_length more inflated bytes, empty at the member's end."""
+        while not self._inflater.eof:
+            if not self._pending and not self._fill():
+                raise zipfile.BadZipFile("Download ended in the middle of the zip")
+            data = self._inflater.decompress(self._pending, max_length)
+            if self._inflater.eof:
+                self._pending = self._inflater.unused_data
+            else:
+                self._pending = self._inflater.unconsumed_tail
+            if data:
+                return data
+        return b""
+
+    def _skip_descriptor(self, flags: int) -> int | None:
+        """Read past a member's data descriptor, returning its CRC.
+
+        The descriptor is an optional signature, the CRC and the compressed
+        and uncompressed sizes, 8 bytes each for zip64 members and 4 if not.
+        """
+        if not flags & _HAS_DESCRIPTOR:
+            return None
+        crc = self._take(4)
+        if crc == _DESCRIPTOR_SIGNATURE:
+            crc = self._take(4)
+        self._take(16 if self._zip64 else 8)
+        return struct.unpack("<L", crc)[0]
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._inflate(len(buffer))
+        if not data and not self.verified:
+            descriptor_crc = self._skip_descriptor(self._flags)
+            expected = self._expected_crc if descriptor_crc is None else descriptor_crc
+            if self._crc != expected:
+                raise zipfile.BadZipFile("Bad CRC-32 for the streamed table CSV")
+            self.verified = True
+        self._crc = zlib.crc32(data, self._crc)
+        buffer[: len(data)] = data
+        return len(data)
+
+    def drain(self) -> None:
+        """Write the rest of the zip to the tee without inflating it."""
+        for chunk in self._chunks:
+            self._tee.write(chunk)
+
+
+@contextlib.contextmanager
+def _table_stream(table: str, tee: pathlib.Path | None, lang: str):
+    """The table's metadata and a buffered stream of its inflated CSV."""
+    suffix = _lang_suffix(lang)
+    meta = get_cube_metadata([table])[0]
+    zip_url = get_full_table_download(table, csv=True, lang=lang)
+    response = _get_session().get(zip_url, stream=True, timeout=120)
+    response.raise_for_status()
+    chunks = response.iter_content(chunk_size=2**16)
+    if tee is None:
+        try:
+            with io.BufferedReader(
+                _ZipMemberStream(chunks, f"{table}.csv"), buffer_size=READ_BUFFER
+            ) as csv_file:
+                yield meta, csv_file
+        finally:
+            response.close()
+        return
+
+    tee = pathlib.Path(tee)
+    zip_file = tee / f"{table}{suffix}.zip"
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{zip_file.name}.", suffix=".part", dir=tee
+    )
+    tmp_file = pathlib.Path(tmp_name)
+    digest = hashlib.sha256()
+
+    def keep_download(raw: _ZipMemberStream) -> None:
+        raw.drain()
+        size = tee_file.tell()
+        tee_file.close()
+        if not raw.verified:
+            _check_zip(tmp_file, zip_file.name)
+        os.replace(tmp_file, zip_file)
+        with open(_download_state_file(zip_file), "w") as outfile:
+            json.dump(
+                {
+                    "url": zip_url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "sha256": digest.hexdigest(),
+                    "size": size,
+                },
+                outfile,
+            )
+        with open(tee / f"{table}.json", "w") as outfile:
+            json.dump(meta, outfile)
+        logger.info("saved %s while streaming it", zip_file.name)
+
+    try:
+        with os.fdopen(fd, "wb") as tee_file:
+            raw = _ZipMemberStream(_hashed(chunks, digest), f"{table}.csv", tee_file)
+            with io.BufferedReader(raw, buffer_size=READ_BUFFER) as csv_file:
+                try:
+                    yield meta, csv_file
+                except GeneratorExit:
+                    # the caller stopped early, the download is still good
+                    keep_download(raw)
+                    raise
+            keep_download(raw)
+    finally:
+        response.close()
+        tmp_file.unlink(missing_ok=True)
+
+
+def _hashed(chunks: Iterator[bytes], digest) -> Iterator[bytes]:
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+def _ref_date_column(lang: str) -> str:
+    return "REF_DATE" if lang == "en" else _FRENCH_COLUMNS["REF_DATE"]
+
+
+def stream_table_to_dataframe(
+    table: str,
+    tee: pathlib.Path | None = None,
+    engine: str = "c",
+    ref_date: str = "timestamp",
+    lang: str = "en",
+) -> pd.DataFrame:
+    """Download a table into a DataFrame without writing it to disk first.
+
+    Parameters
+    ----------
+    table
+        the table to load
+    tee
+        directory to also save the zip and metadata to, as
+        `stats_can.sc.download_tables` would, while it streams
+    engine
+        CSV parser for ``pandas.read_csv``, see
+        `stats_can.sc.zip_table_to_dataframe`
+    ref_date
+        ``"timestamp"`` or ``"period"``, see
+        `stats_can.sc.zip_table_to_dataframe`
+    lang
+        ``"en"`` or ``"fr"``, see `stats_can.sc.zip_table_to_dataframe`
+
+    Returns
+    -------
+    :
+        the table as a dataframe, the same as
+        `stats_can.sc.zip_table_to_dataframe` gives
+    """
+    table = parse_tables(table)[0]
+    with _table_stream(table, tee, lang) as (meta, csv_file):
+        header = csv_file.readline()
+        col_names = _header_columns(header)
+        df = _read_table_csv(csv_file, col_names, engine, _csv_options(header))
+        # read to the end so the CRC is checked
+        csv_file.read()
+    ref_col = _ref_date_column(lang)
+    df[ref_col] = parse_ref_dates(df[ref_col], meta.get("frequencyCode"), kind=ref_date)
+    return df
+
+
+def stream_table_chunks(
+    table: str,
+    chunksize: int = 100_000,
+    tee: pathlib.Path | None = None,
+    ref_date: str = "timestamp",
+    lang: str = "en",
+) -> Iterator[pd.DataFrame]:
+    """Download a table as DataFrames of chunksize rows, as it arrives.
+
+    Parameters
+    ----------
+    table
+        the table to load
+    chunksize
+        rows per DataFrame
+    tee
+        directory to also save the zip and metadata to while it streams. The
+        rest of the download is still saved if iteration stops early.
+    ref_date
+        ``"timestamp"`` or ``"period"``, see
+        `stats_can.sc.zip_table_to_dataframe`
+    lang
+        ``"en"`` or ``"fr"``, see `stats_can.sc.zip_table_to_dataframe`
+
+    Yields
+    ------
+    :
+        consecutive rows of the table, typed like
+        `stats_can.sc.zip_table_to_dataframe` but with categories of each
+        chunk's own labels
+    """
+    table = parse_tables(table)[0]
+    ref_col = _ref_date_column(lang)
+    with _table_stream(table, tee, lang) as (meta, csv_file):
+        header = csv_file.readline()
+        col_names = _header_columns(header)
+        frequency = meta.get("frequencyCode")
+        reader = pd.read_csv(
+            csv_file,
+            header=None,
+            names=col_names,
+            dtype=_table_dtypes(col_names),
+            chunksize=chunksize,
+            **_csv_options(header),
+        )
+        with reader:
+            for chunk in reader:
+                chunk = _finish_table(chunk)
+                chunk[ref_col] = parse_ref_dates(chunk[ref_col], frequency, ref_date)
+                yield chunk
+        csv_file.read()
@@ -0,0 +1,249 @@
+"""Memory-mapped local store for tables you query over and over.
+
+Parsing a table's CSV, or even reading it back from Parquet, builds Python
+objects for every string cell. The store instead keeps each downloaded table as
+a directory of flat NumPy files next to its zip:
+
+- ``VALUE.npy``: float64 values
+- ``REF_DATE.npy``: int64 days since 1970-01-01 (``NAT_DAYS`` where unknown)
+- ``<column>.codes.npy``: every other column as integer codes into the
+  labels listed for it in ``manifest.json`` (-1 where missing)
+
+Opening a store memory-maps those files, so it costs milliseconds whatever the
+table size, nothing is read until it's touched, and every process that opens
+the same table shares the same pages through the OS cache.
+"""
+
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from stats_can.helpers import parse_tables
+from stats_can.sc import _table_source, download_tables, zip_table_to_dataframe
+
+STORE_VERSION = 1
+NAT_DAYS = np.iinfo(np.int64).min
+_MANIFEST = "manifest.json"
+
+
+def _store_dir(table: str, path: pathlib.Path) -> pathlib.Path:
+    return path / f"{table}.store"
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    """Smallest signed int dtype that holds the codes.
+
+    This matches what pandas picks for categorical codes, which is what lets
+    ``pd.Categorical.from_codes`` wrap the memory map without copying it.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _encode(series: pd.Series) -> tuple[np.ndarray, list[str]]:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, sort=True, use_na_sentinel=True)
+    return codes.astype(_codes_dtype(len(labels))), [str(x) for x in labels]
+
+
+def _ref_date_days(ref_date: pd.Series) -> np.ndarray:
+    # NaT is int64 min under the hood, which is exactly NAT_DAYS
+    return ref_date.to_numpy(dtype="datetime64[D]").view(np.int64)
+
+
+def save_table_store(
+    table: str, path: pathlib.Path | None = None, df: pd.DataFrame | None = None
+) -> pathlib.Path:
+    """Convert a downloaded table into a memory-mappable store.
+
+    Parameters
+    ----------
+    table
+        the table to convert
+    path
+        where the table zip lives and the store is written, defaults to the
+        current working directory. The zip is downloaded if it's missing.
+    df
+        the table as already loaded by ``zip_table_to_dataframe``, to save
+        parsing it a second time
+
+    Returns
+    -------
+    :
+        path to the store directory
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    if df is None:
+        df = zip_table_to_dataframe(table, path=path, backend="pandas")
+    source = _table_source(table, path)
+    manifest = {
+        "version": STORE_VERSION,
+        "productId": table,
+        "rows": len(df),
+        "source_mtime_ns": source.stat().st_mtime_ns if source else 0,
+        "columns": [],
+        "labels": {},
+    }
+    tmp_dir = pathlib.Path(tempfile.mkdtemp(prefix=f".{table}.", dir=path))
+    try:
+        for col in df.columns:
+            if col == "VALUE":
+                kind, data = "value", df[col].to_numpy(dtype=np.float64)
+            elif col == "REF_DATE":
+                kind, data = "date", _ref_date_days(df[col])
+            else:
+                kind = "codes"
+                data, manifest["labels"][col] = _encode(df[col])
+            file_name = f"{col}.npy" if kind != "codes" else f"{col}.codes.npy"
+            np.save(tmp_dir / file_name, np.ascontiguousarray(data))
+            manifest["columns"].append({"name": col, "kind": kind, "file": file_name})
+        with open(tmp_dir / _MANIFEST, "w") as outfile:
+            json.dump(manifest, outfile)
+        store_dir = _store_dir(table, path)
+        if store_dir.exists():
+            shutil.rmtree(store_dir)
+        os.replace(tmp_dir, store_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return store_dir
+
+
+class TableStore:
+    """A table opened from its memory-mapped store.
+
+    Attributes are read-only NumPy memory maps; nothing is loaded from disk
+    until you index into them.
+
+    Parameters
+    ----------
+    store_dir
+        directory written by `save_table_store`
+    """
+
+    def __init__(self, store_dir: pathlib.Path):
+        self.store_dir = pathlib.Path(store_dir)
+        with open(self.store_dir / _MANIFEST) as json_file:
+            self.manifest = json.load(json_file)
+        self.product_id: str = self.manifest["productId"]
+        self.labels: dict[str, list[str]] = self.manifest["labels"]
+        self._arrays = {
+            col["name"]: np.load(self.store_dir / col["file"], mmap_mode="r")
+            for col in self.manifest["columns"]
+        }
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def columns(self) -> list[str]:
+        """Column names in the same order as the source CSV."""
+        return [col["name"] for col in self.manifest["columns"]]
+
+    @property
+    def values(self) -> np.ndarray:
+        """The VALUE column as float64."""
+        return self._arrays["VALUE"]
+
+    @property
+    def ref_date_days(self) -> np.ndarray:
+        """REF_DATE as int64 days since the epoch, ``NAT_DAYS`` where unknown."""
+        return self._arrays["REF_DATE"]
+
+    def codes(self, column: str) -> np.ndarray:
+        """Integer codes for a label column, index into ``labels[column]``.
+
+        Parameters
+        ----------
+        column
+            name of a column other than VALUE or REF_DATE
+
+        Returns
+        -------
+        :
+            codes, -1 where the source cell was empty
+        """
+        return self._arrays[column]
+
+    def to_frame(
+        self, columns: list[str] | None = None, ref_date: str = "datetime"
+    ) -> pd.DataFrame:
+        """Wrap the store as a pandas DataFrame.
+
+        VALUE and the categorical columns are views on the memory maps, so
+        building the frame doesn't copy or read them.
+
+        Parameters
+        ----------
+        columns
+            subset of columns to include, defaults to all of them
+        ref_date
+            ``"datetime"`` converts REF_DATE to datetime64 (the one column that
+            has to be copied), ``"days"`` leaves the int64 day counts as a view
+
+        Returns
+        -------
+        :
+            the table, label columns as categoricals
+        """
+        data = {}
+        for col in columns or self.columns:
+            arr = self._arrays[col]
+            if col == "VALUE":
+                data[col] = arr
+            elif col == "REF_DATE":
+                data[col] = arr if ref_date == "days" else _days_to_datetime(arr)
+            else:
+                data[col] = pd.Categorical.from_codes(
+                    arr, categories=pd.Index(self.labels[col]), validate=False
+                )
+        return pd.DataFrame(data, copy=False)
+
+
+def _days_to_datetime(days: np.ndarray) -> np.ndarray:
+    return days.view("datetime64[D]").astype("datetime64[s]")
+
+
+def open_table_store(table: str, path: pathlib.Path | None = None) -> TableStore:
+    """Open a table's memory-mapped store, building it first if needed.
+
+    The store is (re)built when it doesn't exist yet, or when the table's zip
+    is newer than the one the store was built from.
+
+    Parameters
+    ----------
+    table
+        the table to open
+    path
+        where the table zip and store live, defaults to the current working
+        directory
+
+    Returns
+    -------
+    :
+        the opened store
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    store_dir = _store_dir(table, path)
+    source = _table_source(table, path)
+    if not store_dir.is_dir():
+        if source is None:
+            download_tables([table], path)
+        save_table_store(table, path)
+    elif source is not None:
+        with open(store_dir / _MANIFEST) as json_file:
+            built_from = json.load(json_file)["source_mtime_ns"]
+        if source.stat().st_mtime_ns != built_from:
+            save_table_store(table, path)
+    return TableStore(store_dir)
@@ -0,0 +1,198 @@
+"""Recompress downloaded tables with a codec that's faster to read.
+
+StatsCan serves tables as deflated zips, and inflating a big one takes a
+single core a while every time it's read. `transcode_table` rewrites the
+table's CSV as ``<table>-eng.csv.zst`` (or ``.csv.lz4``) next to the zip,
+which zstd and lz4 decompress several times faster, and by default deletes
+the zip.
+
+Everything that reads a downloaded table, e.g.
+`stats_can.sc.zip_table_to_dataframe`, reads the copy instead of the zip, and
+the ``<table>.json`` metadata stays where it was, so
+`stats_can.sc.list_zipped_tables` and `stats_can.sc.zip_update_tables` still
+see the table. The copy is given the zip's modification time, so stores and
+indexes built from the zip stay current, and a newer zip downloaded later is
+read in its place until it's transcoded again (`zip_update_tables` does that
+for tables it updates). Install the ``arrow`` extra to use this.
+"""
+
+import logging
+import os
+import pathlib
+import time
+
+import pandas as pd
+
+from stats_can.helpers import parse_tables
+from stats_can.sc import (
+    _TRANSCODED,
+    _lang_suffix,
+    _open_table_csv,
+    _table_source,
+    download_tables,
+    list_zipped_tables,
+)
+
+logger = logging.getLogger(__name__)
+
+CODECS = {codec: suffix for suffix, codec in _TRANSCODED.items()}
+_BLOCK = 2**20
+
+
+def _read_seconds(source: pathlib.Path, csv_file: str) -> float:
+    """Time to decompress a table's whole CSV from source."""
+    start = time.perf_counter()
+    with _open_table_csv(source, csv_file) as myfile:
+        while myfile.read(_BLOCK):
+            pass
+    return time.perf_counter() - start
+
+
+def transcode_table(
+    table: str,
+    path: pathlib.Path | None = None,
+    codec: str = "zstd",
+    keep_zip: bool = False,
+    lang: str = "en",
+) -> dict:
+    """Rewrite a downloaded table's CSV with a faster codec.
+
+    Parameters
+    ----------
+    table
+        the table to transcode, downloaded first if it isn't in path
+    path
+        where the table was downloaded, defaults to the current working
+        directory
+    codec
+        ``"zstd"`` or ``"lz4"``
+    keep_zip
+        keep the zip alongside the copy, it's deleted by default
+    lang
+        ``"en"`` or ``"fr"``
+
+    Returns
+    -------
+    :
+        productId, codec, zip_bytes and bytes (the size of the zip and the
+        copy) and zip_seconds and seconds (the time to decompress the CSV
+        from each)
+
+    Raises
+    ------
+    ValueError
+        if codec isn't one of zstd or lz4
+    FileNotFoundError
+        if the table was already transcoded and its zip deleted
+    """
+    import pyarrow as pa
+
+    if codec not in CODECS:
+        raise ValueError(f"codec must be one of {list(CODECS)}, not {codec!r}")
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    stem = f"{table}{_lang_suffix(lang)}"
+    table_zip = path / f"{stem}.zip"
+    csv_file = f"{table}.csv"
+    if not table_zip.is_file():
+        if _table_source(table, path, lang) is not None:
+            raise FileNotFoundError(
+                f"{table_zip.name} was already transcoded and deleted, "
+                "download it again to transcode it with another codec"
+            )
+        download_tables([table], path, lang=lang)
+    target = path / f"{stem}{CODECS[codec]}"
+    tmp = target.with_name(f".{target.name}.part")
+    zip_seconds = 0.0
+    try:
+        with (
+            _open_table_csv(table_zip, csv_file) as src,
+            pa.output_stream(str(tmp), compression=codec) as dest,
+        ):
+            while True:
+                start = time.perf_counter()
+                block = src.read(_BLOCK)
+                zip_seconds += time.perf_counter() - start
+                if not block:
+                    break
+                dest.write(block)
+        zip_stat = table_zip.stat()
+        os.utime(tmp, ns=(zip_stat.st_atime_ns, zip_stat.st_mtime_ns))
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    for other in CODECS.values():
+        if other != CODECS[codec]:
+            (path / f"{stem}{other}").unlink(missing_ok=True)
+    report = {
+        "productId": table,
+        "codec": codec,
+        "zip_bytes": zip_stat.st_size,
+        "bytes": target.stat().st_size,
+        "zip_seconds": zip_seconds,
+        "seconds": _read_seconds(target, csv_file),
+    }
+    if not keep_zip:
+        table_zip.unlink()
+    logger.info(
+        "%s: %s is %.0f%% of the zip's size and decompresses %.1fx as fast",
+        table,
+        target.name,
+        100 * report["bytes"] / report["zip_bytes"],
+        report["zip_seconds"] / max(report["seconds"], 1e-9),
+    )
+    return report
+
+
+def transcode_tables(
+    tables: list[str] | None = None,
+    path: pathlib.Path | None = None,
+    codec: str = "zstd",
+    keep_zip: bool = False,
+) -> pd.DataFrame:
+    """Transcode many downloaded tables, reporting what it saved.
+
+    Parameters
+    ----------
+    tables
+        tables to transcode, defaults to every table in path whose zip
+        hasn't been transcoded yet
+    path
+        where the tables were downloaded, defaults to the current working
+        directory
+    codec
+        ``"zstd"`` or ``"lz4"``
+    keep_zip
+        keep the zips alongside the copies, they're deleted by default
+
+    Returns
+    -------
+    :
+        one row per table indexed by productId, with the columns
+        `transcode_table` reports plus saved_bytes and saved_seconds
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    if tables is None:
+        tables = [
+            meta["productId"]
+            for meta in list_zipped_tables(path)
+            if (source := _table_source(meta["productId"], path)) is not None
+            and source.suffix == ".zip"
+        ]
+    reports = [
+        transcode_table(table, path, codec=codec, keep_zip=keep_zip)
+        for table in parse_tables(tables)
+    ]
+    df = pd.DataFrame(
+        reports,
+        columns=["productId", "codec", "zip_bytes", "bytes", "zip_seconds", "seconds"],
+    ).set_index("productId")
+    df["saved_bytes"] = df["zip_bytes"] - df["bytes"]
+    df["saved_seconds"] = df["zip_seconds"] - df["seconds"]
+    logger.info(
+        "transcoded %d tables, saving %d bytes and %.2fs per full read",
+        len(df),
+        df["saved_bytes"].sum(),
+        df["saved_seconds"].sum(),
+    )
+    return df
@@ -0,0 +1,294 @@
+"""Read single vectors out of a downloaded table without loading all of it.
+
+A table's full CSV has each vector's rows spread through the whole file, so
+pulling one series out of it means parsing everything. The index rewrites the
+CSV once, sorted by vector, into a directory next to the zip:
+
+- ``rows.csv``: the header and every row, grouped by VECTOR, each vector's
+  rows in REF_DATE order
+- ``vectors.npy``: sorted int64 vector ids
+- ``spans.npy``: the start and end byte offset of each vector's rows
+
+Reading a vector is then a binary search of the memory-mapped ids and one
+read of just its bytes. The sort is an external merge sort over blocks of
+the CSV, so building the index needs about one block of memory however big
+the table is.
+"""
+
+import contextlib
+import csv
+import heapq
+import io
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from stats_can.helpers import parse_tables, parse_vectors
+from stats_can.sc import (
+    _header_columns,
+    _open_table_csv,
+    _read_table_csv,
+    _table_frequency,
+    _table_source,
+    download_tables,
+    parse_ref_dates,
+)
+
+INDEX_VERSION = 1
+BLOCK_BYTES = 64 * 2**20
+_MANIFEST = "manifest.json"
+
+
+def _index_dir(table: str, path: pathlib.Path) -> pathlib.Path:
+    return path / f"{table}.vindex"
+
+
+def _vector_key(line: bytes, col: int, n_cols: int) -> bytes:
+    """The VECTOR field of a CSV line, e.g. ``b"v41690973"``.
+
+    StatsCan quotes every field, so splitting on the quoted separator is
+    enough unless a label itself contains one.
+    """
+    fields = line.split(b'","')
+    if len(fields) != n_cols:
+        row = next(csv.reader([line.decode("utf-8")]))
+        return row[col].encode()
+    return fields[col].strip(b'"\r\n')
+
+
+def _write_runs(
+    csv_file, col: int, n_cols: int, tmp_dir: pathlib.Path, block_bytes: int
+) -> list[pathlib.Path]:
+    """Split the rows into files of about block_bytes, each sorted by vector.
+
+    Rows are stored as ``key<TAB>line`` so the merge can compare them as
+    plain bytes. Sorting on the whole record also orders each vector's rows
+    by REF_DATE, the first field.
+    """
+    runs = []
+    block: list[bytes] = []
+    size = 0
+
+    def flush():
+        block.sort()
+        run = tmp_dir / f"run{len(runs)}"
+        with open(run, "wb") as run_file:
+            run_file.writelines(block)
+        runs.append(run)
+        block.clear()
+
+    for line in csv_file:
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        block.append(_vector_key(line, col, n_cols) + b"\t" + line)
+        size += len(line)
+        if size >= block_bytes:
+            flush()
+            size = 0
+    if block or not runs:
+        flush()
+    return runs
+
+
+def build_vector_index(
+    table: str, path: pathlib.Path | None = None, block_bytes: int = BLOCK_BYTES
+) -> pathlib.Path:
+    """Write the vector sorted copy and index of a downloaded table.
+
+    Parameters
+    ----------
+    table
+        the table to index
+    path
+        where the table zip lives and the index is written, defaults to the
+        current working directory. The zip is downloaded if it's missing.
+    block_bytes
+        rows sorted in memory at a time
+
+    Returns
+    -------
+    :
+        path to the index directory
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    source = _table_source(table, path)
+    if source is None:
+        download_tables([table], path)
+        source = path / f"{table}-eng.zip"
+    tmp_dir = pathlib.Path(tempfile.mkdtemp(prefix=f".{table}.", dir=path))
+    try:
+        with _open_table_csv(source, f"{table}.csv") as csv_file:
+            header = csv_file.readline()
+            col_names = _header_columns(header)
+            col = col_names.index("VECTOR")
+            runs = _write_runs(csv_file, col, len(col_names), tmp_dir, block_bytes)
+        ids, spans = [], []
+        with open(tmp_dir / "rows.csv", "wb") as out, contextlib.ExitStack() as stack:
+            out.write(header)
+            run_files = [stack.enter_context(open(run, "rb")) for run in runs]
+            key, start = None, out.tell()
+            for record in heapq.merge(*run_files):
+                record_key, _, line = record.partition(b"\t")
+                if record_key != key:
+                    if key:
+                        ids.append(int(key[1:]))
+                        spans.append((start, out.tell()))
+                    key, start = record_key, out.tell()
+                out.write(line)
+            if key:
+                ids.append(int(key[1:]))
+                spans.append((start, out.tell()))
+        for run in runs:
+            run.unlink()
+        # merged in byte order ("v12" < "v3"), searched in numeric order
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind="stable")
+        np.save(tmp_dir / "vectors.npy", np.asarray(ids, dtype=np.int64)[order])
+        np.save(
+            tmp_dir / "spans.npy",
+            np.asarray(spans, dtype=np.int64).reshape(-1, 2)[order],
+        )
+        with open(tmp_dir / _MANIFEST, "w") as outfile:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "productId": table,
+                    "columns": col_names,
+                    "source_mtime_ns": source.stat().st_mtime_ns,
+                },
+                outfile,
+            )
+        index_dir = _index_dir(table, path)
+        if index_dir.exists():
+            shutil.rmtree(index_dir)
+        os.replace(tmp_dir, index_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return index_dir
+
+
+class VectorIndex:
+    """A table's vector index, opened for reading.
+
+    Parameters
+    ----------
+    index_dir
+        directory written by `build_vector_index`
+    """
+
+    def __init__(self, index_dir: pathlib.Path):
+        self.index_dir = pathlib.Path(index_dir)
+        with open(self.index_dir / _MANIFEST) as json_file:
+            self.manifest = json.load(json_file)
+        self.product_id: str = self.manifest["productId"]
+        self.vectors = np.load(self.index_dir / "vectors.npy", mmap_mode="r")
+        self.spans = np.load(self.index_dir / "spans.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def __contains__(self, vector) -> bool:
+        return self._position(parse_vectors(vector)[0]) is not None
+
+    def _position(self, vector_id: int) -> int | None:
+        pos = int(np.searchsorted(self.vectors, vector_id))
+        if pos < len(self.vectors) and self.vectors[pos] == vector_id:
+            return pos
+        return None
+
+    def read_bytes(self, vectors: str | list[str]) -> bytes:
+        """The CSV rows of some vectors, without the header.
+
+        Parameters
+        ----------
+        vectors
+            vectors to read, in the order their rows should come back
+
+        Returns
+        -------
+        :
+            each vector's rows, in REF_DATE order
+
+        Raises
+        ------
+        KeyError
+            if a vector isn't in the table
+        """
+        positions = []
+        for vector_id in parse_vectors(vectors):
+            pos = self._position(vector_id)
+            if pos is None:
+                raise KeyError(f"v{vector_id} is not in table {self.product_id}")
+            positions.append(pos)
+        chunks = []
+        with open(self.index_dir / "rows.csv", "rb") as rows:
+            for pos in positions:
+                start, end = self.spans[pos]
+                rows.seek(start)
+                chunks.append(rows.read(end - start))
+        return b"".join(chunks)
+
+    def read(self, vectors: str | list[str]) -> pd.DataFrame:
+        """Rows of some vectors as a DataFrame typed like the full table.
+
+        Parameters
+        ----------
+        vectors
+            vectors to read
+
+        Returns
+        -------
+        :
+            the vectors' rows with the columns and dtypes of
+            `stats_can.sc.zip_table_to_dataframe`
+
+        Raises
+        ------
+        KeyError
+            if a vector isn't in the table
+        """
+        col_names = self.manifest["columns"]
+        df = _read_table_csv(io.BytesIO(self.read_bytes(vectors)), col_names)
+        df["REF_DATE"] = parse_ref_dates(
+            df["REF_DATE"], _table_frequency(self.product_id, self.index_dir.parent)
+        )
+        return df
+
+
+def open_vector_index(table: str, path: pathlib.Path | None = None) -> VectorIndex:
+    """Open a table's vector index, building it first if needed.
+
+    The index is (re)built when it doesn't exist yet, or when the table's zip
+    is newer than the one it was built from.
+
+    Parameters
+    ----------
+    table
+        the table to open
+    path
+        where the table zip and index live, defaults to the current working
+        directory
+
+    Returns
+    -------
+    :
+        the opened index
+    """
+    path = pathlib.Path(path) if path else pathlib.Path()
+    table = parse_tables(table)[0]
+    index_dir = _index_dir(table, path)
+    source = _table_source(table, path)
+    if not index_dir.is_dir():
+        build_vector_index(table, path)
+    elif source is not None:
+        with open(index_dir / _MANIFEST) as json_file:
+            built_from = json.load(json_file)["source_mtime_ns"]
+        if source.stat().st_mtime_ns != built_from:
+            build_vector_index(table, path)
+    return VectorIndex(index_dir)
@@ -0,0 +1,291 @@
+"""Local history of every value a vector has been published with.
+
+`vectors_to_df` keeps one value per reference period, the latest. Backtests
+need what was known at the time, so `VintageStore` keeps every
+(vectorId, refPer, releaseTime, value, status) it's given, in a directory of
+append-only segments:
+
+- ``<n>.npy``: one structured array per append, sorted by vector, reference
+  period and release time
+- points whose value and status are the same as the previous release of
+  the same period aren't stored again, so refetching overlapping ranges
+  costs nothing on disk
+
+Segments are memory-mapped and each is sorted by vector, so a query slices
+just the vectors it needs out of each one with a binary search instead of
+refetching anything. `VintageStore.compact` merges the segments once there
+are many.
+"""
+
+import datetime as dt
+import os
+import pathlib
+import tempfile
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from stats_can.helpers import parse_vectors
+from stats_can.scwds import get_bulk_vector_data_by_range
+
+# the zone releaseTime is given in, and release is stored in
+RELEASE_TIMEZONE = ZoneInfo("America/Toronto")
+
+VINTAGE_DTYPE = np.dtype(
+    [
+        ("vector", np.int64),
+        ("ref", np.int64),  # days since 1970-01-01
+        ("release", np.int64),  # seconds since 1970-01-01, Eastern time
+        ("value", np.float64),
+        ("status", np.int16),
+    ]
+)
+
+
+def _sort(rows: np.ndarray) -> np.ndarray:
+    return rows[np.lexsort((rows["release"], rows["ref"], rows["vector"]))]
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _vector_data_rows(vector_data: list) -> np.ndarray:
+    """Flatten VectorData objects into sorted vintage rows."""
+    points = [
+        (
+            vec["vectorId"],
+            point["refPer"],
+            point["releaseTime"],
+            _to_float(point["value"]),
+            point["statusCode"],
+        )
+        for vec in vector_data
+        for point in vec["vectorDataPoint"]
+    ]
+    rows = np.empty(len(points), dtype=VINTAGE_DTYPE)
+    if points:
+        vector, ref, release, value, status = zip(*points)
+        rows["vector"] = vector
+        rows["ref"] = np.array(ref, dtype="datetime64[D]").view(np.int64)
+        rows["release"] = np.array(release, dtype="datetime64[s]").view(np.int64)
+        rows["value"] = value
+        rows["status"] = status
+    return _sort(rows)
+
+
+def _new_vintages(existing: np.ndarray, incoming: np.ndarray) -> np.ndarray:
+    """Incoming rows that differ from the release before them.
+
+    Both are merged in release order with existing rows first on ties, and
+    an incoming row is dropped when the row before it is the same period
+    with the same value and status.
+    """
+    rows = np.concatenate([existing, incoming])
+    is_new = np.concatenate(
+        [np.zeros(len(existing), bool), np.ones(len(incoming), bool)]
+    )
+    order = np.lexsort((is_new, rows["release"], rows["ref"], rows["vector"]))
+    rows, is_new = rows[order], is_new[order]
+    same = np.zeros(len(rows), bool)
+    prev, cur = rows[:-1], rows[1:]
+    same[1:] = (
+        (prev["vector"] == cur["vector"])
+        & (prev["ref"] == cur["ref"])
+        & (prev["status"] == cur["status"])
+        & (
+            (prev["value"] == cur["value"])
+            | (np.isnan(prev["value"]) & np.isnan(cur["value"]))
+        )
+    )
+    return rows[is_new & ~same]
+
+
+class VintageStore:
+    """Append-only store of vector values by release time.
+
+    Parameters
+    ----------
+    path
+        directory holding the store, created if it doesn't exist
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _segments(self) -> list[np.ndarray]:
+        return [np.load(f, mmap_mode="r") for f in sorted(self.path.glob("[0-9]*.npy"))]
+
+    def _write_segment(self, rows: np.ndarray, number: int) -> None:
+        fd, tmp = tempfile.mkstemp(suffix=".npy.tmp", dir=self.path)
+        with os.fdopen(fd, "wb") as outfile:
+            np.save(outfile, rows)
+        os.replace(tmp, self.path / f"{number:06d}.npy")
+
+    def rows(self, vectors: str | list[str] | None = None) -> np.ndarray:
+        """Stored rows, optionally only for some vectors.
+
+        Parameters
+        ----------
+        vectors
+            vectors to get, defaults to all of them
+
+        Returns
+        -------
+        :
+            structured array of `VINTAGE_DTYPE`, sorted by vector, reference
+            period and release time
+        """
+        pieces = []
+        ids = None if vectors is None else np.unique(parse_vectors(vectors))
+        for segment in self._segments():
+            if ids is None:
+                pieces.append(np.asarray(segment))
+                continue
+            starts = np.searchsorted(segment["vector"], ids, side="left")
+            ends = np.searchsorted(segment["vector"], ids, side="right")
+            pieces += [segment[a:b] for a, b in zip(starts, ends) if b > a]
+        if not pieces:
+            return np.empty(0, dtype=VINTAGE_DTYPE)
+        return _sort(np.concatenate(pieces))
+
+    def append(self, vector_data: list) -> int:
+        """Add the points of some VectorData, skipping ones already known.
+
+        Parameters
+        ----------
+        vector_data
+            as returned by the scwds vector functions, e.g.
+            `stats_can.scwds.get_bulk_vector_data_by_range`
+
+        Returns
+        -------
+        :
+            number of points stored
+        """
+        incoming = _vector_data_rows(vector_data)
+        if not len(incoming):
+            return 0
+        existing = self.rows(np.unique(incoming["vector"]).tolist())
+        new = _new_vintages(existing, incoming)
+        if len(new):
+            self._write_segment(new, len(self._segments()))
+        return len(new)
+
+    def compact(self) -> None:
+        """Merge every segment into one."""
+        segment_files = sorted(self.path.glob("[0-9]*.npy"))
+        if len(segment_files) < 2:
+            return
+        rows = self.rows()
+        self._write_segment(rows, 0)
+        for segment_file in segment_files[1:]:
+            segment_file.unlink()
+
+    def points(self, vectors: str | list[str] | None = None) -> pd.DataFrame:
+        """Every stored vintage as a long DataFrame.
+
+        Parameters
+        ----------
+        vectors
+            vectors to get, defaults to all of them
+
+        Returns
+        -------
+        :
+            vectorId, refPer, releaseTime, value and status, one row per
+            vintage
+        """
+        rows = self.rows(vectors)
+        return pd.DataFrame(
+            {
+                "vectorId": rows["vector"],
+                "refPer": rows["ref"].astype("datetime64[D]").astype("datetime64[s]"),
+                "releaseTime": rows["release"].astype("datetime64[s]"),
+                "value": rows["value"],
+                "status": rows["status"],
+            }
+        )
+
+    def as_of(
+        self, when: dt.datetime | dt.date, vectors: str | list[str] | None = None
+    ) -> pd.DataFrame:
+        """The vectors as they stood at a point in time.
+
+        Parameters
+        ----------
+        when
+            release time to look from, a date means the end of that day.
+            Naive times are taken as Eastern, like releaseTime, and aware
+            ones are converted to it.
+        vectors
+            vectors to get, defaults to all of them
+
+        Returns
+        -------
+        :
+            vectors as columns and reference period as the index, like
+            `stats_can.sc.vectors_to_df`, holding the latest value released
+            at or before when
+        """
+        if not isinstance(when, dt.datetime):
+            when = dt.datetime.combine(when, dt.time.max)
+        if when.tzinfo is not None:
+            when = when.astimezone(RELEASE_TIMEZONE)
+        cutoff = np.datetime64(when.replace(tzinfo=None), "s").view(np.int64)
+        rows = self.rows(vectors)
+        rows = rows[rows["release"] <= cutoff]
+        # rows are sorted by release within each period, so keep each last
+        last = np.ones(len(rows), bool)
+        last[:-1] = (rows["vector"][:-1] != rows["vector"][1:]) | (
+            rows["ref"][:-1] != rows["ref"][1:]
+        )
+        rows = rows[last]
+        df = pd.DataFrame(
+            {
+                "vector": "v" + pd.Series(rows["vector"]).astype(str),
+                "refPer": rows["ref"].astype("datetime64[D]").astype("datetime64[s]"),
+                "value": rows["value"],
+            }
+        )
+        wide = df.pivot(index="refPer", columns="vector", values="value")
+        wide.columns.name = None
+        if vectors is not None:
+            order = [f"v{v}" for v in dict.fromkeys(parse_vectors(vectors))]
+            wide = wide[[c for c in order if c in wide.columns]]
+        return wide
+
+
+def record_vintages(
+    vectors: str | list[str],
+    start_release_date: dt.date,
+    end_release_date: dt.date,
+    path: pathlib.Path | None = None,
+) -> int:
+    """Fetch vectors' releases over a date range into a vintage store.
+
+    Parameters
+    ----------
+    vectors
+        vector numbers to fetch
+    start_release_date
+        start release date for the data
+    end_release_date
+        end release date for the data
+    path
+        store directory, defaults to ``vintages`` in the current working
+        directory
+
+    Returns
+    -------
+    :
+        number of new points stored
+    """
+    store = VintageStore(pathlib.Path(path) if path else pathlib.Path("vintages"))
+    data = get_bulk_vector_data_by_range(vectors, start_release_date, end_release_date)
+    return store.append(data)
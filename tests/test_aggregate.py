@@ -0,0 +1,69 @@
+"""Tests for out-of-core table aggregates."""
+
+import io
+import pathlib
+
+import pandas as pd
+import pytest
+
+from stats_can import aggregate, sc
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    """23100216 loaded whole, with GEO as plain labels."""
+    df = sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    return df.assign(GEO=df["GEO"].astype(object))
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_aggregate_table_matches_groupby(loaded, processes):
+    """Chunked partial aggregates add up to a groupby of the loaded table."""
+    result = aggregate.aggregate_table(
+        "23100216",
+        aggs=["sum", "mean", "count", "min", "max"],
+        path=TEST_FILES_PATH,
+        processes=processes,
+        chunksize=5_000,
+    )
+    expected = loaded.groupby(["GEO", "REF_DATE"])["VALUE"].agg(
+        ["sum", "mean", "count", "min", "max"]
+    )
+    pd.testing.assert_frame_equal(result, expected, check_index_type=False)
+
+
+def test_aggregate_table_by_one_column(loaded):
+    """A single by column gives a flat index, REF_DATE parsed to dates."""
+    result = aggregate.aggregate_table(
+        "23100216", by="REF_DATE", aggs="count", path=TEST_FILES_PATH, processes=2
+    )
+    expected = loaded.groupby("REF_DATE")["VALUE"].count()
+    assert not isinstance(result.index, pd.MultiIndex)
+    pd.testing.assert_series_equal(result["count"], expected, check_names=False)
+
+
+def test_aggregate_table_rejects_unknown_aggs():
+    with pytest.raises(ValueError):
+        aggregate.aggregate_table("23100216", aggs="median", path=TEST_FILES_PATH)
+
+
+def test_aggregate_stream_folds_chunks():
+    """Groups split across chunks, missing values and labels all add up."""
+    rows = (
+        b'"A","x","1"\n"B","x",""\n"A","y","2"\n"","x","4"\n'
+        b'"A","x","5"\n"B","x","3"\n"","x",""\n"C","y",""\n'
+    )
+    options = {"quotechar": '"', "na_values": [""], "keep_default_na": False}
+    by = ["GEO", "UOM"]
+    partial = aggregate._aggregate_stream(
+        io.BytesIO(rows), ["GEO", "UOM", "VALUE"], options, by, "VALUE", 2
+    )
+    df = pd.read_csv(io.BytesIO(rows), header=None, names=["GEO", "UOM", "VALUE"])
+    expected = df.groupby(by, dropna=False)["VALUE"].agg(["sum", "count", "min", "max"])
+    pd.testing.assert_frame_equal(
+        partial.sort_index().astype(float),
+        expected.astype(float),
+        check_index_type=False,
+    )
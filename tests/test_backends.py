@@ -0,0 +1,153 @@
+"""Tests for the arrow and polars output backends."""
+
+import datetime as dt
+import json
+import pathlib
+import shutil
+
+import pandas as pd
+import pytest
+
+import stats_can
+from stats_can import backends, mirror, planner, table_store
+from stats_can.helpers import parse_vectors
+
+pa = pytest.importorskip("pyarrow")
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    """Leave the default backend as it was found."""
+    yield
+    backends.set_backend("pandas")
+
+
+def _vector_data():
+    return [
+        {
+            "vectorId": 1,
+            "vectorDataPoint": [
+                {"refPer": "2020-02-01", "value": 1.5, "frequencyCode": 6},
+                {"refPer": "2020-03-01", "value": None, "frequencyCode": 6},
+            ],
+        },
+        {
+            "vectorId": 2,
+            "vectorDataPoint": [
+                {"refPer": "2020-01-01", "value": 2.0, "frequencyCode": 6},
+            ],
+        },
+        {"vectorId": 3, "vectorDataPoint": []},
+    ]
+
+
+def test_vectors_to_arrow(monkeypatch):
+    """Vector data becomes a refPer column and one column per vector."""
+    monkeypatch.setattr(
+        stats_can.sc,
+        "get_data_from_vectors_and_latest_n_periods",
+        lambda vectors, periods: _vector_data(),
+    )
+    table = stats_can.sc.vectors_to_df(["v1", "v2", "v3"], backend="arrow")
+    assert isinstance(table, pa.Table)
+    assert table.column_names == ["refPer", "v1", "v2"]
+    assert table.schema.field("refPer").type == pa.timestamp("s")
+    assert table["v1"].to_pylist() == [None, 1.5, None]
+    expected = stats_can.sc.vectors_to_df(["v1", "v2", "v3"], backend="pandas")
+    pd.testing.assert_frame_equal(table.to_pandas().set_index("refPer"), expected)
+
+
+def test_zip_table_to_arrow():
+    """A table parsed by pyarrow holds the same values as the pandas load."""
+    expected = stats_can.sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    backends.set_backend("arrow")
+    table = stats_can.sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    assert isinstance(table, pa.Table)
+    assert table.column_names == list(expected.columns)
+    assert pa.types.is_dictionary(table.schema.field("GEO").type)
+    df = table.to_pandas()
+    for col in expected.columns:
+        if isinstance(expected[col].dtype, pd.CategoricalDtype):
+            assert df[col].astype(str).equals(expected[col].astype(str)), col
+        else:
+            pd.testing.assert_series_equal(df[col], expected[col])
+
+
+def test_code_sets_to_arrow(monkeypatch):
+    """Each code set becomes its own table."""
+    monkeypatch.setattr(
+        stats_can.sc,
+        "get_code_sets",
+        lambda: {"scalar": [{"scalarFactorCode": 0, "scalarFactorDescEn": "units"}]},
+    )
+    tables = stats_can.sc.code_sets_to_df_dict(backend="arrow")
+    assert tables["scalar"].to_pylist() == [
+        {"scalarFactorCode": 0, "scalarFactorDescEn": "units"}
+    ]
+
+
+def test_polars_backend(monkeypatch):
+    """Polars frames are made from the arrow tables."""
+    pl = pytest.importorskip("polars")
+    monkeypatch.setattr(
+        stats_can.sc,
+        "get_data_from_vectors_and_latest_n_periods",
+        lambda vectors, periods: _vector_data(),
+    )
+    df = stats_can.sc.vectors_to_df(["v1", "v2"], backend="polars")
+    assert isinstance(df, pl.DataFrame)
+    assert df.columns == ["refPer", "v1", "v2"]
+
+
+def test_bad_backend():
+    """Unknown backends and unsupported options fail before any work."""
+    with pytest.raises(ValueError):
+        backends.set_backend("spark")
+    with pytest.raises(ValueError):
+        stats_can.sc.zip_table_to_dataframe(
+            "23100216", path=TEST_FILES_PATH, backend="arrow", ref_date="period"
+        )
+
+
+def test_internal_callers_ignore_the_backend(monkeypatch, tmp_path):
+    """The table store, planner and mirror still get pandas frames."""
+    for f in ("18100204.json", "18100204-eng.zip"):
+        shutil.copyfile(TEST_FILES_PATH / f, tmp_path / f)
+    vectors = list(
+        stats_can.sc.zip_table_to_dataframe("18100204", path=tmp_path)[
+            "VECTOR"
+        ].cat.categories
+    )
+    backends.set_backend("arrow")
+
+    table_store.save_table_store("18100204", path=tmp_path)
+    store = table_store.open_table_store("18100204", path=tmp_path)
+    assert len(store.to_frame()) > 0
+
+    meta = json.loads((TEST_FILES_PATH / "18100204.json").read_text())
+    monkeypatch.setattr(
+        planner,
+        "get_series_info_from_vector",
+        lambda vs: [{"vectorId": v, "productId": 18100204} for v in parse_vectors(vs)],
+    )
+    monkeypatch.setattr(planner, "get_cube_metadata", lambda tables: [meta])
+    monkeypatch.setattr(planner, "download_tables", lambda tables, path: tables)
+    plan = planner.plan_vector_fetch(vectors, periods=1000, path=tmp_path)
+    assert [p["route"] for p in plan] == ["table"]
+    df = planner.fetch_vectors(vectors, periods=1000, path=tmp_path)
+    assert isinstance(df, pd.DataFrame)
+    assert list(df.columns) == vectors
+
+    monkeypatch.setattr(
+        stats_can.sc,
+        "get_data_from_vectors_and_latest_n_periods",
+        lambda vectors, periods: _vector_data(),
+    )
+    mirror_path = tmp_path / "mirror"
+    mirror.refresh_mirror(
+        mirror_path, tables=[], vectors=["v1", "v2"], today=dt.date(2024, 3, 6)
+    )
+    stored = pd.read_csv(mirror_path / mirror.VECTORS_FILE, index_col="refPer")
+    assert list(stored.columns) == ["v1", "v2"]
@@ -0,0 +1,60 @@
+"""Importing the package shouldn't drag in the heavy dependencies."""
+
+import subprocess
+import sys
+
+import pytest
+
+_HEAVY = ["pandas", "numpy", "tqdm", "requests", "pydantic"]
+
+
+def _loaded_after(code: str) -> set[str]:
+    """Run code in a fresh interpreter and report which heavy modules loaded.
+
+    Parameters
+    ----------
+    code
+        python source to run before checking sys.modules
+
+    Returns
+    -------
+    :
+        the heavy modules that ended up in sys.modules
+    """
+    report = f"print(','.join(m for m in {_HEAVY!r} if m in sys.modules))"
+    check = f"{code}\nimport sys\n{report}"
+    result = subprocess.run(
+        [sys.executable, "-c", check], capture_output=True, text=True, check=True
+    )
+    return set(filter(None, result.stdout.strip().split(",")))
+
+
+def test_import_is_light():
+    """Bare import shouldn't load pandas, requests, pydantic or tqdm."""
+    assert _loaded_after("import stats_can") == set()
+
+
+def test_scwds_import_skips_pandas():
+    """The web data service layer never needs pandas or tqdm."""
+    loaded = _loaded_after("from stats_can import scwds")
+    assert "pandas" not in loaded
+    assert "tqdm" not in loaded
+
+
+@pytest.mark.parametrize(
+    "name", ["sc", "scwds", "schemas", "vectors_to_df", "get_cube_metadata"]
+)
+def test_lazy_attributes_resolve(name):
+    """Everything in __all__ still resolves from the package namespace."""
+    import stats_can
+
+    assert getattr(stats_can, name) is not None
+    assert name in dir(stats_can)
+
+
+def test_unknown_attribute_raises():
+    """Missing names should still raise AttributeError."""
+    import stats_can
+
+    with pytest.raises(AttributeError):
+        stats_can.not_a_real_thing  # noqa: B018
@@ -0,0 +1,206 @@
+"""Tests for the mirror module and the stats-can command."""
+
+import datetime as dt
+import json
+
+import pandas as pd
+import pytest
+import requests
+
+from stats_can import cli, mirror
+
+TODAY = dt.date(2024, 3, 6)
+
+
+@pytest.fixture
+def fake_wds(monkeypatch):
+    """Stand in for the api calls a refresh makes, recording downloads."""
+    calls = {
+        "downloads": [],
+        "changed_cubes": [],
+        "changed_series": [],
+        "released": [],
+        "vector_fetches": [],
+        "series_lists": 0,
+    }
+
+    def download_tables(tables, path):
+        for table in tables:
+            calls["downloads"].append(table)
+            (path / f"{table}-eng.zip").write_bytes(f"{len(calls)}".encode() * 10)
+            (path / f"{table}.json").write_text(json.dumps({"productId": table}))
+        return tables
+
+    def vectors_to_df(vectors, periods, backend=None):
+        calls["vector_fetches"].append(list(vectors))
+        index = pd.date_range("2020-01-01", periods=periods, freq="MS", name="refPer")
+        fetch = len(calls["vector_fetches"])
+        return pd.DataFrame({f"v{v}": float(fetch) for v in vectors}, index=index)
+
+    def get_changed_series_list():
+        calls["series_lists"] += 1
+        return [{"vectorId": v} for v in calls["changed_series"]]
+
+    def get_bulk_vector_data_by_range(vectors, start, end):
+        return [
+            {"vectorId": v, "vectorDataPoint": [{}] if v in calls["released"] else []}
+            for v in vectors
+        ]
+
+    monkeypatch.setattr(mirror, "download_tables", download_tables)
+    monkeypatch.setattr(mirror, "vectors_to_df", vectors_to_df)
+    monkeypatch.setattr(
+        mirror,
+        "changed_tables_in_range",
+        lambda start, end, path: pd.DataFrame(
+            {"productId": calls["changed_cubes"], "releaseTime": pd.NaT}
+        ).set_index("productId"),
+    )
+    monkeypatch.setattr(mirror, "get_changed_series_list", get_changed_series_list)
+    monkeypatch.setattr(
+        mirror, "get_bulk_vector_data_by_range", get_bulk_vector_data_by_range
+    )
+    return calls
+
+
+def test_refresh_downloads_only_changed_tables(fake_wds, tmp_path):
+    """The first refresh gets everything, later ones only what changed."""
+    tables = ["18100204", "23100216"]
+    report = mirror.refresh_mirror(tmp_path, tables=tables, today=TODAY)
+    assert sorted(fake_wds["downloads"]) == tables
+    assert sorted(report["tables_updated"]) == tables
+    assert report["bytes_written"] > 0
+
+    report = mirror.refresh_mirror(tmp_path, tables=tables, today=TODAY)
+    assert report["tables_checked"] == 0
+    assert len(fake_wds["downloads"]) == 2
+
+    fake_wds["changed_cubes"] = [23100216]
+    report = mirror.refresh_mirror(tmp_path, tables=tables, today=TODAY)
+    assert fake_wds["downloads"][-1] == "23100216"
+    assert report["tables_checked"] == 1
+
+
+def test_refresh_defaults_to_tables_present(fake_wds, tmp_path):
+    """With no tables given the ones already mirrored are kept fresh."""
+    (tmp_path / "18100204.json").write_text(json.dumps({"productId": "18100204"}))
+    mirror.refresh_mirror(tmp_path, today=TODAY)
+    assert fake_wds["downloads"] == ["18100204"]
+
+
+def test_refresh_vectors(fake_wds, tmp_path):
+    """Only new vectors and ones with a release since the last run are refetched."""
+    vectors = ["v1", "v2"]
+    report = mirror.refresh_mirror(tmp_path, tables=[], vectors=vectors, today=TODAY)
+    assert report["vectors_updated"] == 2
+    assert fake_wds["vector_fetches"] == [[1, 2]]
+
+    report = mirror.refresh_mirror(tmp_path, tables=[], vectors=vectors, today=TODAY)
+    assert report["vectors_updated"] == 0
+    assert len(fake_wds["vector_fetches"]) == 1
+
+    fake_wds["changed_series"] = [1]
+    report = mirror.refresh_mirror(tmp_path, tables=[], vectors=vectors, today=TODAY)
+    assert report["vectors_updated"] == 1
+    assert fake_wds["vector_fetches"][-1] == [1]
+    df = pd.read_csv(tmp_path / mirror.VECTORS_FILE, index_col="refPer")
+    assert list(df.columns) == ["v1", "v2"]
+    assert (df["v1"] == 2.0).all() and (df["v2"] == 1.0).all()
+
+    # a later day asks for what was released since, not today's changes
+    series_lists = fake_wds["series_lists"]
+    fake_wds["released"] = [2]
+    report = mirror.refresh_mirror(
+        tmp_path, tables=[], vectors=[*vectors, "v3"], today=TODAY + dt.timedelta(1)
+    )
+    assert fake_wds["vector_fetches"][-1] == [3, 2]
+    assert report["vectors_updated"] == 2
+    assert fake_wds["series_lists"] == series_lists
+
+
+def test_overlapping_runs_are_refused(fake_wds, tmp_path):
+    """A refresh can't start while another holds the lock."""
+    with (
+        mirror.mirror_lock(tmp_path),
+        pytest.raises(RuntimeError, match="Another mirror run"),
+    ):
+        mirror.refresh_mirror(tmp_path, tables=["18100204"], today=TODAY)
+    assert fake_wds["downloads"] == []
+    mirror.refresh_mirror(tmp_path, tables=["18100204"], today=TODAY)
+    assert fake_wds["downloads"] == ["18100204"]
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        ("2024-03-05T07:00", "2024-03-05T08:30"),  # Tuesday before the release
+        ("2024-03-05T08:30", "2024-03-06T08:30"),  # right at it
+        ("2024-03-08T09:00", "2024-03-11T08:30"),  # Friday after it
+        ("2024-03-09T12:00", "2024-03-11T08:30"),  # Saturday
+    ],
+)
+def test_next_release(now, expected):
+    """Releases are weekdays at 8:30 Eastern.
+
+    Parameters
+    ----------
+    now: str
+        Eastern time to look forward from
+    expected: str
+        Eastern time of the next release
+    """
+    now = dt.datetime.fromisoformat(now).replace(tzinfo=mirror.RELEASE_TIMEZONE)
+    assert mirror.next_release(now) == dt.datetime.fromisoformat(expected).replace(
+        tzinfo=mirror.RELEASE_TIMEZONE
+    )
+
+
+def test_cli_mirror_once(monkeypatch, tmp_path, capsys):
+    """The command merges its config file with flags and refreshes once."""
+    config = tmp_path / "mirror.json"
+    config.write_text(json.dumps({"tables": [18100204], "vectors": ["v2"]}))
+    seen = {}
+
+    def refresh_mirror(path, **kwargs):
+        seen.update(kwargs, path=path)
+        return {"tables_updated": []}
+
+    monkeypatch.setattr(mirror, "refresh_mirror", refresh_mirror)
+    status = cli.main(
+        ["mirror", "--path", str(tmp_path), "--table", "23100216", "--vector", "v1"]
+        + ["--config", str(config), "--once"]
+    )
+    assert status == 0
+    assert seen["tables"] == ["23100216", "18100204"]
+    assert seen["vectors"] == ["v1", "v2"]
+    assert json.loads(capsys.readouterr().out) == {"tables_updated": []}
+
+
+def test_cli_mirror_locked(tmp_path):
+    """A locked mirror exits with an error status rather than a traceback."""
+    with mirror.mirror_lock(tmp_path):
+        assert cli.main(["mirror", "--path", str(tmp_path), "--once"]) == 1
+
+
+def test_cli_mirror_daemon_survives_failed_runs(monkeypatch, tmp_path, capsys):
+    """A failed refresh is logged and the daemon sleeps until the next one."""
+    outcomes = [
+        requests.ConnectionError("down"),
+        RuntimeError("Another mirror run holds the lock"),
+        {"tables_updated": []},
+        KeyboardInterrupt(),
+    ]
+    sleeps = []
+
+    def refresh_mirror(path, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(mirror, "refresh_mirror", refresh_mirror)
+    monkeypatch.setattr(cli.time, "sleep", sleeps.append)
+    with pytest.raises(KeyboardInterrupt):
+        cli.main(["mirror", "--path", str(tmp_path)])
+    assert len(sleeps) == 3
+    assert json.loads(capsys.readouterr().out) == {"tables_updated": []}
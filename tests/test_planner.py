@@ -0,0 +1,125 @@
+"""Tests for choosing and running vector fetch routes, without the live API."""
+
+import json
+import pathlib
+import shutil
+
+import pandas as pd
+import pytest
+
+from stats_can import planner, sc
+from stats_can.helpers import parse_vectors
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+TABLES = ["18100204", "23100216"]
+
+
+@pytest.fixture
+def tables():
+    """The test tables as loaded from their zips."""
+    return {t: sc.zip_table_to_dataframe(t, path=TEST_FILES_PATH) for t in TABLES}
+
+
+@pytest.fixture
+def fake_wds(monkeypatch, tables, tmp_path):
+    """Answer the planner's api calls from the test tables, recording routes."""
+    metas = {}
+    for table in TABLES:
+        shutil.copyfile(TEST_FILES_PATH / f"{table}.json", tmp_path / f"{table}.json")
+        metas[table] = json.loads((TEST_FILES_PATH / f"{table}.json").read_text())
+    owner = {
+        int(v[1:]): table
+        for table, df in tables.items()
+        for v in df["VECTOR"].cat.categories
+    }
+    calls = {"api": [], "downloads": []}
+
+    def vector_data(vector_id, rows):
+        return {
+            "vectorId": vector_id,
+            "vectorDataPoint": [
+                {"refPer": f"{d:%Y-%m-%d}", "value": v, "frequencyCode": 6}
+                for d, v in zip(rows["REF_DATE"], rows["VALUE"])
+            ],
+        }
+
+    def latest_n(vectors, periods):
+        calls["api"].append(list(vectors))
+        out = []
+        for v in vectors:
+            df = tables[owner[v]]
+            rows = df[df["VECTOR"] == f"v{v}"].sort_values("REF_DATE")
+            out.append(vector_data(v, rows.tail(periods)))
+        return out
+
+    def download_tables(tables_, path):
+        calls["downloads"] += tables_
+        for table in tables_:
+            shutil.copyfile(
+                TEST_FILES_PATH / f"{table}-eng.zip", path / f"{table}-eng.zip"
+            )
+
+    monkeypatch.setattr(
+        planner,
+        "get_series_info_from_vector",
+        lambda vectors: [
+            {"vectorId": v, "productId": owner[v]} for v in parse_vectors(vectors)
+        ],
+    )
+    monkeypatch.setattr(
+        planner, "get_cube_metadata", lambda ts: [metas[str(t)] for t in ts]
+    )
+    monkeypatch.setattr(planner, "get_data_from_vectors_and_latest_n_periods", latest_n)
+    monkeypatch.setattr(planner, "download_tables", download_tables)
+    return calls
+
+
+def _vectors(tables, table, n):
+    return list(tables[table]["VECTOR"].cat.categories[:n])
+
+
+def test_few_recent_points_use_the_api(fake_wds, tables, tmp_path):
+    """A couple of latest values don't justify a table download."""
+    vectors = _vectors(tables, "23100216", 2)
+    plan = planner.plan_vector_fetch(vectors, periods=1, path=tmp_path)
+    assert [p["route"] for p in plan] == ["vectors"]
+    assert plan[0]["vectors"] == [int(v[1:]) for v in vectors]
+
+
+def test_whole_table_histories_use_the_download(fake_wds, tables, tmp_path):
+    """Every series' full history is cheaper as the table itself."""
+    vectors = _vectors(tables, "18100204", 26)
+    plan = planner.plan_vector_fetch(vectors, periods=1000, path=tmp_path)
+    assert [p["route"] for p in plan] == ["table"]
+    assert plan[0]["table_cost"] < plan[0]["vector_cost"]
+
+
+def test_local_zip_lowers_the_table_cost(fake_wds, tables, tmp_path):
+    """A table already downloaded only costs its parse."""
+    vectors = _vectors(tables, "18100204", 26)
+    remote = planner.plan_vector_fetch(vectors, periods=1000, path=tmp_path)
+    shutil.copyfile(TEST_FILES_PATH / "18100204-eng.zip", tmp_path / "18100204-eng.zip")
+    local = planner.plan_vector_fetch(vectors, periods=1000, path=tmp_path)
+    assert local[0]["table_cost"] < remote[0]["table_cost"]
+
+
+def test_mixed_plan_gives_one_frame(fake_wds, tables, tmp_path):
+    """Both routes run and their columns come back in the order asked for."""
+    whole = _vectors(tables, "18100204", 26)
+    few = _vectors(tables, "23100216", 2)
+    vectors = [few[0], *whole, few[1]]
+    df = planner.fetch_vectors(vectors, periods=1000, path=tmp_path)
+    assert fake_wds["downloads"] == ["18100204"]
+    assert fake_wds["api"] == [[int(v[1:]) for v in few]]
+    assert list(df.columns) == vectors
+    assert df.index.name == "refPer"
+    expected = tables["18100204"]
+    expected = expected[expected["VECTOR"] == whole[3]].set_index("REF_DATE")
+    expected = expected["VALUE"].rename(whole[3]).rename_axis("refPer")
+    pd.testing.assert_series_equal(
+        df.loc[expected.index, whole[3]],
+        expected,
+        check_freq=False,
+    )
+    other = tables["23100216"]
+    assert df[few[0]].count() == (other["VECTOR"] == few[0]).sum()
@@ -0,0 +1,74 @@
+"""Tests for profiling table and vector loads."""
+
+import pathlib
+import tracemalloc
+
+import stats_can
+from stats_can import profiling, sc
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+def test_profile_zip_table_to_dataframe():
+    """A serial load records its stages in order, with the frame they built."""
+    with profiling.profile() as report:
+        df = sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    assert [s["stage"] for s in report.stages] == [
+        "header",
+        "csv_parse",
+        "categories",
+        "dates",
+    ]
+    assert report["header"]["frame_mib"] is None
+    frame_mib = df.memory_usage(deep=True).sum() / 2**20
+    assert abs(report["dates"]["frame_mib"] - frame_mib) < 0.01
+    assert all(s["seconds"] >= 0 and s["traced_peak_mib"] >= 0 for s in report.stages)
+    assert report.peak_stage in ("csv_parse", "dates")
+    assert list(report.to_df()["stage"]) == [s["stage"] for s in report.stages]
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_parallel_load():
+    """Parallel loads decompress and concat the workers' pieces."""
+    with profiling.profile() as report:
+        sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH, processes=2)
+    assert [s["stage"] for s in report.stages] == [
+        "decompress",
+        "header",
+        "csv_parse",
+        "concat",
+        "dates",
+    ]
+    assert report["concat"]["frame_mib"] > 0
+
+
+def test_profile_vectors_to_df(monkeypatch):
+    """vectors_to_df records the download, its series, the concat and dates."""
+    monkeypatch.setattr(
+        sc,
+        "get_data_from_vectors_and_latest_n_periods",
+        lambda vectors, periods: [
+            {
+                "vectorId": 1,
+                "vectorDataPoint": [
+                    {"refPer": "2020-01-01", "value": 1.5, "frequencyCode": 6}
+                ],
+            }
+        ],
+    )
+    with profiling.profile() as report:
+        stats_can.sc.vectors_to_df("v1")
+    assert [s["stage"] for s in report.stages] == [
+        "download",
+        "series",
+        "concat",
+        "dates",
+    ]
+    assert "categories" not in report
+
+
+def test_loads_outside_a_profile_record_nothing():
+    with profiling.profile() as report:
+        pass
+    sc.zip_table_to_dataframe("18100204", path=TEST_FILES_PATH)
+    assert report.stages == [] and report.peak_stage is None
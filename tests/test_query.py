@@ -0,0 +1,95 @@
+"""Tests for the SQL query layer over downloaded tables."""
+
+import json
+import os
+import pathlib
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_can import query, sc, table_store
+
+pytest.importorskip("pyarrow")
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+def _int_product_id(table: str) -> dict:
+    """A table's metadata with productId an int, as getCubeMetadata gives it."""
+    with open(TEST_FILES_PATH / f"{table}.json") as json_file:
+        meta = json.load(json_file)
+    return {**meta, "productId": int(meta["productId"])}
+
+
+@pytest.fixture
+def tables(tmp_path):
+    """Two downloaded tables, one of them with a table store."""
+    for table in ("18100204", "23100216"):
+        shutil.copyfile(
+            TEST_FILES_PATH / f"{table}-eng.zip", tmp_path / f"{table}-eng.zip"
+        )
+        with open(tmp_path / f"{table}.json", "w") as outfile:
+            json.dump(_int_product_id(table), outfile)
+    table_store.save_table_store("18100204", path=tmp_path)
+    return tmp_path
+
+
+def test_parquet_cache(tables):
+    """The Parquet copy is written once and again when the zip changes."""
+    parquet = query._parquet_cache("23100216", tables)
+    written = parquet.stat().st_mtime_ns
+    assert query._parquet_cache("23100216", tables).stat().st_mtime_ns == written
+    expected = sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    df = pd.read_parquet(parquet)
+    assert list(df.columns) == list(expected.columns)
+    np.testing.assert_array_equal(df["VALUE"], expected["VALUE"])
+    table_zip = tables / "23100216-eng.zip"
+    stat = table_zip.stat()
+    os.utime(table_zip, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert query._parquet_cache("23100216", tables).stat().st_mtime_ns != written
+
+
+def test_store_to_arrow(tables):
+    """A store read through arrow holds what the store's frame does."""
+    store = table_store.open_table_store("18100204", path=tables)
+    df = query._store_to_arrow(store).to_pandas()
+    expected = store.to_frame()
+    assert list(df.columns) == list(expected.columns)
+    assert df["GEO"].astype(str).equals(expected["GEO"].astype(str))
+    assert df["REF_DATE"].equals(expected["REF_DATE"])
+    np.testing.assert_array_equal(df["VALUE"], expected["VALUE"])
+
+
+def test_lookup_tables():
+    """Cubes has a row per table and members one per dimension member."""
+    meta = _int_product_id("18100204")
+    cubes, members = query._lookup_tables([meta])
+    assert cubes["productId"].tolist() == ["18100204"]
+    assert set(members["productId"]) == {"18100204"}
+    n_members = sum(len(dim["member"]) for dim in meta["dimension"])
+    assert len(members) == n_members
+    assert set(members["dimensionPositionId"]) == {1, 2}
+
+
+def test_query(tables):
+    """Tables join their members and aggregate in SQL."""
+    pytest.importorskip("duckdb")
+    result = query.query(
+        "SELECT m.memberNameEn AS geo, count(*) AS n, avg(t.VALUE) AS mean "
+        "FROM t18100204 t JOIN members m ON m.productId = '18100204' "
+        "AND m.dimensionPositionId = 1 "
+        "AND split_part(t.COORDINATE, '.', 1)::INTEGER = m.memberId "
+        "GROUP BY geo ORDER BY geo",
+        path=tables,
+    )
+    df = sc.zip_table_to_dataframe("18100204", path=TEST_FILES_PATH)
+    expected = df.groupby(df["GEO"].astype(str))["VALUE"].agg(["size", "mean"])
+    assert result["geo"].tolist() == expected.index.tolist()
+    assert result["n"].tolist() == expected["size"].tolist()
+    np.testing.assert_allclose(result["mean"], expected["mean"])
+    counts = query.query(
+        "SELECT count(*) AS n FROM t23100216", path=tables, tables=["23100216"]
+    )
+    assert counts["n"][0] == len(sc.zip_table_to_dataframe("23100216", TEST_FILES_PATH))
@@ -0,0 +1,337 @@
+"""Tests for how scwds builds and batches requests, without the live API."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from stats_can import sc, scwds
+
+
+def _vector_data(vector_id, n):
+    """A VectorData object with n monthly points."""
+    return {
+        "responseStatusCode": 0,
+        "productId": 99000001,
+        "coordinate": "1.1",
+        "vectorId": vector_id,
+        "vectorDataPoint": [
+            {
+                "refPer": f"2020-{month:02d}-01",
+                "refPer2": "",
+                "refPerRaw": f"2020-{month:02d}-01",
+                "refPerRaw2": "",
+                "value": float(month),
+                "decimals": 1,
+                "scalarFactorCode": 0,
+                "symbolCode": 0,
+                "statusCode": 0,
+                "securityLevelCode": 0,
+                "releaseTime": "2020-12-01T08:30",
+                "frequencyCode": 6,
+            }
+            for month in range(13 - n, 13)
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_chunkers(monkeypatch):
+    """Start every test without chunk sizes learned by earlier ones."""
+    monkeypatch.setattr(scwds, "_CHUNKERS", {})
+    monkeypatch.setattr(scwds, "_CHUNK_DELAY", 0)
+
+
+class _Payloads(list):
+    """Request payloads seen, plus the most vectors allowed per request."""
+
+    limit = scwds._MAX_CHUNK_VECTORS
+    # set to an Event to hold every response until it's set
+    hold = None
+
+
+@pytest.fixture
+def latest_n_api():
+    """Answer getDataFromVectorsAndLatestNPeriods, recording each payload.
+
+    Requests for more than ``latest_n_api.limit`` vectors time out.
+    """
+    payloads = _Payloads()
+
+    def request(method, url, json=None, **kwargs):
+        if len(json) > payloads.limit:
+            raise requests.exceptions.ReadTimeout("too big")
+        payloads.append(json)
+        if payloads.hold is not None:
+            payloads.hold.wait(5)
+        response = MagicMock(spec=requests.Response)
+        response.json.return_value = [
+            {"status": "SUCCESS", "object": _vector_data(r["vectorId"], r["latestN"])}
+            for r in json
+        ]
+        return response
+
+    with patch.object(scwds._session, "request", side_effect=request):
+        yield payloads
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.payloads.append(payload)
+        if len(payload) > self.server.payloads.limit:
+            # well past the client's timeout, so the read times out
+            time.sleep(1)
+        body = json.dumps(
+            [
+                {"status": "SUCCESS", "object": _vector_data(r["vectorId"], 1)}
+                for r in payload
+            ]
+        ).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # the client gave up waiting
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def slow_api(monkeypatch):
+    """A local WDS reached through the real session, its retries included.
+
+    Requests for more than ``slow_api.limit`` vectors answer too slowly.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.daemon_threads = True
+    server.payloads = _Payloads()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scwds._get_session.cache_clear()
+    for adapter in scwds._get_session().adapters.values():
+        # keep the retries but not the seconds of backoff between them
+        adapter.max_retries.backoff_factor = 0
+    monkeypatch.setattr(scwds, "SC_URL", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(scwds, "DEFAULT_TIMEOUT", 0.25)
+    yield server.payloads
+    server.shutdown()
+    server.server_close()
+    scwds._get_session.cache_clear()
+
+
+class TestLatestNPeriods:
+    """Per vector latestN in get_data_from_vectors_and_latest_n_periods."""
+
+    def test_single_periods_applies_to_every_vector(self, latest_n_api):
+        """The original call style still sends the same N for each vector."""
+        scwds.get_data_from_vectors_and_latest_n_periods(["v1", "v2"], 3)
+        assert latest_n_api == [
+            [{"vectorId": 1, "latestN": 3}, {"vectorId": 2, "latestN": 3}]
+        ]
+
+    def test_mapping_packs_mixed_depths_into_one_request(self, latest_n_api):
+        """Different N per vector share a request."""
+        result = scwds.get_data_from_vectors_and_latest_n_periods(
+            {"v1": 1, "v2": 12, 3: 6}
+        )
+        assert latest_n_api == [
+            [
+                {"vectorId": 1, "latestN": 1},
+                {"vectorId": 2, "latestN": 12},
+                {"vectorId": 3, "latestN": 6},
+            ]
+        ]
+        assert [len(r["vectorDataPoint"]) for r in result] == [1, 12, 6]
+
+    def test_mapping_keeps_n_aligned_across_chunks(self, latest_n_api):
+        """Each vector keeps its own N when the mapping spans several chunks."""
+        depths = {v: v % 12 + 1 for v in range(1, 601)}
+        scwds.get_data_from_vectors_and_latest_n_periods(depths)
+        assert len(latest_n_api) == 2
+        sent = {r["vectorId"]: r["latestN"] for p in latest_n_api for r in p}
+        assert sent == depths
+
+    def test_periods_required_without_mapping(self):
+        """A plain vector list needs periods."""
+        with pytest.raises(ValueError):
+            scwds.get_data_from_vectors_and_latest_n_periods(["v1"])
+
+    def test_vectors_to_df_mapping(self, latest_n_api):
+        """vectors_to_df passes a mapping straight through."""
+        df = sc.vectors_to_df({"v1": 2, "v2": 5})
+        assert len(latest_n_api) == 1
+        assert df["v1"].count() == 2
+        assert df["v2"].count() == 5
+
+
+class TestAdaptiveChunking:
+    """Request sizes follow expected and observed response sizes."""
+
+    def test_short_requests_fill_to_the_vector_limit(self, latest_n_api):
+        """latestN=1 packs the most vectors the api takes per request."""
+        scwds.get_data_from_vectors_and_latest_n_periods(list(range(1, 601)), 1)
+        assert [len(p) for p in latest_n_api] == [300, 300]
+
+    def test_long_requests_get_smaller_chunks(self, latest_n_api):
+        """Deep histories are split to stay near the point budget."""
+        scwds.get_data_from_vectors_and_latest_n_periods(list(range(1, 251)), 240)
+        sizes = [len(p) for p in latest_n_api]
+        assert sum(sizes) == 250
+        assert max(sizes) * 240 <= scwds._TARGET_CHUNK_POINTS
+
+    def test_timeouts_split_and_keep_order(self, slow_api):
+        """A chunk that times out through the session's retries is halved."""
+        slow_api.limit = 2
+        result = scwds.get_data_from_vectors_and_latest_n_periods([1, 2, 3, 4], 1)
+        assert [r["vectorId"] for r in result] == [1, 2, 3, 4]
+        assert [len(p) for p in slow_api] == [4, 4, 4, 4, 2, 2]
+
+    def test_single_vector_timeout_raises(self, latest_n_api):
+        """Nothing left to split, so the timeout propagates."""
+        latest_n_api.limit = 0
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            scwds.get_data_from_vectors_and_latest_n_periods(["v1", "v2"], 1)
+
+    def test_chunks_grow_when_responses_are_small(self):
+        """Observed points below the estimate scale chunks up."""
+        chunker = scwds._AdaptiveChunker()
+        pending = [(v, 240.0) for v in range(300)]
+        before = len(chunker.take(list(pending)))
+        chunker.succeeded(estimated=240.0 * before, observed=before)
+        assert len(chunker.take(list(pending))) > before
+
+    def test_other_errors_are_not_split(self):
+        """Client errors aren't a sign the request was too big."""
+        response = MagicMock(spec=requests.Response)
+        response.status_code = 404
+        assert not scwds._is_overload(requests.HTTPError(response=response))
+        response.status_code = 503
+        assert scwds._is_overload(requests.HTTPError(response=response))
+
+
+def _in_thread(func, *args):
+    """Start func in a thread, returning the thread and a list for its result."""
+    out = []
+    thread = threading.Thread(target=lambda: out.append(func(*args)))
+    thread.start()
+    return thread, out
+
+
+class TestCoalescing:
+    """Repeated and concurrent requests for the same data share calls."""
+
+    def test_repeated_vectors_fetched_once(self, latest_n_api):
+        """Duplicates are dropped before chunking but every entry gets a result."""
+        result = scwds.get_data_from_vectors_and_latest_n_periods(
+            ["v1", "v2", "v1", 1], 2
+        )
+        assert latest_n_api == [
+            [{"vectorId": 1, "latestN": 2}, {"vectorId": 2, "latestN": 2}]
+        ]
+        assert [r["vectorId"] for r in result] == [1, 2, 1, 1]
+        assert result[0] == result[2]
+        assert result[0] is not result[2]
+
+    def test_overlapping_callers_share_vectors(self, latest_n_api):
+        """A vector in flight for one thread isn't requested again by another."""
+        latest_n_api.hold = threading.Event()
+        fetch = scwds.get_data_from_vectors_and_latest_n_periods
+        first, first_out = _in_thread(fetch, [1, 2, 3], 1)
+        while not latest_n_api:
+            time.sleep(0.01)
+        second, second_out = _in_thread(fetch, [2, 3, 4], 1)
+        time.sleep(0.2)
+        latest_n_api.hold.set()
+        first.join(5)
+        second.join(5)
+        sent = [[r["vectorId"] for r in p] for p in latest_n_api]
+        assert sent == [[1, 2, 3], [4]]
+        assert [r["vectorId"] for r in first_out[0]] == [1, 2, 3]
+        assert [r["vectorId"] for r in second_out[0]] == [2, 3, 4]
+
+    def test_results_are_matched_by_vector_id(self):
+        """A reordered response still gives each vector its own series.
+
+        A vector missing from the response fails instead of getting another's.
+        """
+
+        def request(method, url, json=None, **kwargs):
+            response = MagicMock(spec=requests.Response)
+            response.json.return_value = [
+                {"status": "SUCCESS", "object": _vector_data(r["vectorId"], 1)}
+                for r in reversed(json)
+                if r["vectorId"] != 3
+            ]
+            return response
+
+        fetch = scwds.get_data_from_vectors_and_latest_n_periods
+        with patch.object(scwds._session, "request", side_effect=request):
+            assert [r["vectorId"] for r in fetch([1, 2], 1)] == [1, 2]
+            with pytest.raises(RuntimeError, match="vector 3"):
+                fetch([1, 2, 3, 4], 1)
+        assert not scwds._IN_FLIGHT
+
+    def test_different_parameters_are_not_shared(self, latest_n_api):
+        """The same vector with a different N is its own request."""
+        scwds.get_data_from_vectors_and_latest_n_periods({"v1": 1})
+        scwds.get_data_from_vectors_and_latest_n_periods({"v1": 2})
+        assert len(latest_n_api) == 2
+
+    def test_identical_requests_share_one_call(self):
+        """Concurrent identical metadata requests make one HTTP call."""
+        release = threading.Event()
+        calls = []
+
+        def request(method, url, **kwargs):
+            calls.append(url)
+            release.wait(5)
+            response = MagicMock(spec=requests.Response)
+            response.json.return_value = {"status": "SUCCESS", "object": "x.zip"}
+            return response
+
+        with patch.object(scwds._session, "request", side_effect=request):
+            threads = [
+                _in_thread(scwds.get_full_table_download, "18100204") for _ in range(3)
+            ]
+            time.sleep(0.2)
+            release.set()
+            for thread, _ in threads:
+                thread.join(5)
+        assert len(calls) == 1
+        assert [out for _, out in threads] == [["x.zip"]] * 3
+        assert not scwds._IN_FLIGHT
+
+    def test_failures_reach_every_waiter(self):
+        """A failed shared call raises in every caller and isn't cached."""
+        release = threading.Event()
+
+        def request(method, url, **kwargs):
+            release.wait(5)
+            raise requests.exceptions.ConnectionError("down")
+
+        errors = []
+
+        def call():
+            try:
+                scwds.get_full_table_download("18100204")
+            except requests.exceptions.ConnectionError as exc:
+                errors.append(exc)
+
+        with patch.object(scwds._session, "request", side_effect=request):
+            threads = [threading.Thread(target=call) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.2)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        assert len(errors) == 2
+        assert not scwds._IN_FLIGHT
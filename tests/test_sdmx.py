@@ -0,0 +1,183 @@
+"""Tests for reading SDMX table downloads."""
+
+import itertools
+import json
+import pathlib
+import shutil
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+import pandas as pd
+import pytest
+
+from stats_can import sc, sdmx
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+TABLE = "18100204"
+MES = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message"
+STR = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure"
+COM = "http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common"
+
+
+def _structure_xml(meta, attributes=()):
+    """A structure file with a code list per dimension of the cube metadata.
+
+    attributes are observation level attribute ids to declare.
+    """
+    codelists, dimensions = [], []
+    for dim in meta["dimension"]:
+        cl_id = f"CL_{dim['dimensionPositionId']}"
+        codes = "".join(
+            f'<str:Code id="{m["memberId"]}">'
+            f'<com:Name xml:lang="en">{m["memberNameEn"]}</com:Name>'
+            f'<com:Name xml:lang="fr">{m["memberNameFr"]}</com:Name></str:Code>'
+            for m in dim["member"]
+        )
+        codelists.append(f'<str:Codelist id="{cl_id}">{codes}</str:Codelist>')
+        dimensions.append(
+            f'<str:Dimension id="D{dim["dimensionPositionId"]}" '
+            f'position="{dim["dimensionPositionId"]}"><str:LocalRepresentation>'
+            f'<str:Enumeration><Ref id="{cl_id}"/></str:Enumeration>'
+            "</str:LocalRepresentation></str:Dimension>"
+        )
+    attribute_list = "".join(
+        f'<str:Attribute id="{attribute}"><str:AttributeRelationship>'
+        '<str:PrimaryMeasure><Ref id="OBS_VALUE"/></str:PrimaryMeasure>'
+        "</str:AttributeRelationship></str:Attribute>"
+        for attribute in attributes
+    )
+    return (
+        f'<mes:Structure xmlns:mes="{MES}" xmlns:str="{STR}" xmlns:com="{COM}">'
+        f"<mes:Structures><str:Codelists>{''.join(codelists)}</str:Codelists>"
+        "<str:DataStructures><str:DataStructure><str:DataStructureComponents>"
+        f"<str:DimensionList>{''.join(dimensions)}</str:DimensionList>"
+        f"<str:AttributeList>{attribute_list}</str:AttributeList>"
+        "</str:DataStructureComponents></str:DataStructure></str:DataStructures>"
+        "</mes:Structures></mes:Structure>"
+    )
+
+
+def _data_xml(df, quarterly=False):
+    """Structure specific data holding the rows of a full table CSV."""
+    parts = [f'<mes:StructureSpecificData xmlns:mes="{MES}"><mes:DataSet>']
+    for coordinate, rows in df.groupby("COORDINATE", observed=True, sort=False):
+        keys = " ".join(
+            f'D{i}="{member}"' for i, member in enumerate(coordinate.split("."), 1)
+        )
+        vector = rows["VECTOR"].iloc[0][1:]
+        parts.append(f'<Series {keys} VECTOR_ID="{vector}" UOM="351">')
+        for ref_date, value, status in zip(
+            rows["REF_DATE"], rows["VALUE"], rows["STATUS"]
+        ):
+            if quarterly:
+                period = f"{ref_date.year}-Q{(ref_date.month - 1) // 3 + 1}"
+            else:
+                period = ref_date.strftime("%Y-%m")
+            obs = f'<Obs TIME_PERIOD="{period}"'
+            if not pd.isna(value):
+                obs += f' OBS_VALUE="{value}"'
+            if not pd.isna(status):
+                obs += f" OBS_STATUS={quoteattr(status)}"
+            parts.append(obs + "/>")
+        parts.append("</Series>")
+    parts.append("</mes:DataSet></mes:StructureSpecificData>")
+    return "".join(parts)
+
+
+@pytest.fixture
+def sdmx_table(tmp_path):
+    """18100204 as an SDMX zip, with the CSV loader's frame to compare to."""
+    shutil.copyfile(TEST_FILES_PATH / f"{TABLE}.json", tmp_path / f"{TABLE}.json")
+    expected = sc.zip_table_to_dataframe(TABLE, path=TEST_FILES_PATH)
+    with open(TEST_FILES_PATH / f"{TABLE}.json") as json_file:
+        meta = json.load(json_file)
+    with zipfile.ZipFile(tmp_path / f"{TABLE}.zip", "w") as zf:
+        zf.writestr(f"{TABLE}.xml", _data_xml(expected))
+        zf.writestr(f"{TABLE}_Structure.xml", _structure_xml(meta))
+    return tmp_path, expected
+
+
+def _sort(df):
+    return df.sort_values(["COORDINATE", "REF_DATE"]).reset_index(drop=True)
+
+
+def test_matches_csv_loader(sdmx_table):
+    """Labels, dates, values and vectors match the full table CSV."""
+    path, expected = sdmx_table
+    df = sdmx.sdmx_table_to_dataframe(TABLE, path=path)
+    assert len(df) == len(expected)
+    df, expected = _sort(df), _sort(expected)
+    for col in ("GEO", "Index", "VECTOR", "COORDINATE"):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        assert df[col].astype(str).equals(expected[col].astype(str)), col
+    assert df["REF_DATE"].equals(expected["REF_DATE"])
+    pd.testing.assert_series_equal(df["VALUE"], expected["VALUE"])
+
+
+def test_chunks_share_categories(sdmx_table):
+    """Chunks end on whole series and carry every dimension member."""
+    path, expected = sdmx_table
+    chunks = list(sdmx.iter_sdmx_table_chunks(TABLE, path=path, chunksize=1000))
+    assert len(chunks) > 1
+    assert sum(len(c) for c in chunks) == len(expected)
+    assert len({tuple(c["GEO"].cat.categories) for c in chunks}) == 1
+    assert len(chunks[0]["GEO"].cat.categories) == 13
+    coordinates = [set(c["COORDINATE"].astype(str)) for c in chunks]
+    assert all(a.isdisjoint(b) for a, b in itertools.pairwise(coordinates))
+
+
+@pytest.mark.parametrize("declared", [False, True])
+def test_attributes_only_some_chunks_use(sdmx_table, declared):
+    """Only the chunk with 18100204's x statuses has OBS_STATUS in its data.
+
+    They still merge into a STATUS column like the CSV's, and when the
+    structure declares OBS_STATUS every chunk has the column.
+    """
+    path, expected = sdmx_table
+    if declared:
+        with open(TEST_FILES_PATH / f"{TABLE}.json") as json_file:
+            meta = json.load(json_file)
+        with zipfile.ZipFile(path / f"{TABLE}.zip", "w") as zf:
+            zf.writestr(f"{TABLE}.xml", _data_xml(expected))
+            zf.writestr(f"{TABLE}_Structure.xml", _structure_xml(meta, ["OBS_STATUS"]))
+    chunks = list(sdmx.iter_sdmx_table_chunks(TABLE, path=path, chunksize=1000))
+    has_status = ["STATUS" in chunk.columns for chunk in chunks]
+    assert has_status[0] == has_status[-1] == declared
+    assert any(has_status)
+    df = _sort(sdmx.sdmx_table_to_dataframe(TABLE, path=path, chunksize=1000))
+    expected = _sort(expected)
+    assert isinstance(df["STATUS"].dtype, pd.CategoricalDtype)
+    assert df["STATUS"].astype(object).equals(expected["STATUS"].astype(object))
+    assert "OBS_STATUS" not in df.columns
+    pd.testing.assert_series_equal(df["VALUE"], expected["VALUE"])
+
+
+def test_structure_labels(sdmx_table):
+    """Code lists keep each language's label."""
+    path, _ = sdmx_table
+    with zipfile.ZipFile(path / f"{TABLE}.zip") as zf:
+        structure = sdmx.read_sdmx_structure(zf.open(f"{TABLE}_Structure.xml"))
+    assert [d["id"] for d in structure["dimensions"]] == ["D1", "D2"]
+    assert structure["attributes"] == []
+    assert structure["codelists"]["CL_1"]["1"] == {"en": "Canada", "fr": "Canada"}
+
+
+def test_quarterly_periods(tmp_path):
+    """SDMX quarters like 2020-Q2 become the quarter's first day."""
+    df = pd.DataFrame(
+        {
+            "REF_DATE": pd.to_datetime(["2020-01-01", "2020-04-01", "2020-10-01"]),
+            "COORDINATE": "1.1",
+            "VECTOR": "v1",
+            "VALUE": [1.0, 2.0, None],
+            "STATUS": [None, "E", None],
+        }
+    )
+    with zipfile.ZipFile(tmp_path / f"{TABLE}.zip", "w") as zf:
+        zf.writestr(f"{TABLE}.xml", _data_xml(df, quarterly=True))
+    out = sdmx.sdmx_table_to_dataframe(TABLE, path=tmp_path)
+    assert out["REF_DATE"].tolist() == df["REF_DATE"].tolist()
+    assert out["VALUE"].isna().tolist() == [False, False, True]
+    assert out["STATUS"].astype(object).tolist()[1] == "E"
+    # without a structure file the dimension attributes come through raw
+    assert out["D1"].astype(str).tolist() == ["1"] * 3
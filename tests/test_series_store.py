@@ -0,0 +1,94 @@
+"""Tests for the incrementally updated series store."""
+
+import datetime as dt
+
+import pytest
+
+from stats_can import series_store
+
+
+def _vector_data(vector_id, points):
+    """VectorData with (refPer, releaseTime, value) points."""
+    return {
+        "vectorId": vector_id,
+        "vectorDataPoint": [
+            {"refPer": ref, "releaseTime": release, "value": value, "statusCode": 0}
+            for ref, release, value in points
+        ],
+    }
+
+
+@pytest.fixture
+def fake_wds(monkeypatch):
+    """Two vectors in two tables, recording what's asked for."""
+    calls = []
+    history = {
+        1: [
+            ("2020-01-01", "2020-02-10T08:30", 100.0),
+            ("2020-02-01", "2020-03-10T08:30", 105.0),
+        ],
+        2: [("2020-01-01", "2020-02-20T08:30", 7.0)],
+    }
+    new_releases = {
+        1: [
+            ("2020-02-01", "2020-03-10T08:30", 105.0),
+            ("2020-02-01", "2020-04-10T08:30", 104.0),
+            ("2020-03-01", "2020-04-10T08:30", 110.0),
+        ],
+        2: [],
+    }
+    monkeypatch.setattr(
+        series_store,
+        "get_series_info_from_vector",
+        lambda vectors: [{"vectorId": v, "productId": 1000 + v} for v in vectors],
+    )
+
+    def latest_n(vectors, periods):
+        calls.append(("latest", sorted(vectors)))
+        return [_vector_data(v, history[v]) for v in vectors]
+
+    def by_range(vectors, start, end):
+        calls.append(("range", sorted(vectors), start))
+        return [_vector_data(v, new_releases[v]) for v in vectors]
+
+    monkeypatch.setattr(
+        series_store, "get_data_from_vectors_and_latest_n_periods", latest_n
+    )
+    monkeypatch.setattr(series_store, "get_bulk_vector_data_by_range", by_range)
+    return calls
+
+
+def test_update_fetches_only_new_releases(fake_wds, tmp_path):
+    """The first update backfills, later ones ask from the last release."""
+    store = series_store.SeriesStore(tmp_path)
+    assert store.update(["v1", "v2"]) == 3
+    assert fake_wds == [("latest", [1, 2])]
+    assert store.state["1"] == {
+        "productId": "1001",
+        "refPer": "2020-02-01",
+        "releaseTime": "2020-03-10T08:30",
+    }
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1001", "1002", "state.json"]
+
+    reopened = series_store.SeriesStore(tmp_path)
+    assert reopened.update(["v1", "v2"], today=dt.date(2020, 5, 1)) == 2
+    assert fake_wds[1:] == [
+        ("range", [1], dt.date(2020, 3, 10)),
+        ("range", [2], dt.date(2020, 2, 20)),
+    ]
+    assert reopened.state["1"]["refPer"] == "2020-03-01"
+    assert reopened.state["1"]["releaseTime"] == "2020-04-10T08:30"
+
+
+def test_to_df(fake_wds, tmp_path):
+    """Reads give the latest value of each period across tables."""
+    store = series_store.SeriesStore(tmp_path)
+    store.update(["v1", "v2"])
+    store.update(["v1"])
+    df = store.to_df(["v2", "v1"])
+    assert list(df.columns) == ["v2", "v1"]
+    assert df.loc["2020-02-01", "v1"] == 104.0
+    assert df.loc["2020-03-01", "v1"] == 110.0
+    assert df.loc["2020-01-01", "v2"] == 7.0
+    assert list(store.to_df().columns) == ["v1", "v2"]
+    assert store.to_df("v3").empty
@@ -6,9 +6,13 @@ Refactor a lot of this setup and teardown into its own setup functions
 """
 
 import datetime as dt
+import json
 import pathlib
 import shutil
+import zipfile
+from unittest.mock import MagicMock
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -73,6 +77,37 @@ def test_vectors_to_df_by_periods():
     assert isinstance(r.index, pd.DatetimeIndex)
 
 
+def _points(*ref_pers, frequency_code=6):
+    """Minimal vectorDataPoint entries for the given refPers."""
+    return [
+        {"refPer": ref_per, "value": float(i), "frequencyCode": frequency_code}
+        for i, ref_per in enumerate(ref_pers)
+    ]
+
+
+def test_vectors_to_df_offline(monkeypatch):
+    """Series are outer joined on a parsed, sorted refPer index."""
+    response = [
+        {"vectorId": 1, "vectorDataPoint": _points("2020-02-01", "2020-03-01")},
+        {"vectorId": 2, "vectorDataPoint": _points("2020-01-01", "2020-02-01")},
+        {"vectorId": 3, "vectorDataPoint": []},
+    ]
+    monkeypatch.setattr(
+        stats_can.sc,
+        "get_data_from_vectors_and_latest_n_periods",
+        lambda vectors, periods: response,
+    )
+    r = stats_can.sc.vectors_to_df(["v1", "v2", "v3"], 2)
+    assert list(r.columns) == ["v1", "v2"]
+    assert isinstance(r.index, pd.DatetimeIndex)
+    assert r.index.name == "refPer"
+    assert list(r.index.month) == [1, 2, 3]
+    assert r["v1"].isna().tolist() == [True, False, False]
+    r = stats_can.sc.vectors_to_df(["v1", "v2"], 2, ref_date="period")
+    assert isinstance(r.index, pd.PeriodIndex)
+    assert r.index.freqstr == "M"
+
+
 @pytest.mark.integration
 def test_download_table(tmpdir):
     """Test downloading a table.
@@ -96,6 +131,119 @@ def test_download_table(tmpdir):
     assert t_zip.exists()
 
 
+class _FakeZipServer:
+    """Serve one table zip, honouring If-None-Match like the real server."""
+
+    def __init__(self, payload: bytes, conditional: bool = True):
+        self.payload = payload
+        self.conditional = conditional
+        self.sent_headers = []
+
+    @property
+    def etag(self) -> str:
+        return f'"{hash(self.payload)}"'
+
+    def get(self, url, headers=None, **kwargs):
+        self.sent_headers.append(headers or {})
+        response = MagicMock()
+        response.headers = {"ETag": self.etag, "content-length": len(self.payload)}
+        if self.conditional and (headers or {}).get("If-None-Match") == self.etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response.iter_content.return_value = [self.payload]
+        return response
+
+
+@pytest.fixture
+def zip_server(monkeypatch):
+    """Route download_tables for 18100204 to a _FakeZipServer."""
+    with open(TEST_FILES_PATH / "18100204.json") as json_file:
+        meta = json.load(json_file)
+    server = _FakeZipServer((TEST_FILES_PATH / "18100204-eng.zip").read_bytes())
+    monkeypatch.setattr(stats_can.sc, "get_cube_metadata", lambda tables: [meta])
+    monkeypatch.setattr(
+        stats_can.sc, "get_full_table_download", lambda table, **kwargs: "http://x"
+    )
+    monkeypatch.setattr(stats_can.sc, "_get_session", lambda: server)
+    return server
+
+
+def test_download_tables_conditional(zip_server, tmp_path):
+    """A table that hasn't changed isn't downloaded or rewritten again."""
+    stats_can.sc.download_tables("18100204", path=tmp_path)
+    zip_file = tmp_path / "18100204-eng.zip"
+    state = json.loads((tmp_path / "18100204-eng.download.json").read_text())
+    assert state["etag"] == zip_server.etag
+    assert len(state["sha256"]) == 64
+    mtime = zip_file.stat().st_mtime_ns
+    stats_can.sc.download_tables("18100204", path=tmp_path)
+    assert zip_server.sent_headers[-1]["If-None-Match"] == zip_server.etag
+    assert zip_file.stat().st_mtime_ns == mtime
+    # the download state isn't mistaken for a table
+    assert len(stats_can.sc.list_zipped_tables(tmp_path)) == 1
+
+
+def test_download_tables_same_content(zip_server, tmp_path):
+    """Identical bytes from a server that ignores validators aren't rewritten."""
+    zip_server.conditional = False
+    stats_can.sc.download_tables("18100204", path=tmp_path)
+    zip_file = tmp_path / "18100204-eng.zip"
+    mtime = zip_file.stat().st_mtime_ns
+    stats_can.sc.download_tables("18100204", path=tmp_path)
+    assert zip_file.stat().st_mtime_ns == mtime
+
+
+def test_download_tables_corrupt(zip_server, tmp_path):
+    """A corrupt download raises and leaves the previous copy alone."""
+    good = zip_server.payload
+    stats_can.sc.download_tables("18100204", path=tmp_path)
+    (tmp_path / "18100204.json").unlink()
+    zip_server.payload = good[: len(good) // 2]
+    with pytest.raises(zipfile.BadZipFile):
+        stats_can.sc.download_tables("18100204", path=tmp_path)
+    assert (tmp_path / "18100204-eng.zip").read_bytes() == good
+    assert not (tmp_path / "18100204.json").exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_changed_tables_in_range(tmp_path, monkeypatch):
+    """Days are fetched once each, past ones saved, releases deduplicated."""
+    today = dt.date.today()
+    calls = []
+
+    def get_changed_cube_list(day):
+        calls.append(day)
+        release = f"{day}T08:30"
+        return [
+            {"responseStatusCode": 0, "productId": 18100204, "releaseTime": release},
+            {"responseStatusCode": 0, "productId": 18100204, "releaseTime": release},
+            {"responseStatusCode": 0, "productId": 23100216, "releaseTime": release},
+        ]
+
+    monkeypatch.setattr(stats_can.sc, "get_changed_cube_list", get_changed_cube_list)
+    start = today - dt.timedelta(days=4)
+    df = stats_can.sc.changed_tables_in_range(start, path=tmp_path)
+    assert sorted(calls) == [start + dt.timedelta(days=n) for n in range(5)]
+    assert len(df) == 10
+    assert df.index.name == "productId"
+    assert df.loc[18100204, "releaseTime"].min() == pd.Timestamp(f"{start}T08:30")
+    saved = json.loads((tmp_path / stats_can.sc.CHANGED_CUBES_FILE).read_text())
+    assert sorted(saved) == [str(start + dt.timedelta(days=n)) for n in range(4)]
+    again = stats_can.sc.changed_tables_in_range(start, today, path=tmp_path)
+    assert calls[5:] == [today]
+    pd.testing.assert_frame_equal(again, df)
+    assert stats_can.sc.list_zipped_tables(tmp_path) == []
+    with pytest.raises(ValueError):
+        stats_can.sc.changed_tables_in_range(today, start, path=tmp_path)
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    stats_can.sc.changed_tables_in_range(start, today)
+    assert sorted(calls[6:]) == [start + dt.timedelta(days=n) for n in range(5)]
+    assert not list(cwd.iterdir())
+
+
 @pytest.mark.integration
 def test_zip_update_tables(tmpdir):
     """Test updating a table from a zip file using a different function signature.
@@ -120,6 +268,30 @@ def test_zip_update_tables(tmpdir):
     assert updater == ["18100204"]
 
 
+def test_zip_update_tables_each_language(tmp_path, monkeypatch):
+    """Tables are updated in every language they were downloaded in."""
+    for f in ("18100204.json", "23100216.json", "18100204-eng.zip"):
+        shutil.copyfile(TEST_FILES_PATH / f, tmp_path / f)
+    shutil.copyfile(TEST_FILES_PATH / "18100204-eng.zip", tmp_path / "18100204-fra.zip")
+    shutil.copyfile(TEST_FILES_PATH / "23100216-eng.zip", tmp_path / "23100216-fra.zip")
+    remote = {
+        t["productId"]: {**t, "cubeEndDate": "2099-01-01"}
+        for t in stats_can.sc.list_zipped_tables(tmp_path)
+    }
+    downloads = []
+    monkeypatch.setattr(
+        stats_can.sc, "get_cube_metadata", lambda ids: [remote[t] for t in ids]
+    )
+    monkeypatch.setattr(
+        stats_can.sc,
+        "download_tables",
+        lambda tables, path, csv=True, lang="en": downloads.append((tables, lang)),
+    )
+    updated = stats_can.sc.zip_update_tables(path=tmp_path)
+    assert sorted(updated) == ["18100204", "23100216"]
+    assert downloads == [(["18100204"], "en"), (sorted(updated), "fr")]
+
+
 def test_zip_table_to_dataframe(tmpdir):
     """Convert a zipped table to a pandas dataframe.
 
@@ -143,6 +315,121 @@ def test_zip_table_to_dataframe(tmpdir):
     assert df.columns[0] == "REF_DATE"
 
 
+@pytest.mark.parametrize("table", ["18100204", "23100216"])
+def test_zip_table_to_dataframe_parallel(table):
+    """Parsing in worker processes gives exactly the serial result.
+
+    Parameters
+    ----------
+    table: str
+        Table to load both ways
+    """
+    serial = stats_can.sc.zip_table_to_dataframe(table, path=TEST_FILES_PATH)
+    parallel = stats_can.sc.zip_table_to_dataframe(
+        table, path=TEST_FILES_PATH, processes=3
+    )
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_zip_table_to_dataframe_pyarrow():
+    """The pyarrow parser gives exactly the default parser's result."""
+    pytest.importorskip("pyarrow")
+    default = stats_can.sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    arrow = stats_can.sc.zip_table_to_dataframe(
+        "23100216", path=TEST_FILES_PATH, engine="pyarrow"
+    )
+    pd.testing.assert_frame_equal(arrow, default)
+
+
+@pytest.mark.parametrize(
+    "ref_date, expected",
+    [
+        ("2020", "2020-01-01"),
+        ("2020-07", "2020-07-01"),
+        ("2020-07-15", "2020-07-15"),
+        ("2019/2020", "2019-01-01"),
+    ],
+)
+def test_parse_ref_dates_layouts(ref_date, expected):
+    """Every REF_DATE layout StatsCan writes parses to its period start.
+
+    Parameters
+    ----------
+    ref_date: str
+        Date as written in a table
+    expected: str
+        Timestamp it should parse to
+    """
+    parsed = stats_can.sc.parse_ref_dates(pd.Series([ref_date, None]))
+    assert parsed.iloc[0] == pd.Timestamp(expected)
+    assert pd.isna(parsed.iloc[1])
+
+
+def test_parse_ref_dates_periods():
+    """FrequencyCode sets the period frequency, otherwise it's inferred."""
+    quarters = stats_can.sc.parse_ref_dates(
+        pd.Series(["2020-01", "2020-04"]), frequency_code=9, kind="period"
+    )
+    assert quarters.dtype == "period[Q-DEC]"
+    assert quarters.astype(str).tolist() == ["2020Q1", "2020Q2"]
+    years = stats_can.sc.parse_ref_dates(pd.Series(["2020", "2021"]), kind="period")
+    assert years.astype(str).tolist() == ["2020", "2021"]
+    with pytest.raises(ValueError):
+        stats_can.sc.parse_ref_dates(pd.Series(["2020"]), kind="date")
+
+
+def test_zip_table_to_dataframe_monthly_dates():
+    """Monthly REF_DATEs parse rather than coming back as NaT."""
+    df = stats_can.sc.zip_table_to_dataframe("18100204", path=TEST_FILES_PATH)
+    assert df["REF_DATE"].notna().all()
+    assert df["REF_DATE"].min() == pd.Timestamp("1981-01-01")
+    df = stats_can.sc.zip_table_to_dataframe(
+        "18100204", path=TEST_FILES_PATH, ref_date="period"
+    )
+    assert df["REF_DATE"].dtype == "period[M]"
+
+
+def _french_zip(tmp_path, table="18100204"):
+    """Write a French version of a test table the way StatsCan lays it out."""
+    english = stats_can.sc.zip_table_to_dataframe(table, path=TEST_FILES_PATH)
+    shutil.copyfile(TEST_FILES_PATH / f"{table}.json", tmp_path / f"{table}.json")
+    french = stats_can.sc.translate_table(english, table, path=tmp_path)
+    french["PÉRIODE DE RÉFÉRENCE"] = french["PÉRIODE DE RÉFÉRENCE"].dt.strftime("%Y-%m")
+    with zipfile.ZipFile(tmp_path / f"{table}-fra.zip", "w") as zf:
+        zf.writestr(f"{table}.csv", french.to_csv(index=False, sep=";", decimal=","))
+    return english
+
+
+def test_translate_table(tmp_path):
+    """Labels switch language on shared codes, and translate back exactly."""
+    english = stats_can.sc.zip_table_to_dataframe("18100204", path=TEST_FILES_PATH)
+    french = stats_can.sc.translate_table(english, "18100204", path=TEST_FILES_PATH)
+    assert "GÉO" in french.columns
+    assert "VALEUR" in french.columns
+    assert "Terre-Neuve-et-Labrador" in set(french["GÉO"].cat.categories)
+    np.testing.assert_array_equal(french["GÉO"].cat.codes, english["GEO"].cat.codes)
+    back = stats_can.sc.translate_table(
+        french, "18100204", path=TEST_FILES_PATH, lang="en"
+    )
+    assert list(back.columns) == list(english.columns)
+    for col in ("GEO", "Index"):
+        assert back[col].astype(str).equals(english[col].astype(str)), col
+
+
+def test_zip_table_to_dataframe_french(tmp_path):
+    """A French zip loads with typed columns under its French headers."""
+    english = _french_zip(tmp_path)
+    french = stats_can.sc.zip_table_to_dataframe("18100204", path=tmp_path, lang="fr")
+    assert french.columns[0] == "PÉRIODE DE RÉFÉRENCE"
+    assert french["PÉRIODE DE RÉFÉRENCE"].equals(english["REF_DATE"])
+    assert isinstance(french["GÉO"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_series_equal(
+        french["VALEUR"], english["VALUE"], check_names=False
+    )
+    with pytest.raises(ValueError):
+        stats_can.sc.zip_table_to_dataframe("18100204", path=tmp_path, lang="de")
+
+
 def test_list_tables(tmpdir):
     """Check which tables have been downloaded as zip files.
 
@@ -0,0 +1,150 @@
+"""Tests for loading tables straight from the download stream."""
+
+import io
+import json
+import pathlib
+import zipfile
+
+import pandas as pd
+import pytest
+
+from stats_can import sc, stream
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+class _Response:
+    """Streams a zip's bytes in small chunks, like a requests response."""
+
+    status_code = 200
+
+    def __init__(self, content: bytes):
+        self.headers = {"ETag": '"abc"'}
+        self.content = content
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), 1000):
+            yield self.content[start : start + 1000]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Serve a table zip (or replacement bytes for it) as the download."""
+
+    def serve_table(table, content=None):
+        with open(TEST_FILES_PATH / f"{table}.json") as json_file:
+            meta = json.load(json_file)
+        content = content or (TEST_FILES_PATH / f"{table}-eng.zip").read_bytes()
+        response = _Response(content)
+        monkeypatch.setattr(stream, "get_cube_metadata", lambda tables: [meta])
+        monkeypatch.setattr(
+            stream, "get_full_table_download", lambda table, csv, lang: "url"
+        )
+        monkeypatch.setattr(
+            stream,
+            "_get_session",
+            lambda: type("S", (), {"get": lambda self, *a, **k: response})(),
+        )
+        return response
+
+    return serve_table
+
+
+def _assert_same_table(df, expected):
+    """Column by column, assert_frame_equal is slow on big categoricals."""
+    assert list(df.columns) == list(expected.columns)
+    for col in expected.columns:
+        assert df[col].dtype == expected[col].dtype, col
+        if isinstance(expected[col].dtype, pd.CategoricalDtype):
+            assert df[col].cat.categories.equals(expected[col].cat.categories), col
+            assert (df[col].cat.codes == expected[col].cat.codes).all(), col
+        else:
+            pd.testing.assert_series_equal(df[col], expected[col])
+
+
+@pytest.mark.parametrize("table", ["18100204", "23100216"])
+def test_stream_table_to_dataframe(serve, table):
+    """A streamed table is the same as one loaded from the zip."""
+    response = serve(table)
+    df = stream.stream_table_to_dataframe(table)
+    expected = sc.zip_table_to_dataframe(table, path=TEST_FILES_PATH)
+    _assert_same_table(df, expected)
+    assert response.closed
+
+
+def test_stream_table_chunks(serve):
+    """Chunks are consecutive rows of the table."""
+    serve("23100216")
+    chunks = list(stream.stream_table_chunks("23100216", chunksize=10_000))
+    expected = sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    assert len(chunks) == -(-len(expected) // 10_000)
+    df = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_series_equal(df["VALUE"], expected["VALUE"])
+    assert df["REF_DATE"].equals(expected["REF_DATE"])
+    assert df["VECTOR"].astype(str).equals(expected["VECTOR"].astype(str))
+
+
+def test_tee_saves_the_download(serve, tmp_path):
+    """The tee is the served zip, kept even when iteration stops early."""
+    serve("23100216")
+    chunks = stream.stream_table_chunks("23100216", chunksize=100, tee=tmp_path)
+    next(chunks)
+    chunks.close()
+    saved = tmp_path / "23100216-eng.zip"
+    assert saved.read_bytes() == (TEST_FILES_PATH / "23100216-eng.zip").read_bytes()
+    assert sc._read_download_state(saved)["etag"] == '"abc"'
+    assert [t["productId"] for t in sc.list_zipped_tables(tmp_path)] == ["23100216"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.parametrize("damage", ["crc", "truncated"])
+def test_corrupt_stream(serve, tmp_path, damage):
+    """A bad CRC or a cut off download raises and keeps nothing."""
+    content = bytearray((TEST_FILES_PATH / "18100204-eng.zip").read_bytes())
+    with zipfile.ZipFile(TEST_FILES_PATH / "18100204-eng.zip") as zf:
+        info = zf.getinfo("18100204.csv")
+    if damage == "crc":
+        # the data descriptor's signature is followed by the CRC
+        data_end = 30 + len(info.filename) + len(info.extra) + info.compress_size
+        content[data_end + 4] ^= 0xFF
+    else:
+        content = content[: len(content) // 2]
+    serve("18100204", bytes(content))
+    with pytest.raises(zipfile.BadZipFile):
+        stream.stream_table_to_dataframe("18100204", tee=tmp_path)
+    assert not list(tmp_path.iterdir())
+
+
+class _Unseekable(io.RawIOBase):
+    """A write-only file, so zipfile writes data descriptors."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = io.BytesIO()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.written.write(data)
+
+
+@pytest.mark.parametrize("zip64", [False, True])
+def test_member_after_data_descriptors(zip64):
+    """Members ending in data descriptors are skipped to the table CSV."""
+    table_csv = b'"REF_DATE","VALUE"\n"2020-01","1.5"\n'
+    out = _Unseekable()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in [("_MetaData.csv", b"notes\n" * 100), ("1.csv", table_csv)]:
+            with zf.open(name, "w", force_zip64=zip64) as member:
+                member.write(data)
+    raw = stream._ZipMemberStream(iter([out.written.getvalue()]), "1.csv")
+    assert raw.read() == table_csv
+    assert raw.verified
@@ -0,0 +1,87 @@
+"""Tests for the synthetic table generator."""
+
+import datetime as dt
+import json
+import pathlib
+import zipfile
+
+import pytest
+from pydantic import TypeAdapter
+
+import stats_can
+from stats_can import synthetic
+from stats_can.schemas import CubeMetadata
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+DIMENSIONS = {
+    "Geography": ["Canada", "Alberta", "Quebec"],
+    "Sex": ["Both sexes", "Males", "Females"],
+    "Age group": ["15 years and over", 'Youth "15 to 24"'],
+}
+
+
+def test_spec_table_loads(tmp_path):
+    """A dimension spec produces a table zip_table_to_dataframe can read."""
+    zip_file = synthetic.write_synthetic_table(
+        tmp_path, dimensions=DIMENSIONS, periods=5, product_id=99000123
+    )
+    assert zip_file == tmp_path / "99000123-eng.zip"
+    df = stats_can.sc.zip_table_to_dataframe("99000123", path=tmp_path)
+    assert df.shape == (3 * 3 * 2 * 5, 16)
+    assert list(df.columns[:5]) == ["REF_DATE", "GEO", "DGUID", "Sex", "Age group"]
+    assert df["VECTOR"].nunique() == 18
+    assert set(df["Age group"]) == set(DIMENSIONS["Age group"])
+    assert df["VALUE"].dtype == float
+
+
+def test_metadata_is_valid(tmp_path):
+    """The json written alongside the zip validates as CubeMetadata."""
+    synthetic.write_synthetic_table(tmp_path, dimensions=DIMENSIONS, periods=3)
+    meta = json.loads((tmp_path / f"{synthetic.DEFAULT_PRODUCT_ID}.json").read_text())
+    TypeAdapter(CubeMetadata).validate_python(meta)
+    assert meta["nbSeriesCube"] == 18
+    assert meta["nbDatapointsCube"] == 54
+    assert stats_can.sc.list_zipped_tables(tmp_path)[0]["productId"] == 99000001
+
+
+def test_from_existing_metadata(tmp_path):
+    """Existing cube metadata drives the column layout and series count."""
+    meta = json.loads((TEST_FILES_PATH / "23100216.json").read_text())
+    synthetic.write_synthetic_table(tmp_path, metadata=meta, periods=2)
+    with zipfile.ZipFile(tmp_path / "23100216-eng.zip") as zf:
+        assert sorted(zf.namelist()) == ["23100216.csv", "23100216_MetaData.csv"]
+        with zf.open("23100216.csv") as f:
+            header = f.readline().decode("utf-8-sig").strip()
+        with zf.open("23100216.csv") as f:
+            rows = sum(1 for _ in f) - 1
+    with (
+        zipfile.ZipFile(TEST_FILES_PATH / "23100216-eng.zip") as zf,
+        zf.open("23100216.csv") as f,
+    ):
+        real_header = f.readline().decode("utf-8-sig").strip()
+    assert header == real_header
+    assert rows == 3 * 75 * 4 * 2
+
+
+@pytest.mark.parametrize(
+    "frequency_code, expected",
+    [(1, "2020-01-01"), (6, "2020-01"), (9, "2020-01"), (12, "2020")],
+)
+def test_ref_date_formats(tmp_path, frequency_code, expected):
+    """REF_DATE is written the way full table downloads write it."""
+    synthetic.write_synthetic_table(
+        tmp_path,
+        dimensions={"Geography": ["Canada"]},
+        periods=1,
+        frequency_code=frequency_code,
+        start=dt.date(2020, 1, 1),
+    )
+    with zipfile.ZipFile(tmp_path / "99000001-eng.zip") as zf:
+        lines = zf.read("99000001.csv").decode("utf-8-sig").splitlines()
+    assert lines[1].startswith(f'"{expected}",')
+
+
+def test_needs_exactly_one_source(tmp_path):
+    """Dimensions and metadata are mutually exclusive."""
+    with pytest.raises(ValueError):
+        synthetic.write_synthetic_table(tmp_path)
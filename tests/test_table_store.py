@@ -0,0 +1,74 @@
+"""Tests for the memory-mapped table store."""
+
+import os
+import pathlib
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import stats_can
+from stats_can import table_store
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+def _copy_table(tmp_path, table="18100204"):
+    for f in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(TEST_FILES_PATH / f, tmp_path / f)
+
+
+def test_round_trip_matches_zip(tmp_path):
+    """A table read back from the store matches the zip loader."""
+    _copy_table(tmp_path)
+    expected = stats_can.sc.zip_table_to_dataframe("18100204", path=tmp_path)
+    store = table_store.open_table_store("18100204", path=tmp_path)
+    actual = store.to_frame()
+    assert len(store) == len(expected)
+    assert store.columns == list(expected.columns)
+    np.testing.assert_array_equal(actual["VALUE"], expected["VALUE"])
+    for col in expected.columns.drop(["VALUE", "REF_DATE"]):
+        assert actual[col].astype(object).equals(expected[col].astype(object)), col
+    assert actual["REF_DATE"].equals(expected["REF_DATE"])
+
+
+def test_frame_is_a_view(tmp_path):
+    """VALUE and label codes in the frame share memory with the memory maps."""
+    _copy_table(tmp_path)
+    store = table_store.open_table_store("18100204", path=tmp_path)
+    df = store.to_frame(ref_date="days")
+    assert isinstance(store.values, np.memmap)
+    assert np.shares_memory(df["VALUE"].to_numpy(), store.values)
+    assert np.shares_memory(df["GEO"].array.codes, store.codes("GEO"))
+    assert np.shares_memory(df["REF_DATE"].to_numpy(), store.ref_date_days)
+    assert store.codes("GEO").dtype == np.int8
+
+
+def test_missing_dates_survive(tmp_path):
+    """NaT REF_DATEs are stored as NAT_DAYS and come back as NaT."""
+    df = pd.DataFrame(
+        {
+            "REF_DATE": pd.to_datetime(["2020-01-01", None]),
+            "GEO": pd.Categorical(["Canada", None]),
+            "VALUE": [1.0, np.nan],
+        }
+    )
+    table_store.save_table_store("12345678", path=tmp_path, df=df)
+    store = table_store.TableStore(tmp_path / "12345678.store")
+    assert store.ref_date_days[1] == table_store.NAT_DAYS
+    out = store.to_frame()
+    assert out["REF_DATE"].isna().tolist() == [False, True]
+    assert out["GEO"].isna().tolist() == [False, True]
+
+
+def test_rebuilds_when_zip_changes(tmp_path):
+    """A newer zip triggers a rebuild on open."""
+    _copy_table(tmp_path)
+    table_store.open_table_store("18100204", path=tmp_path)
+    manifest = tmp_path / "18100204.store" / "manifest.json"
+    first_build = manifest.stat().st_mtime_ns
+    zip_file = tmp_path / "18100204-eng.zip"
+    stat = zip_file.stat()
+    os.utime(zip_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    table_store.open_table_store("18100204", path=tmp_path)
+    assert manifest.stat().st_mtime_ns != first_build
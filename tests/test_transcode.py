@@ -0,0 +1,84 @@
+"""Tests for recompressing downloaded tables."""
+
+import os
+import pathlib
+import shutil
+
+import pandas as pd
+import pytest
+
+from stats_can import sc, table_store, transcode
+
+pytest.importorskip("pyarrow")
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+@pytest.fixture
+def tables(tmp_path):
+    """Two downloaded tables."""
+    for table in ("18100204", "23100216"):
+        for f in (f"{table}.json", f"{table}-eng.zip"):
+            shutil.copyfile(TEST_FILES_PATH / f, tmp_path / f)
+    return tmp_path
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4"])
+def test_transcoded_table_loads_the_same(tables, codec):
+    """The copy replaces the zip and loads to the same DataFrame."""
+    expected = sc.zip_table_to_dataframe("18100204", path=tables)
+    report = transcode.transcode_table("18100204", path=tables, codec=codec)
+    assert report["codec"] == codec
+    assert report["bytes"] > 0 and report["zip_bytes"] > 0
+    assert not (tables / "18100204-eng.zip").exists()
+    assert sc._table_source("18100204", tables).name.startswith("18100204-eng.csv.")
+    pd.testing.assert_frame_equal(
+        sc.zip_table_to_dataframe("18100204", path=tables), expected
+    )
+    parallel = sc.zip_table_to_dataframe("18100204", path=tables, processes=2)
+    pd.testing.assert_series_equal(parallel["VALUE"], expected["VALUE"])
+    listed = sorted(t["productId"] for t in sc.list_zipped_tables(tables))
+    assert listed == ["18100204", "23100216"]
+
+
+def test_transcode_tables_report(tables):
+    """Every untranscoded zip is transcoded and the savings add up."""
+    report = transcode.transcode_tables(path=tables, keep_zip=True)
+    assert sorted(report.index) == ["18100204", "23100216"]
+    assert (report["saved_bytes"] == report["zip_bytes"] - report["bytes"]).all()
+    assert (tables / "23100216-eng.zip").exists()
+    assert transcode.transcode_tables(path=tables).empty
+    with pytest.raises(ValueError):
+        transcode.transcode_table("18100204", path=tables, codec="brotli")
+
+
+def test_newer_zip_wins_and_stores_stay_current(tables):
+    """Caches built from the zip survive transcoding, a new download doesn't."""
+    store = table_store.open_table_store("18100204", path=tables)
+    built = (store.store_dir / "VALUE.npy").stat().st_mtime_ns
+    transcode.transcode_table("18100204", path=tables, keep_zip=True)
+    store = table_store.open_table_store("18100204", path=tables)
+    assert (store.store_dir / "VALUE.npy").stat().st_mtime_ns == built
+    table_zip = tables / "18100204-eng.zip"
+    stat = table_zip.stat()
+    os.utime(table_zip, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert sc._table_source("18100204", tables) == table_zip
+
+
+def test_zip_update_tables_transcodes_again(tables, monkeypatch):
+    """An updated table is downloaded and recompressed with its old codec."""
+    transcode.transcode_table("18100204", path=tables, codec="lz4")
+
+    def fake_download(tables_, path, csv=True, lang="en"):
+        for table in tables_:
+            shutil.copyfile(
+                TEST_FILES_PATH / f"{table}-eng.zip", path / f"{table}-eng.zip"
+            )
+
+    remote = {t["productId"]: t for t in sc.list_zipped_tables(tables)}
+    remote["18100204"] = {**remote["18100204"], "cubeEndDate": "2099-01-01"}
+    monkeypatch.setattr(sc, "get_cube_metadata", lambda ids: [remote[t] for t in ids])
+    monkeypatch.setattr(sc, "download_tables", fake_download)
+    assert sc.zip_update_tables(path=tables) == ["18100204"]
+    assert not (tables / "18100204-eng.zip").exists()
+    assert (tables / "18100204-eng.csv.lz4").exists()
@@ -0,0 +1,75 @@
+"""Tests for the per vector index of downloaded tables."""
+
+import os
+import pathlib
+import shutil
+
+import pandas as pd
+import pytest
+
+from stats_can import sc, vector_index
+
+TEST_FILES_PATH = pathlib.Path(__file__).parent / "test_files"
+
+
+def _copy_table(tmp_path, table="23100216"):
+    for f in (f"{table}.json", f"{table}-eng.zip"):
+        shutil.copyfile(TEST_FILES_PATH / f, tmp_path / f)
+
+
+@pytest.fixture
+def index(tmp_path):
+    """23100216 indexed in small blocks so the merge has many runs."""
+    _copy_table(tmp_path)
+    vector_index.build_vector_index("23100216", path=tmp_path, block_bytes=2**20)
+    return vector_index.open_vector_index("23100216", path=tmp_path)
+
+
+def test_read_matches_full_table(index):
+    """A vector read through the index is its rows of the full load."""
+    full = sc.zip_table_to_dataframe("23100216", path=TEST_FILES_PATH)
+    assert len(index) == full["VECTOR"].nunique()
+    vectors = list(full["VECTOR"].cat.categories[[0, 200, 440]])
+    df = index.read(vectors)
+    expected = full[full["VECTOR"].isin(vectors)]
+    expected = expected.sort_values(
+        "VECTOR", key=lambda s: s.astype(str).map(vectors.index), kind="stable"
+    )
+    assert list(df.columns) == list(full.columns)
+    assert df["VECTOR"].astype(str).tolist() == expected["VECTOR"].astype(str).tolist()
+    assert df["REF_DATE"].tolist() == expected["REF_DATE"].tolist()
+    pd.testing.assert_series_equal(
+        df["VALUE"], expected["VALUE"].reset_index(drop=True)
+    )
+
+
+def test_reads_only_the_vectors_bytes(index):
+    """One vector's bytes are a small slice of the sorted copy."""
+    vector = f"v{index.vectors[0]}"
+    rows = index.read_bytes(vector)
+    assert rows.count(b"\n") == len(index.read(vector))
+    assert len(rows) < (index.index_dir / "rows.csv").stat().st_size / 100
+    assert vector in index
+    assert "v1" not in index
+    with pytest.raises(KeyError):
+        index.read_bytes(["v1"])
+
+
+def test_rebuilt_when_zip_changes(tmp_path):
+    """A newer zip rebuilds the index on open."""
+    _copy_table(tmp_path, "18100204")
+    first = vector_index.open_vector_index("18100204", path=tmp_path)
+    built = (first.index_dir / "vectors.npy").stat().st_mtime_ns
+    table_zip = tmp_path / "18100204-eng.zip"
+    stat = table_zip.stat()
+    os.utime(table_zip, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    second = vector_index.open_vector_index("18100204", path=tmp_path)
+    assert (second.index_dir / "vectors.npy").stat().st_mtime_ns != built
+    assert len(second) == 26
+
+
+def test_vector_key_with_quoted_separator():
+    """A label holding the quoted separator falls back to the csv module."""
+    line = b'"2020-01","a"",""b","v12","1.1"\n'
+    assert vector_index._vector_key(line, 2, 4) == b"v12"
+    assert vector_index._vector_key(b'"2020-01","x","v7","1"\n', 2, 4) == b"v7"
@@ -0,0 +1,111 @@
+"""Tests for the vintage store."""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_can import vintages
+
+
+def _vector_data(vector_id, points):
+    """VectorData with (refPer, releaseTime, value) points."""
+    return {
+        "vectorId": vector_id,
+        "vectorDataPoint": [
+            {"refPer": ref, "releaseTime": release, "value": value, "statusCode": 0}
+            for ref, release, value in points
+        ],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store holding a first estimate and a revision of v1's January."""
+    store = vintages.VintageStore(tmp_path / "vintages")
+    store.append(
+        [
+            _vector_data(
+                1,
+                [
+                    ("2020-01-01", "2020-02-10T08:30", 100.0),
+                    ("2020-01-01", "2020-03-10T08:30", 101.0),
+                    ("2020-02-01", "2020-03-10T08:30", 105.0),
+                ],
+            ),
+            _vector_data(2, [("2020-01-01", "2020-02-10T08:30", 7.0)]),
+        ]
+    )
+    return store
+
+
+def test_as_of(store):
+    """Each query sees only what had been released by then."""
+    before = store.as_of(dt.date(2020, 2, 9))
+    assert before.empty
+    first = store.as_of(dt.datetime(2020, 2, 10, 8, 30))
+    assert first.loc["2020-01-01", "v1"] == 100.0
+    assert "2020-02-01" not in first.index
+    revised = store.as_of(dt.date(2020, 3, 10), vectors=["v2", "v1"])
+    assert list(revised.columns) == ["v2", "v1"]
+    assert revised.loc["2020-01-01", "v1"] == 101.0
+    assert revised.loc["2020-02-01", "v1"] == 105.0
+    assert revised.index.name == "refPer"
+
+
+def test_as_of_aware_times(store):
+    """Aware times are compared in Eastern time, where releases are stored."""
+    # the 08:30 EDT release on 2020-03-10 was at 12:30 UTC
+    utc = dt.timezone.utc
+    before = store.as_of(dt.datetime(2020, 3, 10, 12, 29, tzinfo=utc))
+    assert before.loc["2020-01-01", "v1"] == 100.0
+    assert "2020-02-01" not in before.index
+    after = store.as_of(dt.datetime(2020, 3, 10, 12, 30, tzinfo=utc))
+    assert after.loc["2020-01-01", "v1"] == 101.0
+    assert after.loc["2020-02-01", "v1"] == 105.0
+
+
+def test_unchanged_points_are_not_stored_again(store):
+    """Refetching an overlapping range only adds real revisions."""
+    again = [
+        _vector_data(
+            1,
+            [
+                ("2020-01-01", "2020-03-10T08:30", 101.0),
+                ("2020-02-01", "2020-04-10T08:30", 105.0),
+                ("2020-02-01", "2020-05-10T08:30", 104.0),
+            ],
+        )
+    ]
+    assert store.append(again) == 1
+    assert len(store.rows()) == 5
+    assert store.append(again) == 0
+    history = store.points("v1")
+    assert history["value"].tolist() == [100.0, 101.0, 105.0, 104.0]
+
+
+def test_compact_keeps_every_vintage(store):
+    """Merging segments changes nothing a query sees."""
+    store.append([_vector_data(3, [("2020-01-01", "2020-02-10T08:30", None)])])
+    expected = store.points()
+    store.compact()
+    assert len(list(store.path.glob("*.npy"))) == 1
+    pd.testing.assert_frame_equal(store.points(), expected)
+    assert np.isnan(store.as_of(dt.date(2020, 3, 1), "v3").iloc[0, 0])
+
+
+def test_record_vintages(monkeypatch, tmp_path):
+    """Fetched release ranges go straight into the store."""
+    monkeypatch.setattr(
+        vintages,
+        "get_bulk_vector_data_by_range",
+        lambda vectors, start, end: [
+            _vector_data(v, [("2020-01-01", "2020-02-10T08:30", 1.0)]) for v in vectors
+        ],
+    )
+    n = vintages.record_vintages(
+        [4, 5], dt.date(2020, 1, 1), dt.date(2020, 3, 1), path=tmp_path
+    )
+    assert n == 2
+    assert sorted(vintages.VintageStore(tmp_path).points()["vectorId"]) == [4, 5]